@@ -0,0 +1,560 @@
+import argparse
+import contextlib
+import glob
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+from POP2.canvas import CANVAS_NAME, load_canvas, shared_canvas
+from POP2.dataset import OUTPUT_FORMATS, ShardWriter, TensorWriter
+from POP2.extract_image_pcd import ProjectionGrid
+from POP2.image_writer import ImageWriter, png_params
+from POP2.instrument import StageRecorder, format_summary, json_lines, recording, stage, summarize
+from POP2.manifest import entry_matches, file_hash, file_stat, load_manifest, make_entry, save_manifest
+from POP2.pipeline import FILL_METHODS, load_point_cloud, process_cloud
+
+# Intervalo mínimo (segundos) entre escrituras del manifiesto durante el lote
+MANIFEST_SAVE_INTERVAL = 5.0
+
+
+def collect_inputs(inputs):
+    """
+    Expande la lista de entradas a una lista ordenada de archivos .ply.
+    Cada entrada puede ser un archivo, una carpeta (se toman sus .ply) o un
+    patrón glob (por ejemplo 'data/POP2/*.ply').
+    """
+    if isinstance(inputs, str):
+        inputs = [inputs]
+
+    archivos = set()
+    for entrada in inputs:
+        if os.path.isdir(entrada):
+            archivos.update(glob.glob(os.path.join(entrada, "*.ply")))
+        elif os.path.isfile(entrada):
+            archivos.add(entrada)
+        else:
+            archivos.update(glob.glob(entrada))
+
+    return sorted(archivos)
+
+
+def output_paths(output_path, file_id):
+    """
+    Rutas de salida (color, máscara) para un identificador, con el mismo
+    esquema de nombres que main.main.
+    """
+    return (os.path.join(output_path, "color", f"imagen_rellenada_{file_id}.png"),
+            os.path.join(output_path, "mask", f"mask_{file_id}.png"))
+
+
+def _init_worker():
+    # Cada proceso ya ocupa un núcleo: evitar que OpenCV lance sus propios hilos
+    cv2.setNumThreads(1)
+
+
+def _process_one(pcd_path, output_path, file_id, params, entry=None, profile=False, profile_memory=False,
+                 png_compression=None, chunk_size=None):
+    """
+    Procesa una nube y escribe sus imágenes. Se ejecuta en un proceso del pool,
+    por lo que nunca lanza excepciones: los errores se devuelven en el resultado.
+
+    Si se indica la entrada del manifiesto (`entry`), primero se compara el hash
+    del archivo y, si el contenido no cambió, se omite el procesamiento.
+
+    Con `profile`, los eventos de las etapas se devuelven en 'stages'.
+    `png_compression` es el nivel de compresión de los PNG (ver `png_params`).
+    `chunk_size` se pasa a `process_cloud` aparte de `params`: solo cambia el
+    uso de memoria, no el resultado, así que no forma parte del manifiesto.
+    """
+    inicio = time.perf_counter()
+    resultado = {"path": pcd_path, "id": file_id, "ok": False, "skipped": False, "error": None}
+    registro = recording(track_memory=profile_memory, path=pcd_path) if profile else contextlib.nullcontext()
+    with registro as recorder:
+        try:
+            outputs = output_paths(output_path, file_id)
+            resultado["stat"] = file_stat(pcd_path)
+            with stage("hash", bytes=resultado["stat"]["size"]):
+                resultado["sha256"] = file_hash(pcd_path)
+
+            if entry_matches(entry, params, outputs, digest=resultado["sha256"]):
+                resultado["ok"] = resultado["skipped"] = True
+            else:
+                color, mask = process_cloud(pcd_path, chunk_size=chunk_size, **params)
+                parametros_png = png_params(png_compression)
+                with stage("write_png", pixels=color.shape[0] * color.shape[1]):
+                    if not cv2.imwrite(outputs[0], color, parametros_png) or \
+                            not cv2.imwrite(outputs[1], mask, parametros_png):
+                        raise IOError(f"No se pudieron guardar las imágenes de {pcd_path}")
+                resultado["ok"] = True
+        except Exception as e:
+            resultado["error"] = f"{type(e).__name__}: {e}"
+    if recorder is not None:
+        resultado["stages"] = recorder.events
+    resultado["seconds"] = time.perf_counter() - inicio
+    return resultado
+
+
+def _compute_one(pcd_path, file_id, params, profile=False, profile_memory=False, pcd=None, chunk_size=None):
+    """
+    Igual que `_process_one`, pero sin escribir archivos: las imágenes se
+    devuelven en el resultado ('color' y 'mask') para que el proceso principal
+    las añada al conjunto de datos en shards o a los tensores, o las escriba
+    en segundo plano (modo `pipeline`).
+
+    Si se indica `pcd` (la nube ya cargada por el hilo de lectura), se procesa
+    esa nube en lugar de leer `pcd_path`.
+    """
+    inicio = time.perf_counter()
+    resultado = {"path": pcd_path, "id": file_id, "ok": False, "skipped": False, "error": None}
+    registro = recording(track_memory=profile_memory, path=pcd_path) if profile else contextlib.nullcontext()
+    with registro as recorder:
+        try:
+            resultado["color"], resultado["mask"] = process_cloud(pcd if pcd is not None else pcd_path,
+                                                                  chunk_size=chunk_size, **params)
+            resultado["ok"] = True
+        except Exception as e:
+            resultado["error"] = f"{type(e).__name__}: {e}"
+    if recorder is not None:
+        resultado["stages"] = recorder.events
+    resultado["seconds"] = time.perf_counter() - inicio
+    return resultado
+
+
+def _prefetch(pendientes, cola, detener, params, output_path, load, profile):
+    """
+    Hilo de lectura del modo `pipeline`. Para cada nube pendiente calcula el
+    hash (lo que lee el archivo completo y lo deja en la caché del sistema, que
+    en un disco de red es el coste principal), la omite si coincide con el
+    manifiesto y, con `load`, además la carga. Deja un dict por nube en `cola`,
+    que está acotada, y None al terminar.
+    """
+    for path, file_id, entry in pendientes:
+        if detener.is_set():
+            break
+        item = {"path": path, "id": file_id, "skipped": False, "error": None, "pcd": None}
+        # Sin memoria: tracemalloc es global y ya lo usan las etapas de cálculo
+        registro = recording(path=path) if profile else contextlib.nullcontext()
+        with registro as recorder:
+            try:
+                item["stat"] = file_stat(path)
+                with stage("hash", bytes=item["stat"]["size"]):
+                    item["sha256"] = file_hash(path)
+                item["skipped"] = entry_matches(entry, params, output_paths(output_path, file_id),
+                                                digest=item["sha256"])
+                if load and not item["skipped"]:
+                    item["pcd"] = load_point_cloud(path)
+            except Exception as e:
+                item["error"] = f"{type(e).__name__}: {e}"
+        item["stages"] = recorder.events if recorder is not None else []
+        cola.put(item)
+    cola.put(None)
+
+
+def _run_pipeline(pendientes, entregar, params, output_path, prefetch, profile, profile_memory, chunk_size=None):
+    """
+    Procesa las nubes pendientes en este proceso solapando la lectura, el
+    cálculo y la escritura: un hilo lee las siguientes nubes (`_prefetch`)
+    mientras se calculan las imágenes de la actual, y cada resultado se pasa a
+    `entregar` en cuanto termina. Como mucho hay `prefetch` nubes leídas en
+    espera, así que la memoria queda acotada aunque el lote sea grande.
+
+    Solo se usa con un worker: con varios, cada proceso tendría que volver a
+    leer la nube (el hilo solo adelantaría el hash) o recibir sus arreglos,
+    cuya copia entre procesos cuesta más de la mitad que leerla, y un único
+    hilo de lectura no daría abasto para todos. El modo normal ya solapa la
+    lectura de unos procesos con el cálculo de otros.
+    """
+    # El hilo de lectura también carga la nube, salvo por bloques (se lee al proyectar)
+    cola = queue.Queue(maxsize=max(prefetch, 1))
+    detener = threading.Event()
+    lector = threading.Thread(target=_prefetch, daemon=True,
+                              args=(pendientes, cola, detener, params, output_path, chunk_size is None, profile))
+    lector.start()
+
+    try:
+        for item in iter(cola.get, None):
+            if item["error"] is not None or item["skipped"]:
+                # Nube omitida por hash o que falló al leerse
+                entregar({"path": item["path"], "id": item["id"], "ok": item["error"] is None,
+                          "skipped": item["skipped"], "error": item["error"], "sha256": item.get("sha256"),
+                          "stat": item.get("stat"), "seconds": 0.0, "stages": item["stages"]})
+                continue
+            resultado = _compute_one(item["path"], item["id"], params, profile, profile_memory, item.pop("pcd"),
+                                     chunk_size)
+            resultado.update(sha256=item["sha256"], stat=item["stat"])
+            if profile:
+                resultado["stages"] = item["stages"] + resultado.get("stages", [])
+            entregar(resultado)
+    finally:
+        # Si el lote se interrumpe, liberar al hilo de lectura (puede estar esperando sitio en la cola)
+        detener.set()
+        while lector.is_alive():
+            try:
+                cola.get_nowait()
+            except queue.Empty:
+                lector.join(0.05)
+
+
+def process_batch(inputs, output_path, workers=None, cut_percentage=60, scale_factor=5,
+                  fillrgb_iterations=1, fillmask_iterations=1, fill_method="basic", splat_radius=0,
+                  chunk_size=None, incremental=True, output_format="png", profile=False,
+                  profile_callback=None, profile_memory=False, canvas=None, canvas_size=None, lod=None,
+                  pipeline=False, prefetch=2, writer_threads=4, png_compression=None):
+    """
+    Procesa en paralelo un conjunto de nubes .ply sin interfaz gráfica y guarda
+    las imágenes en `output_path/color/` y `output_path/mask/`.
+
+    El identificador de cada salida es el nombre del archivo sin extensión, por
+    lo que no cambia al añadir o quitar nubes del lote; si dos entradas (por
+    ejemplo, de carpetas distintas) tienen el mismo nombre se lanza ValueError
+    antes de procesar nada. Un error en una nube se
+    registra y no detiene el resto del lote.
+
+    Se mantiene un manifiesto (`manifest.json` en la carpeta de salida) con el
+    hash de cada nube y los parámetros usados. En modo incremental, las nubes
+    cuyo contenido, parámetros y salidas no han cambiado se omiten, de modo que
+    un lote interrumpido se puede reanudar volviendo a ejecutarlo.
+
+    Parámetros:
+    -----------
+    inputs : str o list
+        Archivos, carpetas o patrones glob (ver `collect_inputs`).
+    output_path : str
+        Carpeta de salida.
+    workers : int
+        Número de procesos. Por defecto, el número de núcleos de la máquina.
+        Con 1 se procesa todo en el proceso actual.
+    cut_percentage, scale_factor, fillrgb_iterations, fillmask_iterations, fill_method, splat_radius, chunk_size :
+        Parámetros de `process_cloud`.
+    incremental : bool
+        Si es True, se usa el manifiesto para omitir las nubes ya procesadas.
+        Si es False se reprocesa todo (el manifiesto se actualiza igualmente).
+    output_format : str
+        "png" (por defecto), "shards" o "tensor". Con "shards" las imágenes,
+        las máscaras y sus metadatos (archivo de origen y parámetros) se
+        escriben en un conjunto de datos en shards binarios en `output_path`
+        (ver `POP2.dataset`). Con "tensor" (requiere `canvas`) se escriben
+        directamente como tensores apilados `images.npy` (N,H,W,3) y
+        `masks.npy` (N,H,W). En estos modos se reprocesa todo el lote y no se
+        usa el manifiesto.
+    canvas : None, "auto", str o ProjectionGrid
+        Lienzo común (ver `POP2.canvas`). Con None cada nube tiene su propio
+        tamaño. Con "auto" una pasada previa calcula los límites conjuntos de
+        todas las nubes y la rejilla se guarda en `output_path/canvas.json`,
+        que se reutiliza mientras no cambien las entradas ni los parámetros.
+        También se puede indicar la ruta a un canvas.json o la rejilla.
+    canvas_size : tuple
+        (ancho, alto) fijo del lienzo común; implica `canvas="auto"` si no se
+        indica otro lienzo.
+    lod : None, "auto" o float
+        Reducción por vóxeles antes de proyectar (ver `process_cloud`).
+    profile : bool
+        Si es True, se registran la duración y los contadores de cada etapa
+        (hash, carga, recorte, proyección, máscara, relleno, escritura) de cada
+        nube y al final se imprime un resumen agregado del lote.
+    profile_callback : callable
+        Recibe cada evento de etapa (dict con 'path', 'stage', 'seconds', ...)
+        a medida que terminan las nubes. Implica `profile`.
+    profile_memory : bool
+        Medir además la memoria reservada por cada etapa (tracemalloc, incluye
+        los arreglos de numpy; ralentiza el lote). Implica `profile`.
+    pipeline : bool
+        Con un solo worker, solapar la lectura, el cálculo y la escritura (ver
+        `_run_pipeline`): un hilo lee las próximas nubes y calcula su hash
+        mientras se calculan las imágenes, y los PNG se codifican y escriben en
+        un pool de hilos, de modo que el cálculo no espera al disco. Con varios
+        workers no tiene efecto: el modo normal ya solapa la lectura y la
+        escritura de unos procesos con el cálculo de otros. Las salidas son
+        idénticas a las del modo normal.
+    prefetch : int
+        Nubes leídas por adelantado en modo `pipeline`.
+    writer_threads : int
+        Hilos de escritura de PNG en modo `pipeline`.
+    png_compression : int
+        Nivel de compresión de los PNG, de 0 (más rápido) a 9 (más pequeño).
+        Por defecto, el de OpenCV. No cambia los píxeles, así que no forma
+        parte del manifiesto.
+
+    Retorna:
+    --------
+    resultados : list of dict
+        Un diccionario por nube (en el orden de entrada) con las claves
+        'path', 'id', 'ok', 'skipped', 'error' y 'seconds' ('stages' con los
+        eventos de las etapas si se usa `profile`).
+    """
+    profile = profile or profile_callback is not None or profile_memory
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Formato de salida no soportado: {output_format}. Opciones: {OUTPUT_FORMATS}")
+    parametros_png = png_params(png_compression)
+    # Salida agrupada (shards o tensores): las imágenes se escriben desde este proceso
+    agrupada = output_format != "png"
+
+    archivos = collect_inputs(inputs)
+    if len(archivos) == 0:
+        print("No se encontraron archivos .ply en", inputs)
+        return []
+
+    tareas = [(path, os.path.splitext(os.path.basename(path))[0]) for path in archivos]
+    rutas_por_id = {}
+    for path, file_id in tareas:
+        rutas_por_id.setdefault(file_id, []).append(path)
+    repetidos = {file_id: rutas for file_id, rutas in rutas_por_id.items() if len(rutas) > 1}
+    if repetidos:
+        # Se escribirían en las mismas imágenes y en la misma entrada del manifiesto
+        detalle = "; ".join(f"{file_id}: {', '.join(rutas)}" for file_id, rutas in sorted(repetidos.items()))
+        raise ValueError(f"Varias nubes tienen el mismo nombre y sus salidas se sobrescribirían ({detalle}). "
+                         "Renómbralas o procésalas en lotes con carpetas de salida distintas.")
+
+    if agrupada:
+        os.makedirs(output_path, exist_ok=True)
+    else:
+        os.makedirs(os.path.join(output_path, "color"), exist_ok=True)
+        os.makedirs(os.path.join(output_path, "mask"), exist_ok=True)
+
+    params = dict(cut_percentage=cut_percentage, scale_factor=scale_factor,
+                  fillrgb_iterations=fillrgb_iterations, fillmask_iterations=fillmask_iterations,
+                  fill_method=fill_method)
+    workers = workers or os.cpu_count() or 1
+    pipeline = pipeline and workers == 1
+    inicio = time.perf_counter()
+
+    if splat_radius:
+        # Igual que la rejilla: solo en el manifiesto si se usa, para no invalidar lotes anteriores
+        params["splat_radius"] = splat_radius
+    if lod is not None:
+        params["lod"] = lod
+
+    if canvas is None and canvas_size is not None:
+        canvas = "auto"
+    grid = None
+    if isinstance(canvas, (tuple, list)):
+        grid = ProjectionGrid(*canvas)
+    elif canvas == "auto":
+        grid = shared_canvas(archivos, cut_percentage, scale_factor, canvas_size, chunk_size, workers,
+                             cache_path=os.path.join(output_path, CANVAS_NAME))
+    elif canvas is not None:
+        grid = load_canvas(canvas)
+    if grid is not None:
+        print(f"Lienzo común: {grid.width}x{grid.height} píxeles (escala {grid.scale_factor:.4g}).")
+        # En los parámetros (y en el manifiesto) solo si se usa, para no invalidar lotes anteriores
+        params["grid"] = list(grid)
+    elif output_format == "tensor":
+        raise ValueError("La salida 'tensor' requiere un lienzo común (canvas).")
+
+    manifest = load_manifest(output_path)
+    ultimo_guardado = time.perf_counter()
+    resultados = {}
+    if output_format == "shards":
+        dataset = ShardWriter(output_path)
+    elif output_format == "tensor":
+        dataset = TensorWriter(output_path, len(tareas), grid.height, grid.width)
+        filas = {path: i for i, (path, _) in enumerate(tareas)}
+    else:
+        dataset = None
+    recorder = StageRecorder(profile_callback) if profile else None
+    # Modo pipeline con PNG: las imágenes se escriben en segundo plano desde este proceso
+    writer = ImageWriter(writer_threads, params=parametros_png) if pipeline and not agrupada else None
+    escrituras = deque()
+
+    def reportar(resultado):
+        nonlocal ultimo_guardado
+        resultados[resultado["path"]] = resultado
+        if resultado["skipped"]:
+            estado = "sin cambios"
+        elif resultado["ok"]:
+            estado = "OK"
+        else:
+            estado = f"ERROR ({resultado['error']})"
+        print(f"[{len(resultados)}/{len(tareas)}] {resultado['path']}: {estado} en {resultado['seconds']:.2f} s")
+        if recorder is not None:
+            for event in resultado.get("stages", []):
+                recorder.emit(event)
+
+        if dataset is not None:
+            if resultado["ok"]:
+                inicio_escritura = time.perf_counter()
+                arrays = {"image": resultado.pop("color"), "mask": resultado.pop("mask")}
+                meta = dict(params, source=resultado["path"], id=resultado["id"])
+                if output_format == "tensor":
+                    dataset.add(filas[resultado["path"]], arrays, meta)
+                else:
+                    dataset.add(arrays, meta)
+                if recorder is not None:
+                    recorder.emit({"path": resultado["path"], "stage": f"write_{output_format}",
+                                   "seconds": time.perf_counter() - inicio_escritura})
+            return
+
+        if resultado["ok"]:
+            manifest["entries"][resultado["id"]] = make_entry(
+                resultado["path"], resultado["sha256"], resultado["stat"], params,
+                output_paths(output_path, resultado["id"]))
+        else:
+            # Las salidas pudieron quedar a medio escribir: forzar su recálculo
+            manifest["entries"].pop(resultado["id"], None)
+        if time.perf_counter() - ultimo_guardado >= MANIFEST_SAVE_INTERVAL:
+            save_manifest(output_path, manifest)
+            ultimo_guardado = time.perf_counter()
+
+    # Omitir directamente las nubes cuyo tamaño y fecha coinciden con el manifiesto
+    pendientes = []
+    for path, file_id in tareas:
+        if agrupada:
+            pendientes.append((path, file_id, None))
+            continue
+        entry = manifest["entries"].get(file_id) if incremental else None
+        try:
+            stat = file_stat(path)
+        except OSError:
+            stat = None
+        if stat is not None and entry is not None and entry.get("path") == path and \
+                entry_matches(entry, params, output_paths(output_path, file_id), stat=stat):
+            reportar({"path": path, "id": file_id, "ok": True, "skipped": True, "error": None,
+                      "sha256": entry["sha256"], "stat": stat, "seconds": 0.0})
+        else:
+            pendientes.append((path, file_id, entry))
+
+    def tarea(path, file_id, entry):
+        # Función y argumentos que procesan una nube según el formato de salida
+        if agrupada:
+            return _compute_one, path, file_id, params, profile, profile_memory, None, chunk_size
+        return (_process_one, path, output_path, file_id, params, entry, profile, profile_memory, png_compression,
+                chunk_size)
+
+    def terminar_escrituras(esperar):
+        # Una nube se da por terminada (y entra en el manifiesto) cuando se guardaron sus dos imágenes
+        while escrituras and (esperar or all(f.done() for f in escrituras[0][1])):
+            resultado, futuros = escrituras.popleft()
+            if not all(f.result() for f in futuros):
+                resultado["ok"] = False
+                resultado["error"] = f"IOError: No se pudieron guardar las imágenes de {resultado['path']}"
+            reportar(resultado)
+
+    def entregar(resultado):
+        if writer is None or not resultado["ok"] or resultado["skipped"]:
+            reportar(resultado)
+            return
+        color, mask = resultado.pop("color"), resultado.pop("mask")
+        inicio_escritura = time.perf_counter()
+        # Se bloquea solo si los hilos de escritura van por detrás del cálculo
+        futuros = [writer.write(destino, img) for destino, img in zip(output_paths(output_path, resultado["id"]),
+                                                                      (color, mask))]
+        if profile:
+            # Como en las capturas, con escritura en segundo plano es solo la espera para encolar
+            resultado["stages"].append({"path": resultado["path"], "stage": "write_png",
+                                        "seconds": time.perf_counter() - inicio_escritura,
+                                        "pixels": color.shape[0] * color.shape[1]})
+        escrituras.append((resultado, futuros))
+        terminar_escrituras(False)
+
+    try:
+        if pipeline and pendientes:
+            _run_pipeline(pendientes, entregar, params, output_path, prefetch, profile, profile_memory, chunk_size)
+        elif workers == 1:
+            for path, file_id, entry in pendientes:
+                funcion, *argumentos = tarea(path, file_id, entry)
+                reportar(funcion(*argumentos))
+        elif pendientes:
+            with ProcessPoolExecutor(max_workers=min(workers, len(pendientes)), initializer=_init_worker) as pool:
+                futuros = {pool.submit(*tarea(path, file_id, entry)): (path, file_id)
+                           for path, file_id, entry in pendientes}
+                for futuro in as_completed(futuros):
+                    path, file_id = futuros[futuro]
+                    try:
+                        reportar(futuro.result())
+                    except Exception as e:
+                        # Por ejemplo, un proceso del pool terminó abruptamente
+                        reportar({"path": path, "id": file_id, "ok": False, "skipped": False,
+                                  "error": f"{type(e).__name__}: {e}", "seconds": 0.0})
+    finally:
+        # Guardar siempre el progreso, también si el lote se interrumpe
+        if writer is not None:
+            terminar_escrituras(True)
+            try:
+                writer.close()
+            except IOError:
+                # Los fallos ya se registraron en el resultado de cada nube
+                pass
+        if dataset is not None:
+            dataset.close()
+        else:
+            save_manifest(output_path, manifest)
+
+    fallidos = [r for r in resultados.values() if not r["ok"]]
+    omitidos = [r for r in resultados.values() if r["skipped"]]
+    print(f"Procesadas {len(tareas) - len(fallidos)}/{len(tareas)} nubes en "
+          f"{time.perf_counter() - inicio:.2f} s ({len(omitidos)} sin cambios, {len(fallidos)} con error).")
+    if recorder is not None and recorder.events:
+        print(format_summary(summarize(recorder.events)))
+
+    return [resultados[path] for path, _ in tareas]
+
+
+def _splat_radius_arg(value):
+    return value if value == "auto" else int(value)
+
+
+def _lod_arg(value):
+    return value if value == "auto" else float(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Procesa en lote nubes .ply y genera imágenes de color y máscaras.")
+    parser.add_argument("inputs", nargs="+", help="Archivos .ply, carpetas o patrones glob.")
+    parser.add_argument("-o", "--output", required=True, help="Carpeta de salida (se crean color/ y mask/).")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Número de procesos (por defecto, núcleos de la máquina).")
+    parser.add_argument("--cut-percentage", type=float, default=60)
+    parser.add_argument("--scale-factor", type=float, default=5)
+    parser.add_argument("--fillrgb-iterations", type=int, default=1)
+    parser.add_argument("--fillmask-iterations", type=int, default=1)
+    parser.add_argument("--fill-method", choices=tuple(FILL_METHODS), default="basic")
+    parser.add_argument("--splat-radius", type=_splat_radius_arg, default=0,
+                        help="Radio en píxeles de la huella de cada punto, o 'auto' según la densidad local.")
+    parser.add_argument("--chunk-size", type=int, default=None,
+                        help="Leer cada .ply por bloques de este número de vértices (memoria acotada).")
+    parser.add_argument("--lod", type=_lod_arg, default=None,
+                        help="Reducir la nube por vóxeles antes de proyectar: 'auto' (un vóxel por pixel) o lado del vóxel.")
+    parser.add_argument("--full", action="store_true", help="Reprocesar todo, sin omitir las nubes que figuran en el manifiesto.")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="png",
+                        help="'png' (color/ y mask/), 'shards' (conjunto de datos en shards binarios) o "
+                             "'tensor' (images.npy y masks.npy apilados; requiere --canvas).")
+    parser.add_argument("--canvas", default=None,
+                        help="Lienzo común para todas las nubes: 'auto' (límites conjuntos del lote) o ruta a un canvas.json.")
+    parser.add_argument("--canvas-size", type=int, nargs=2, metavar=("ANCHO", "ALTO"), default=None,
+                        help="Tamaño fijo del lienzo común en píxeles (implica --canvas auto).")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Con -w 1, solapar lectura, cálculo y escritura (hilo de lectura anticipada y pool de "
+                             "escritura). Con varios procesos no tiene efecto: ya se solapan entre ellos.")
+    parser.add_argument("--prefetch", type=int, default=2, help="Nubes leídas por adelantado con --pipeline.")
+    parser.add_argument("--writer-threads", type=int, default=4, help="Hilos de escritura de PNG con --pipeline.")
+    parser.add_argument("--png-compression", type=int, choices=range(10), default=None, metavar="0-9",
+                        help="Nivel de compresión de los PNG (0: más rápido, 9: más pequeño).")
+    parser.add_argument("--profile", action="store_true", help="Medir cada etapa e imprimir un resumen del lote.")
+    parser.add_argument("--profile-log", default=None,
+                        help="Archivo en el que escribir los eventos de las etapas como líneas JSON (implica --profile).")
+    parser.add_argument("--profile-memory", action="store_true",
+                        help="Medir también la memoria reservada por cada etapa (implica --profile).")
+    args = parser.parse_args(argv)
+
+    with open(args.profile_log, "w", encoding="utf-8") if args.profile_log else contextlib.nullcontext() as log:
+        resultados = process_batch(args.inputs, args.output, workers=args.workers,
+                                   cut_percentage=args.cut_percentage, scale_factor=args.scale_factor,
+                                   fillrgb_iterations=args.fillrgb_iterations,
+                                   fillmask_iterations=args.fillmask_iterations,
+                                   fill_method=args.fill_method, splat_radius=args.splat_radius,
+                                   chunk_size=args.chunk_size, incremental=not args.full,
+                                   output_format=args.format, profile=args.profile,
+                                   profile_callback=json_lines(log) if log is not None else None,
+                                   profile_memory=args.profile_memory, canvas=args.canvas,
+                                   canvas_size=args.canvas_size, lod=args.lod, pipeline=args.pipeline,
+                                   prefetch=args.prefetch, writer_threads=args.writer_threads,
+                                   png_compression=args.png_compression)
+    return 0 if all(r["ok"] for r in resultados) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
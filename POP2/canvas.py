@@ -0,0 +1,143 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from POP2.extract_image_pcd import ProjectionGrid, grid_from_bounds
+from POP2.manifest import file_stat
+
+CANVAS_NAME = "canvas.json"
+
+
+def canvas_grid(x_min, x_max, y_min, y_max, scale_factor=1, size=None):
+    """
+    Rejilla de un lienzo común para varias nubes a partir de sus límites
+    conjuntos (con el mismo margen de 5 unidades por lado que cada nube).
+
+    Parámetros:
+    -----------
+    x_min, x_max, y_min, y_max : float
+        Límites conjuntos en X/Y.
+    scale_factor : float
+        Escala de la proyección; el tamaño de la imagen sale de los límites.
+        Se ignora si se indica `size`.
+    size : tuple
+        (ancho, alto) fijo en píxeles. La escala se elige para que los límites
+        quepan en el lienzo, centrados.
+
+    Retorna:
+    --------
+    grid : ProjectionGrid
+    """
+    if size is None:
+        return grid_from_bounds(x_min, x_max, y_min, y_max, scale_factor)
+
+    width, height = (int(v) for v in size)
+    x_range = max(x_max - x_min + 10, 1e-6)
+    y_range = max(y_max - y_min + 10, 1e-6)
+    scale = min(width / x_range, height / y_range)
+
+    x_centro, y_centro = (x_min + x_max) / 2, (y_min + y_max) / 2
+    return ProjectionGrid(float(x_centro - width / (2 * scale)), float(y_centro - height / (2 * scale)),
+                          width, height, float(scale))
+
+
+def cloud_bounds(pcd_path, cut_percentage=60, chunk_size=None):
+    """
+    Límites (x_min, x_max, y_min, y_max) de la parte de la nube que se
+    proyecta, es decir, después del recorte por porcentaje.
+    """
+    if chunk_size is not None:
+        from POP2.ply_stream import ply_bounds
+        return ply_bounds(pcd_path, cut_percentage, chunk_size)
+
+    from POP2.pipeline import load_point_cloud
+    from POP2.util import filter_pcd_percentage
+
+    points = np.asarray(filter_pcd_percentage(load_point_cloud(pcd_path), cut_percentage, copy=False).points)
+    if len(points) == 0:
+        raise ValueError(f"La nube de puntos está vacía: {pcd_path}")
+    x_min, y_min = points[:, :2].min(axis=0)
+    x_max, y_max = points[:, :2].max(axis=0)
+    return float(x_min), float(x_max), float(y_min), float(y_max)
+
+
+def _safe_bounds(pcd_path, cut_percentage, chunk_size):
+    # Las nubes que no se pueden leer no cuentan para el lienzo (el lote las
+    # registrará como error al procesarlas)
+    try:
+        return cloud_bounds(pcd_path, cut_percentage, chunk_size)
+    except Exception:
+        return None
+
+
+def save_canvas(path, grid, **extra):
+    """
+    Guarda la rejilla (y datos adicionales, por ejemplo las entradas con las
+    que se calculó) en un archivo JSON.
+    """
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(dict(extra, grid=grid._asdict()), f, indent=1)
+    os.replace(f"{path}.tmp", path)
+
+
+def load_canvas(path):
+    """
+    Carga la rejilla guardada con `save_canvas`.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        return ProjectionGrid(**json.load(f)["grid"])
+
+
+def shared_canvas(pcd_paths, cut_percentage=60, scale_factor=1, size=None, chunk_size=None, workers=1,
+                  cache_path=None):
+    """
+    Calcula, en una pasada previa sobre todas las nubes, la rejilla común que
+    las contiene a todas, de modo que todas las imágenes del lote tengan la
+    misma resolución y la misma correspondencia entre coordenadas y píxeles.
+
+    Si se indica `cache_path`, la rejilla se guarda junto con el tamaño y la
+    fecha de cada nube y los parámetros, y se reutiliza mientras no cambien.
+
+    Parámetros:
+    -----------
+    pcd_paths : list
+        Rutas de las nubes .ply.
+    cut_percentage, scale_factor, chunk_size :
+        Parámetros de `process_cloud`.
+    size : tuple
+        (ancho, alto) fijo del lienzo (ver `canvas_grid`).
+    workers : int
+        Número de procesos para la pasada previa.
+    cache_path : str
+        Archivo JSON en el que guardar la rejilla.
+
+    Retorna:
+    --------
+    grid : ProjectionGrid
+    """
+    clave = {"inputs": {path: file_stat(path) for path in pcd_paths},
+             "params": {"cut_percentage": cut_percentage, "scale_factor": scale_factor,
+                        "size": list(size) if size is not None else None}}
+    if cache_path is not None and os.path.exists(cache_path):
+        with open(cache_path, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+        if cache.get("inputs") == clave["inputs"] and cache.get("params") == clave["params"]:
+            return ProjectionGrid(**cache["grid"])
+
+    argumentos = [(path, cut_percentage, chunk_size) for path in pcd_paths]
+    if workers == 1 or len(pcd_paths) <= 1:
+        limites = [_safe_bounds(*a) for a in argumentos]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(pcd_paths))) as pool:
+            limites = list(pool.map(_safe_bounds, *zip(*argumentos)))
+
+    limites = np.array([b for b in limites if b is not None])
+    if len(limites) == 0:
+        raise ValueError("No se pudo leer ninguna nube para calcular el lienzo común.")
+    grid = canvas_grid(limites[:, 0].min(), limites[:, 1].max(), limites[:, 2].min(), limites[:, 3].max(),
+                       scale_factor, size)
+
+    if cache_path is not None:
+        save_canvas(cache_path, grid, **clave)
+    return grid
@@ -1,17 +1,50 @@
-import open3d as o3d
 import numpy as np
 import cv2
 import os
 import argparse
-import copy
+import contextlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from POP2.dataset import OUTPUT_FORMATS, ShardWriter
+from POP2.image_writer import ImageWriter
+from POP2.instrument import format_summary, recording, stage, summarize
+from POP2.render import frame_filename, frame_meta, render_views_for_pcd
+
+def _rotatable_arrays(geometry):
+    """
+    Devuelve vistas (sin copia) de los arreglos de la geometría que cambian al
+    rotarla: (posiciones, [normales...]). Sirve tanto para mallas como para
+    nubes de puntos.
+    """
+    if hasattr(geometry, "vertices"):
+        normales = [geometry.vertex_normals, geometry.triangle_normals]
+        return np.asarray(geometry.vertices), [np.asarray(n) for n in normales if len(n)]
+    normales = [np.asarray(geometry.normals)] if geometry.has_normals() else []
+    return np.asarray(geometry.points), normales
+
 
 def capture_views_for_pcd(pcd, base_name, output_dir,
                           num_yaw=10, num_pitch=5, num_roll=5,
-                          pitch_range=30, roll_range=30):
+                          pitch_range=30, roll_range=30, writer=None):
     """
     Captura imágenes de la nube de puntos o malla desde múltiples puntos de vista
     mediante rotaciones en los tres ejes.
+
+    La geometría se sube al visualizador una sola vez; en cada vista se
+    sobrescriben sus vértices (y normales) en el mismo buffer con la rotación
+    correspondiente y se actualiza con update_geometry. Al terminar, la
+    geometría recupera su posición original.
+
+    Cada vista registra las etapas 'render' y 'write' (ver
+    `POP2.instrument.recording`); con un `writer` en segundo plano, 'write' es
+    solo el tiempo de espera para encolar la imagen.
+
+    Si se indica `writer` (ver `POP2.image_writer.ImageWriter`), las imágenes se
+    codifican y guardan en segundo plano mientras se capturan las siguientes.
+    También puede ser un `POP2.dataset.ShardWriter`, que guarda las vistas y
+    sus ángulos en shards binarios en lugar de archivos PNG.
     """
+    import open3d as o3d
+
     print(f"Capturando vistas para: {base_name}")
     # Crear la carpeta de salida para este archivo
     pcd_output_dir = os.path.join(output_dir, base_name)
@@ -21,50 +54,114 @@ def capture_views_for_pcd(pcd, base_name, output_dir,
     yaw_angles = np.radians(np.linspace(0, 360, num=num_yaw, endpoint=False))
     pitch_angles = np.linspace(-np.radians(pitch_range), np.radians(pitch_range), num=num_pitch)
     roll_angles = np.linspace(-np.radians(roll_range), np.radians(roll_range), num=num_roll)
+
+    # Posiciones y normales originales (copia) y vistas sobre los buffers de la geometría
+    posiciones, normales = _rotatable_arrays(pcd)
+    posiciones_base = posiciones.copy()
+    normales_base = [n.copy() for n in normales]
+    center = pcd.get_center()
     
-    # Inicializar el visualizador de Open3D en modo oculto
+    # Inicializar el visualizador de Open3D en modo oculto y subir la geometría una vez
     vis = o3d.visualization.Visualizer()
     vis.create_window(width=800, height=600, visible=False)
+    vis.add_geometry(pcd)
     
     count = 0
-    for pitch in pitch_angles:
-        for yaw in yaw_angles:
-            for roll in roll_angles:
-                # Usamos deepcopy para crear una copia del objeto original
-                pcd_copy = copy.deepcopy(pcd)
-                # Obtener la matriz de rotación combinando (pitch, yaw, roll)
-                R = o3d.geometry.get_rotation_matrix_from_xyz((pitch, yaw, roll))
-                pcd_copy.rotate(R, center=pcd_copy.get_center())
-                
-                # Limpiar la escena y agregar la geometría rotada
-                vis.clear_geometries()
-                vis.add_geometry(pcd_copy)
-                
-                vis.poll_events()
-                vis.update_renderer()
-                # Capturar la imagen actual
-                color_image = vis.capture_screen_float_buffer(False)
-                
-                # Convertir la imagen de Open3D (RGB float [0,1]) a formato OpenCV (BGR uint8)
-                color_image_cv = np.array(color_image)
-                color_image_cv = cv2.cvtColor((color_image_cv * 255).astype(np.uint8), cv2.COLOR_RGB2BGR)
-                
-                # Guardar la imagen con un nombre que incluya el índice y los ángulos (en grados)
-                filename = os.path.join(
-                    pcd_output_dir,
-                    f"frame_{count:04d}_pitch{np.degrees(pitch):.1f}_yaw{np.degrees(yaw):.1f}_roll{np.degrees(roll):.1f}.png"
-                )
-                cv2.imwrite(filename, color_image_cv)
-                print(f"Guardado: {filename}")
-                count += 1
+    try:
+        for pitch in pitch_angles:
+            for yaw in yaw_angles:
+                for roll in roll_angles:
+                    # Obtener la matriz de rotación combinando (pitch, yaw, roll)
+                    R = o3d.geometry.get_rotation_matrix_from_xyz((pitch, yaw, roll))
+
+                    # Rotar respecto al centro escribiendo en los buffers existentes
+                    np.matmul(posiciones_base - center, R.T, out=posiciones)
+                    posiciones += center
+                    for normal, normal_base in zip(normales, normales_base):
+                        np.matmul(normal_base, R.T, out=normal)
+
+                    with stage("render", points=len(posiciones)):
+                        # Actualizar la geometría y reencuadrar la cámara como al añadirla
+                        vis.update_geometry(pcd)
+                        vis.reset_view_point(True)
+
+                        vis.poll_events()
+                        vis.update_renderer()
+                        # Capturar la imagen actual
+                        color_image = vis.capture_screen_float_buffer(False)
+
+                        # Convertir la imagen de Open3D (RGB float [0,1]) a formato OpenCV (BGR uint8)
+                        color_image_cv = np.array(color_image)
+                        color_image_cv = cv2.cvtColor((color_image_cv * 255).astype(np.uint8), cv2.COLOR_RGB2BGR)
+
+                    # Guardar la imagen con un nombre que incluya el índice y los ángulos (en grados)
+                    filename = os.path.join(pcd_output_dir, frame_filename(count, pitch, yaw, roll))
+                    with stage("write"):
+                        if writer is not None:
+                            writer.write(filename, color_image_cv, frame_meta(base_name, count, pitch, yaw, roll))
+                        else:
+                            cv2.imwrite(filename, color_image_cv)
+                    print(f"Guardado: {filename}")
+                    count += 1
+    finally:
+        # Devolver la geometría a su estado original
+        posiciones[:] = posiciones_base
+        for normal, normal_base in zip(normales, normales_base):
+            normal[:] = normal_base
+        vis.destroy_window()
 
     print(f"Se guardaron {count} imágenes en: {pcd_output_dir}")
-    vis.destroy_window()
+
+
+# Funciones de captura disponibles para process_input_folder
+CAPTURE_RENDERERS = {
+    "open3d": capture_views_for_pcd,
+    "software": render_views_for_pcd,
+}
+
+
+def _load_geometry(file_path):
+    import open3d as o3d
+
+    # Se utiliza read_triangle_mesh, pero si se trata de una nube de puntos se puede usar read_point_cloud
+    pcd = o3d.io.read_triangle_mesh(file_path)
+    pcd.compute_vertex_normals()
+    return pcd
+
+
+def _capture_file(file_path, output_folder, capture_params, renderer, writer_threads, output_format="png",
+                  profile=False):
+    """
+    Carga un objeto y genera todas sus vistas, guardando las imágenes con un
+    pool de hilos propio (PNG) o en el conjunto de datos del objeto (shards).
+    Con `profile`, devuelve los eventos de las etapas del objeto.
+    """
+    base_name = os.path.splitext(os.path.basename(file_path))[0]
+    print("Procesando:", file_path)
+    with recording(path=file_path) if profile else contextlib.nullcontext() as recorder:
+        with stage("load"):
+            pcd = _load_geometry(file_path)
+        if pcd.is_empty():
+            print("El objeto está vacío. Se omite:", file_path)
+        else:
+            if output_format == "shards":
+                writer = ShardWriter(os.path.join(output_folder, base_name))
+            else:
+                writer = ImageWriter(max_workers=writer_threads)
+            with writer:
+                CAPTURE_RENDERERS[renderer](pcd, base_name, output_folder, writer=writer, **capture_params)
+    return recorder.events if recorder is not None else []
+
+
+def _init_worker():
+    # Cada proceso ya ocupa un núcleo: evitar que OpenCV lance sus propios hilos
+    cv2.setNumThreads(1)
 
 
 def process_input_folder(input_folder, output_folder,
                          num_yaw=10, num_pitch=5, num_roll=5,
-                         pitch_range=30, roll_range=30):
+                         pitch_range=30, roll_range=30, renderer="open3d",
+                         workers=1, writer_threads=4, output_format="png", profile=False, lod=None):
     """
     Recorre la carpeta de entrada en busca de archivos .ply que terminen en '_pc.ply'
     y para cada uno genera capturas desde múltiples puntos de vista.
@@ -73,27 +170,71 @@ def process_input_folder(input_folder, output_folder,
       - input_folder: carpeta donde se encuentran los archivos .ply
       - output_folder: carpeta donde se guardarán las imágenes generadas
       - num_yaw, num_pitch, num_roll, pitch_range, roll_range: parámetros de la función capture_views_for_pcd
+      - renderer: "open3d" (visualizador oculto, requiere pantalla/OpenGL) o
+        "software" (render_views_for_pcd, solo NumPy, para servidores sin pantalla)
+      - workers: número de procesos; cada objeto se captura en un proceso con su
+        propio renderizador. Con 1 (por defecto) se procesan en serie. Con None,
+        el número de núcleos de la máquina.
+      - writer_threads: hilos que codifican y guardan los PNG en segundo plano
+        en cada proceso, de modo que el renderizado no espera al disco
+      - output_format: "png" (un archivo por vista) o "shards" (un conjunto de
+        datos por objeto en `output_folder/<objeto>/`, con las vistas y sus
+        ángulos en shards binarios; ver `POP2.dataset`)
+      - profile: si es True, se miden la carga, el renderizado y la escritura
+        de cada vista y al final se imprime un resumen agregado
+      - lod: "auto" o lado del vóxel para reducir los puntos antes de renderizar
+        (solo con renderer="software"; ver `render_views_for_pcd`)
+
+    Retorna:
+      - Lista de (ruta, error) de los objetos que fallaron (vacía si todo fue bien).
+        En paralelo, un error en un objeto no detiene el resto.
     """
+    if renderer not in CAPTURE_RENDERERS:
+        raise ValueError(f"Renderizador no soportado: {renderer}. Opciones: {tuple(CAPTURE_RENDERERS)}")
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Formato de salida no soportado: {output_format}. Opciones: {OUTPUT_FORMATS}")
+    if lod is not None and renderer != "software":
+        raise ValueError("La reducción por vóxeles (lod) solo está disponible con renderer='software'.")
+
     print(f"Procesando la carpeta de entrada: {input_folder}")
     
     # Listar archivos que terminen en _pc.ply (sin buscar en subcarpetas)
     files = [f for f in os.listdir(input_folder) if f.lower().endswith('mesh.ply')]
     if len(files) == 0:
         print("No se encontraron archivos .ply en", input_folder)
-        return
+        return []
 
     os.makedirs(output_folder, exist_ok=True)
-    
-    for file in files:
-        file_path = os.path.join(input_folder, file)
-        base_name = os.path.splitext(file)[0]
-        print("Procesando:", file_path)
-        # Se utiliza read_triangle_mesh, pero si se trata de una nube de puntos se puede usar read_point_cloud
-        pcd = o3d.io.read_triangle_mesh(file_path)
-        pcd.compute_vertex_normals()
-        if pcd.is_empty():
-            print("El objeto está vacío. Se omite:", file_path)
-            continue
-        capture_views_for_pcd(pcd, base_name, output_folder,
-                              num_yaw=num_yaw, num_pitch=num_pitch, num_roll=num_roll,
-                              pitch_range=pitch_range, roll_range=roll_range)
+
+    capture_params = dict(num_yaw=num_yaw, num_pitch=num_pitch, num_roll=num_roll,
+                          pitch_range=pitch_range, roll_range=roll_range)
+    if lod is not None:
+        capture_params["lod"] = lod
+    file_paths = [os.path.join(input_folder, file) for file in files]
+    workers = workers or os.cpu_count() or 1
+
+    eventos = []
+    if workers == 1:
+        for file_path in file_paths:
+            eventos += _capture_file(file_path, output_folder, capture_params, renderer, writer_threads,
+                                     output_format, profile)
+        if eventos:
+            print(format_summary(summarize(eventos)))
+        return []
+
+    fallidos = []
+    with ProcessPoolExecutor(max_workers=min(workers, len(file_paths)), initializer=_init_worker) as pool:
+        futuros = {pool.submit(_capture_file, file_path, output_folder, capture_params, renderer,
+                               writer_threads, output_format, profile): file_path
+                   for file_path in file_paths}
+        for futuro in as_completed(futuros):
+            try:
+                eventos += futuro.result()
+            except Exception as e:
+                fallidos.append((futuros[futuro], f"{type(e).__name__}: {e}"))
+                print(f"ERROR en {futuros[futuro]}: {type(e).__name__}: {e}")
+
+    print(f"Se capturaron {len(file_paths) - len(fallidos)}/{len(file_paths)} objetos en: {output_folder}")
+    if eventos:
+        print(format_summary(summarize(eventos)))
+    return fallidos
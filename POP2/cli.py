@@ -0,0 +1,158 @@
+"""
+Línea de comandos con subcomandos para cada paso del flujo:
+
+    python -m POP2.cli project nube.ply -o color.png --scale-factor 10
+    python -m POP2.cli mask color.png -o mask.png
+    python -m POP2.cli fill color.png -o color_rellena.png --method nearest
+    python -m POP2.cli capture data/POP2/mango/pcd/ data/POP2/mango/color/ --renderer software
+    python -m POP2.cli batch "data/POP2/*.ply" -o data/POP2/mango/
+
+Este módulo no importa Open3D, OpenCV ni NumPy: cada subcomando importa solo
+lo que necesita al ejecutarse, de modo que `--help`, los errores de argumentos
+y los subcomandos que trabajan sobre imágenes arrancan sin pagar la
+importación de Open3D.
+"""
+import argparse
+import sys
+
+# Mismas opciones que COLLISION_POLICIES y FILL_METHODS; se repiten aquí para
+# no importar los módulos de cálculo al construir el parser
+_COLLISIONS = ("last", "nearest", "mean")
+_FILL_METHODS = ("basic", "preserve_borders", "nearest")
+
+# Subcomandos con su propia línea de comandos, a la que se pasan los argumentos restantes
+_DELEGATED = {"batch": "POP2.batch"}
+
+
+def _number_or_auto(tipo):
+    def convertir(value):
+        return value if value == "auto" else tipo(value)
+    return convertir
+
+
+def _write_image(path, img):
+    import cv2
+
+    if not cv2.imwrite(path, img):
+        raise IOError(f"No se pudo guardar la imagen {path}")
+    print("Guardado:", path)
+
+
+def _project(args):
+    import cv2
+    from POP2.canvas import load_canvas
+
+    grid = load_canvas(args.canvas) if args.canvas else None
+    if args.chunk_size is not None:
+        if args.lod is not None or args.splat_radius:
+            raise ValueError("La lectura por bloques no admite --lod ni --splat-radius.")
+        from POP2.ply_stream import project_ply
+        img = project_ply(args.pcd, args.scale_factor, args.cut_percentage, args.collision, args.chunk_size, grid)
+    else:
+        from POP2.extract_image_pcd import point_cloud_to_image
+        from POP2.lod import lod_downsample
+        from POP2.pipeline import load_point_cloud
+        from POP2.util import filter_pcd_percentage
+
+        pcd = filter_pcd_percentage(load_point_cloud(args.pcd), args.cut_percentage, copy=False)
+        if args.lod is not None:
+            pcd, grid = lod_downsample(pcd, args.lod, args.scale_factor, grid)
+        img = point_cloud_to_image(pcd, args.scale_factor, args.collision, args.splat_radius, grid)
+    _write_image(args.output, cv2.cvtColor(img, cv2.COLOR_RGB2BGR))
+
+
+def _mask(args):
+    from POP2.util import change_image_color
+
+    _write_image(args.output, change_image_color(args.image, tuple(args.color)))
+
+
+def _fill(args):
+    from POP2.pipeline import FILL_METHODS
+    from POP2.util import load_image
+
+    _write_image(args.output, FILL_METHODS[args.method](load_image(args.image), iteraciones=args.iterations))
+
+
+def _capture(args):
+    from POP2.capture3d import process_input_folder
+
+    fallidos = process_input_folder(args.input_folder, args.output_folder, num_yaw=args.num_yaw,
+                                    num_pitch=args.num_pitch, num_roll=args.num_roll,
+                                    pitch_range=args.pitch_range, roll_range=args.roll_range,
+                                    renderer=args.renderer, workers=args.workers or None,
+                                    writer_threads=args.writer_threads, output_format=args.format,
+                                    profile=args.profile, lod=args.lod)
+    return 1 if fallidos else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m POP2.cli",
+                                     description="Extracción de imágenes a partir de nubes de puntos .ply.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("project", help="Proyecta una nube sobre el plano XY (imagen de color sin rellenar).")
+    p.add_argument("pcd", help="Archivo .ply.")
+    p.add_argument("-o", "--output", required=True, help="Imagen PNG de salida.")
+    p.add_argument("--cut-percentage", type=float, default=60)
+    p.add_argument("--scale-factor", type=float, default=5)
+    p.add_argument("--collision", choices=_COLLISIONS, default="last")
+    p.add_argument("--splat-radius", type=_number_or_auto(int), default=0)
+    p.add_argument("--chunk-size", type=int, default=None, help="Leer el .ply por bloques de este número de vértices.")
+    p.add_argument("--lod", type=_number_or_auto(float), default=None,
+                   help="Reducir la nube por vóxeles antes de proyectar: 'auto' o lado del vóxel.")
+    p.add_argument("--canvas", default=None, help="Proyectar sobre la rejilla de un canvas.json.")
+    p.set_defaults(func=_project)
+
+    p = sub.add_parser("mask", help="Máscara de una imagen proyectada (píxeles no negros).")
+    p.add_argument("image", help="Imagen proyectada.")
+    p.add_argument("-o", "--output", required=True, help="Imagen PNG de salida.")
+    p.add_argument("--color", type=int, nargs=3, metavar=("R", "G", "B"), default=(255, 255, 255))
+    p.set_defaults(func=_mask)
+
+    p = sub.add_parser("fill", help="Rellena los píxeles vacíos de una imagen proyectada.")
+    p.add_argument("image", help="Imagen proyectada (o máscara).")
+    p.add_argument("-o", "--output", required=True, help="Imagen PNG de salida.")
+    p.add_argument("--method", choices=_FILL_METHODS, default="basic")
+    p.add_argument("--iterations", type=int, default=1)
+    p.set_defaults(func=_fill)
+
+    p = sub.add_parser("capture", help="Captura vistas desde múltiples ángulos de los *mesh.ply de una carpeta.")
+    p.add_argument("input_folder")
+    p.add_argument("output_folder")
+    p.add_argument("--num-yaw", type=int, default=10)
+    p.add_argument("--num-pitch", type=int, default=5)
+    p.add_argument("--num-roll", type=int, default=5)
+    p.add_argument("--pitch-range", type=float, default=30)
+    p.add_argument("--roll-range", type=float, default=30)
+    p.add_argument("--renderer", choices=("open3d", "software"), default="open3d")
+    p.add_argument("-w", "--workers", type=int, default=1, help="Número de procesos (0: núcleos de la máquina).")
+    p.add_argument("--writer-threads", type=int, default=4)
+    p.add_argument("--format", choices=("png", "shards"), default="png")
+    p.add_argument("--lod", type=_number_or_auto(float), default=None,
+                   help="Reducir los puntos por vóxeles antes de renderizar (solo --renderer software).")
+    p.add_argument("--profile", action="store_true")
+    p.set_defaults(func=_capture)
+
+    for nombre in _DELEGATED:
+        sub.add_parser(nombre, add_help=False,
+                       help=f"Ver `python -m POP2.cli {nombre} --help` ({_DELEGATED[nombre]}).")
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv and argv[0] in _DELEGATED:
+        import importlib
+        return importlib.import_module(_DELEGATED[argv[0]]).main(argv[1:])
+
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args) or 0
+    except (ValueError, IOError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
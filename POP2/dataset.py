@@ -0,0 +1,265 @@
+import glob
+import json
+import os
+
+import numpy as np
+
+# Formatos de salida: un PNG por imagen, shards binarios o tensores de tamaño fijo
+OUTPUT_FORMATS = ("png", "shards", "tensor")
+
+DATASET_INDEX = "index.json"
+TENSOR_INDEX = "tensors.json"
+DATASET_VERSION = 1
+
+# Tamaño (bytes) a partir del cual se empieza un nuevo shard
+DEFAULT_SHARD_BYTES = 1 << 30
+
+# Alineación (bytes) de cada arreglo dentro del shard
+_ALIGNMENT = 64
+
+
+def _shard_name(shard):
+    return f"shard_{shard:05d}.bin"
+
+
+class ShardWriter:
+    """
+    Escribe un conjunto de datos en shards binarios en lugar de un archivo PNG
+    por imagen. Cada registro contiene uno o varios arreglos (por ejemplo,
+    'image' y 'mask') y sus metadatos. Los arreglos se escriben sin comprimir
+    y alineados, uno tras otro, en `shard_XXXXX.bin`; su posición, forma, tipo
+    y los metadatos se guardan en `index.json` al cerrar. `ShardDataset` lee
+    los registros por índice mapeando los shards en memoria, sin copias.
+
+    Al abrirse sobre una carpeta que ya contiene un conjunto de datos, este se
+    reemplaza.
+
+    Se usa como gestor de contexto; también es compatible con `ImageWriter`
+    (método `write`), así que puede usarse como destino de las capturas.
+
+    Parámetros:
+    -----------
+    path : str
+        Carpeta del conjunto de datos.
+    shard_bytes : int
+        Tamaño aproximado de cada shard.
+    """
+
+    def __init__(self, path, shard_bytes=DEFAULT_SHARD_BYTES):
+        os.makedirs(path, exist_ok=True)
+        for viejo in glob.glob(os.path.join(path, "shard_*.bin")) + [os.path.join(path, DATASET_INDEX)]:
+            if os.path.exists(viejo):
+                os.remove(viejo)
+
+        self.path = path
+        self.shard_bytes = shard_bytes
+        self.records = []
+        self.shard = -1
+        self.archivo = None
+        self.offset = 0
+
+    def _next_shard(self):
+        if self.archivo is not None:
+            self.archivo.close()
+        self.shard += 1
+        self.archivo = open(os.path.join(self.path, _shard_name(self.shard)), "wb")
+        self.offset = 0
+
+    def add(self, arrays, meta=None):
+        """
+        Añade un registro.
+
+        Parámetros:
+        -----------
+        arrays : dict
+            Nombre -> numpy.ndarray.
+        meta : dict
+            Metadatos serializables en JSON (archivo de origen, ángulos, etc.).
+        """
+        if self.archivo is None or self.offset >= self.shard_bytes:
+            self._next_shard()
+
+        campos = {}
+        for nombre, arr in arrays.items():
+            arr = np.ascontiguousarray(arr)
+            relleno = -self.offset % _ALIGNMENT
+            if relleno:
+                self.archivo.write(b"\0" * relleno)
+                self.offset += relleno
+            self.archivo.write(arr.data)
+            campos[nombre] = {"offset": self.offset, "shape": list(arr.shape), "dtype": arr.dtype.str}
+            self.offset += arr.nbytes
+
+        self.records.append({"shard": self.shard, "arrays": campos, "meta": meta or {}})
+
+    def write(self, path, img, meta=None):
+        """
+        Interfaz de `ImageWriter`: guarda `img` como arreglo 'image', con el
+        nombre del archivo que se habría escrito en los metadatos ('name').
+        """
+        self.add({"image": img}, dict(meta or {}, name=os.path.basename(path)))
+
+    def close(self):
+        """
+        Cierra el shard actual y escribe el índice de forma atómica.
+        """
+        if self.archivo is not None:
+            self.archivo.close()
+            self.archivo = None
+
+        index = {"version": DATASET_VERSION, "shards": [_shard_name(i) for i in range(self.shard + 1)],
+                 "records": self.records}
+        path = os.path.join(self.path, DATASET_INDEX)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(f"{path}.tmp", path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class ShardDataset:
+    """
+    Lector con acceso aleatorio de los conjuntos de datos escritos por
+    `ShardWriter`. Los shards se mapean en memoria al primer acceso y los
+    arreglos devueltos son vistas de solo lectura (sin copias).
+
+    Parámetros:
+    -----------
+    paths : str o list
+        Carpetas de conjuntos de datos. Una carpeta sin `index.json` se
+        recorre buscando conjuntos en sus subcarpetas (por ejemplo, la salida
+        de `process_input_folder`, con un conjunto por objeto).
+    """
+
+    def __init__(self, paths):
+        if isinstance(paths, str):
+            paths = [paths]
+
+        self.records = []
+        self.shards = {}
+        for path in paths:
+            if os.path.exists(os.path.join(path, DATASET_INDEX)):
+                carpetas = [path]
+            else:
+                carpetas = sorted(os.path.dirname(p) for p in glob.glob(os.path.join(path, "*", DATASET_INDEX)))
+            for carpeta in carpetas:
+                with open(os.path.join(carpeta, DATASET_INDEX), "r", encoding="utf-8") as f:
+                    index = json.load(f)
+                if index.get("version") != DATASET_VERSION:
+                    raise ValueError(f"Versión de conjunto de datos no soportada en {carpeta}")
+                self.records.extend((carpeta, index["shards"], record) for record in index["records"])
+
+    def __len__(self):
+        return len(self.records)
+
+    def _shard(self, carpeta, nombre):
+        key = os.path.join(carpeta, nombre)
+        if key not in self.shards:
+            self.shards[key] = np.memmap(key, dtype=np.uint8, mode="r")
+        return self.shards[key]
+
+    def meta(self, i):
+        """
+        Metadatos del registro `i`, sin acceder a los shards.
+        """
+        return self.records[i][2]["meta"]
+
+    def __getitem__(self, i):
+        """
+        Retorna:
+        --------
+        arrays : dict
+            Nombre -> numpy.ndarray (vista sobre el shard mapeado en memoria).
+        meta : dict
+            Metadatos del registro.
+        """
+        carpeta, shards, record = self.records[i]
+        datos = self._shard(carpeta, shards[record["shard"]])
+
+        arrays = {}
+        for nombre, campo in record["arrays"].items():
+            dtype = np.dtype(campo["dtype"])
+            nbytes = int(np.prod(campo["shape"], dtype=np.int64)) * dtype.itemsize
+            inicio = campo["offset"]
+            arrays[nombre] = datos[inicio:inicio + nbytes].view(dtype).reshape(campo["shape"])
+        return arrays, record["meta"]
+
+
+class TensorWriter:
+    """
+    Escribe las imágenes y máscaras de un lote con lienzo fijo directamente
+    como tensores apilados: `images.npy` (N, H, W, 3) y `masks.npy` (N, H, W),
+    preasignados y mapeados en memoria, más `tensors.json` con los metadatos
+    de cada fila. Las filas de las nubes que fallaron quedan a cero y con
+    metadatos None.
+
+    Parámetros:
+    -----------
+    path : str
+        Carpeta de salida.
+    n : int
+        Número de filas (nubes del lote).
+    height, width : int
+        Tamaño del lienzo.
+    """
+
+    def __init__(self, path, n, height, width):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.images = np.lib.format.open_memmap(os.path.join(path, "images.npy"), mode="w+",
+                                                dtype=np.uint8, shape=(n, height, width, 3))
+        self.masks = np.lib.format.open_memmap(os.path.join(path, "masks.npy"), mode="w+",
+                                               dtype=np.uint8, shape=(n, height, width))
+        self.records = [None] * n
+
+    def add(self, i, arrays, meta=None):
+        """
+        Escribe la fila `i` con los arreglos 'image' (H,W,3) y 'mask' (se guarda
+        un solo canal) y sus metadatos.
+        """
+        self.images[i] = arrays["image"]
+        mask = arrays["mask"]
+        self.masks[i] = mask[..., 0] if mask.ndim == 3 else mask
+        self.records[i] = meta or {}
+
+    def close(self):
+        """
+        Vuelca los tensores a disco y escribe los metadatos de forma atómica.
+        """
+        self.images.flush()
+        self.masks.flush()
+        path = os.path.join(self.path, TENSOR_INDEX)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump({"version": DATASET_VERSION, "records": self.records}, f)
+        os.replace(f"{path}.tmp", path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def load_tensors(path):
+    """
+    Abre la salida de `TensorWriter` sin copiarla.
+
+    Retorna:
+    --------
+    images : numpy.ndarray
+        Tensor (N, H, W, 3) uint8 mapeado en memoria (solo lectura).
+    masks : numpy.ndarray
+        Tensor (N, H, W) uint8 mapeado en memoria (solo lectura).
+    records : list
+        Metadatos de cada fila (None si la nube falló).
+    """
+    with open(os.path.join(path, TENSOR_INDEX), "r", encoding="utf-8") as f:
+        records = json.load(f)["records"]
+    return (np.load(os.path.join(path, "images.npy"), mmap_mode="r"),
+            np.load(os.path.join(path, "masks.npy"), mmap_mode="r"), records)
@@ -1,45 +1,33 @@
+from collections import namedtuple
 
 import numpy as np
 
-def point_cloud_to_image(pcd, custom_scale_factor=1):
-    """
-    Esta función toma una nube de puntos de tipo open3d.geometry.PointCloud
-    y la proyecta a una imagen en 2D. La proyección se realiza sobre el plano XY,
-    escalando y trasladando las coordenadas para acomodar todos los puntos en la imagen.
+# Politicas disponibles cuando varios puntos caen en el mismo pixel
+COLLISION_POLICIES = ("last", "nearest", "mean")
 
-    Parámetros:
-    -----------
-    pcd : open3d.geometry.PointCloud
-        La nube de puntos de entrada, con o sin colores.
-    custom_scale_factor : float
-        Factor de escala de la proyeccion.
+# Radio máximo (en píxeles) de la huella de un punto al proyectar con splats
+MAX_SPLAT_RADIUS = 8
 
-    Retorna:
-    --------
-    img : numpy.ndarray
-        Imagen en formato RGB (uint8) con la nube proyectada.
-    """
-    points = np.asarray(pcd.points)  # (N,3)
-    colors = np.asarray(pcd.colors)  # (N,3) en [0,1] si existen
 
-    if points.size == 0:
-        raise ValueError("La nube de puntos está vacía.")
+# Rejilla de proyección: origen (x_min, y_min) en unidades de la nube, tamaño
+# de la imagen en píxeles y escala (píxeles por unidad)
+ProjectionGrid = namedtuple("ProjectionGrid", ["x_min", "y_min", "width", "height", "scale_factor"])
 
-    # Si la nube no tiene colores, asignar blanco por defecto
-    if colors.size == 0:
-        colors = np.ones((len(points), 3), dtype=np.float32)
 
-    colors_255 = (colors * 255).astype(np.uint8)
-
-    # Determinar rangos y escalas
-    x_vals = points[:,0]
-    y_vals = points[:,1]
+def grid_from_bounds(x_min, x_max, y_min, y_max, custom_scale_factor=1):
+    """
+    Calcula la rejilla de proyección a partir de los valores mínimos y máximos
+    de X/Y de la nube (se añade un margen de 5 unidades por lado).
 
-    x_min, x_max = x_vals.min() - 5, x_vals.max() + 5
-    y_min, y_max = y_vals.min() - 5, y_vals.max() + 5
+    Retorna:
+    --------
+    grid : ProjectionGrid
+    """
+    x_min, x_max = x_min - 5, x_max + 5
+    y_min, y_max = y_min - 5, y_max + 5
 
-    x_range = (x_max - x_min) 
-    y_range = (y_max - y_min) 
+    x_range = (x_max - x_min)
+    y_range = (y_max - y_min)
 
     if x_range == 0:
         x_range = 1e-6
@@ -64,47 +52,483 @@ def point_cloud_to_image(pcd, custom_scale_factor=1):
     if img_height < 1:
         img_height = 1
 
-    x_pixels = (x_vals - x_min) * scale_factor
-    y_pixels = (y_vals - y_min) * scale_factor
+    return ProjectionGrid(x_min, y_min, img_width, img_height, scale_factor)
+
+
+def points_to_pixels(points, grid):
+    """
+    Coordenadas enteras (columna, fila) de cada punto en la rejilla.
+    """
+    x_pixels = (points[:,0] - grid.x_min) * grid.scale_factor
+    y_pixels = (points[:,1] - grid.y_min) * grid.scale_factor
 
     x_pixels = x_pixels.astype(int)
     y_pixels = y_pixels.astype(int)
 
     # Invertir eje Y para que la imagen tenga origen en la esquina superior izquierda
-    y_pixels = img_height - 1 - y_pixels
+    y_pixels = grid.height - 1 - y_pixels
+
+    return x_pixels, y_pixels
+
+
+def _projection_grid(points, custom_scale_factor=1):
+    """
+    Calcula la rejilla de proyeccion (pixel de cada punto y tamaño de la imagen)
+    a partir de las coordenadas X/Y de la nube.
+
+    Retorna:
+    --------
+    x_pixels, y_pixels : numpy.ndarray
+        Coordenadas enteras (columna, fila) de cada punto en la imagen.
+    grid : ProjectionGrid
+        Rejilla usada (tamaño de la imagen y escala efectiva).
+    """
+    # Determinar rangos y escalas
+    x_vals = points[:,0]
+    y_vals = points[:,1]
+
+    grid = grid_from_bounds(x_vals.min(), x_vals.max(), y_vals.min(), y_vals.max(), custom_scale_factor)
+    x_pixels, y_pixels = points_to_pixels(points, grid)
+
+    return x_pixels, y_pixels, grid
+
+
+def _resolve_collisions(pixel_ids, z_vals, n_pixels, collision="last"):
+    """
+    Elige un único punto ganador por pixel de forma vectorizada.
+
+    Parámetros:
+    -----------
+    pixel_ids : numpy.ndarray
+        Índice lineal (fila * ancho + columna) del pixel de cada punto.
+    z_vals : numpy.ndarray
+        Coordenada Z de cada punto (usada por la política "nearest").
+    n_pixels : int
+        Número total de píxeles de la imagen.
+    collision : str
+        "last" conserva el último punto en el orden de la nube (comportamiento
+        original del bucle de dibujo); "nearest" conserva el punto con mayor Z,
+        es decir, el más cercano a una cámara que mira la cara frontal. En caso
+        de empate en Z gana también el último punto.
+
+    Retorna:
+    --------
+    ganadores : numpy.ndarray
+        Arreglo (n_pixels,) con el índice del punto ganador de cada pixel,
+        o -1 si ningún punto cae en él.
+    """
+    indices = np.arange(len(pixel_ids))
+    ganadores = np.full(n_pixels, -1, dtype=np.int64)
+
+    if collision == "last":
+        # El mayor índice por pixel es la última escritura del bucle original
+        np.maximum.at(ganadores, pixel_ids, indices)
+    elif collision == "nearest":
+        # z-buffer: mayor Z por pixel y, entre los empatados, el último punto
+        z_buffer = np.full(n_pixels, -np.inf)
+        np.maximum.at(z_buffer, pixel_ids, z_vals)
+        visibles = indices[z_vals == z_buffer[pixel_ids]]
+        np.maximum.at(ganadores, pixel_ids[visibles], visibles)
+    else:
+        raise ValueError(f"Política de colisión no soportada: {collision}")
+
+    return ganadores
+
+
+class ChunkedProjection:
+    """
+    Proyección incremental por bloques de puntos sobre una rejilla fija.
+    Permite proyectar nubes que no caben en memoria: cada bloque se añade con
+    `add` y el resultado es idéntico al de proyectar la nube completa con la
+    misma política de colisión.
+
+    Parámetros:
+    -----------
+    grid : ProjectionGrid
+        Rejilla de proyección (ver `grid_from_bounds`).
+    collision : str
+        "last", "nearest" o "mean" (ver `point_cloud_to_image`).
+    """
+
+    def __init__(self, grid, collision="last"):
+        if collision not in COLLISION_POLICIES:
+            raise ValueError(f"Política de colisión no soportada: {collision}. "
+                             f"Opciones: {COLLISION_POLICIES}")
+        self.grid = grid
+        self.collision = collision
+        self.n_points = 0
+
+        n_pixels = grid.width * grid.height
+        self.img = np.zeros((grid.height, grid.width, 3), dtype=np.uint8)
+        if collision == "mean":
+            self.suma = np.zeros((n_pixels, 3), dtype=np.float64)
+            self.conteo = np.zeros(n_pixels, dtype=np.int64)
+            self.index_map = None
+        else:
+            self.index_map = np.full(n_pixels, -1, dtype=np.int32)
+            if collision == "nearest":
+                self.z_buffer = np.full(n_pixels, -np.inf)
+
+    def add(self, points, colors=None):
+        """
+        Proyecta un bloque de puntos (N,3) con sus colores (N,3) en [0,1]
+        (blanco si son None). Los índices del mapa de índices son globales:
+        cuentan los puntos de todos los bloques añadidos en orden.
+        """
+        grid = self.grid
+        n_pixels = grid.width * grid.height
+        offset = self.n_points
+        self.n_points += len(points)
+
+        if colors is None or colors.size == 0:
+            colors = np.ones((len(points), 3), dtype=np.float32)
+
+        x_pixels, y_pixels = points_to_pixels(points, grid)
+        dentro = np.flatnonzero((x_pixels >= 0) & (x_pixels < grid.width) &
+                                (y_pixels >= 0) & (y_pixels < grid.height))
+        if dentro.size == 0:
+            return
+        pixel_ids = y_pixels[dentro] * grid.width + x_pixels[dentro]
+
+        if self.collision == "mean":
+            colors_255 = (colors[dentro] * 255).astype(np.uint8)
+            self.conteo += np.bincount(pixel_ids, minlength=n_pixels)
+            for c in range(3):
+                self.suma[:, c] += np.bincount(pixel_ids, weights=colors_255[:, c], minlength=n_pixels)
+            return
+
+        z_vals = points[dentro, 2]
+        ganadores = _resolve_collisions(pixel_ids, z_vals, n_pixels, self.collision)
+        pixeles = np.flatnonzero(ganadores >= 0)
+        locales = ganadores[pixeles]
+
+        if self.collision == "nearest":
+            # Un bloque posterior gana los empates, igual que el último punto en memoria
+            z_bloque = z_vals[locales]
+            actualizar = z_bloque >= self.z_buffer[pixeles]
+            pixeles, locales = pixeles[actualizar], locales[actualizar]
+            self.z_buffer[pixeles] = z_bloque[actualizar]
+
+        self.index_map[pixeles] = offset + dentro[locales]
+        self.img.reshape(-1, 3)[pixeles] = (colors[dentro[locales]] * 255).astype(np.uint8)
+
+    def result(self):
+        """
+        Retorna:
+        --------
+        img : numpy.ndarray
+            Imagen RGB (uint8) con todos los bloques proyectados.
+        index_map : numpy.ndarray o None
+            Mapa (H, W) int32 con el índice global del punto visible en cada
+            pixel (-1 si está vacío); None con la política "mean".
+        """
+        if self.collision == "mean":
+            ocupados = self.conteo > 0
+            img_flat = self.img.reshape(-1, 3)
+            img_flat[ocupados] = np.round(self.suma[ocupados] / self.conteo[ocupados, np.newaxis]).astype(np.uint8)
+            return self.img, None
+        return self.img, self.index_map.reshape(self.grid.height, self.grid.width)
+
+
+def _splat_radii(n_points, scale_factor, splat_radius=0, spacing=None):
+    """
+    Radio (en píxeles) de la huella de cada punto. Con un radio fijo todos los
+    puntos usan el mismo; con `spacing` (distancia al vecino más cercano de cada
+    punto, en unidades de la nube) el radio se adapta a la densidad local para
+    que las huellas de puntos vecinos se toquen (también en diagonal).
+    """
+    if spacing is not None:
+        radios = np.ceil(np.asarray(spacing) * scale_factor * np.sqrt(0.5)).astype(np.int64)
+    else:
+        radios = np.full(n_points, int(splat_radius), dtype=np.int64)
+    return np.clip(radios, 0, MAX_SPLAT_RADIUS)
+
+
+def _splat(x_pixels, y_pixels, img_width, img_height, radios, collision="last", z_vals=None, colors_255=None):
+    """
+    Expande cada punto a los píxeles de un disco de radio `radios` de forma
+    vectorizada (un paso por desplazamiento del disco, no por punto). Si varios
+    puntos cubren un pixel, solo cuentan los de centro más cercano, de modo
+    que las huellas nunca tapan un pixel en el que cae un punto directamente;
+    entre ellos se aplica la política de colisión (ver `_resolve_collisions`).
+
+    Los desplazamientos se recorren de menor a mayor distancia y cada uno se
+    reduce enseguida sobre búferes por pixel, así que la memoria es O(N +
+    píxeles) y no crece con el número de desplazamientos del disco.
+
+    Parámetros:
+    -----------
+    collision : str
+        "last", "nearest" (requiere `z_vals`) o "mean" (requiere
+        `colors_255`, los colores (N,3) en uint8).
+
+    Retorna:
+    --------
+    ganadores : numpy.ndarray o None
+        (n_pixels,) con el índice del punto visible en cada pixel, o -1 si
+        está vacío. None con la política "mean".
+    media : tuple o None
+        Con "mean", (suma, conteo): suma de colores (n_pixels,3) y número de
+        puntos por pixel. None con las demás políticas.
+    """
+    n_pixels = img_width * img_height
+    r_max = int(radios.max()) if radios.size else 0
+    desplazamientos = sorted(((dy * dy + dx * dx, dy, dx) for dy in range(-r_max, r_max + 1)
+                              for dx in range(-r_max, r_max + 1)))
+
+    # Distancia (al cuadrado) del centro más cercano que cubre cada pixel
+    distancia = np.full(n_pixels, np.iinfo(np.int64).max)
+    ganadores, media = None, None
+    if collision == "mean":
+        media = (np.zeros((n_pixels, 3)), np.zeros(n_pixels, dtype=np.int64))
+    else:
+        ganadores = np.full(n_pixels, -1, dtype=np.int64)
+        if collision == "nearest":
+            z_buffer = np.full(n_pixels, -np.inf)
+
+    for d2, dy, dx in desplazamientos:
+        # Puntos cuya huella incluye este desplazamiento
+        seleccion = np.flatnonzero(radios * radios >= d2) if d2 else np.arange(len(radios))
+        x = x_pixels[seleccion] + dx
+        y = y_pixels[seleccion] + dy
+        dentro = (x >= 0) & (x < img_width) & (y >= 0) & (y < img_height)
+        pixel_ids = y[dentro] * img_width + x[dentro]
+        puntos = seleccion[dentro]
+
+        # Como los desplazamientos van en orden de distancia, un pixel ya
+        # cubierto desde más cerca no acepta más candidatos
+        validos = distancia[pixel_ids] >= d2
+        pixel_ids, puntos = pixel_ids[validos], puntos[validos]
+        if pixel_ids.size == 0:
+            continue
+        distancia[pixel_ids] = d2
+
+        if collision == "mean":
+            np.add.at(media[0], pixel_ids, colors_255[puntos])
+            np.add.at(media[1], pixel_ids, 1)
+        elif collision == "nearest":
+            # z-buffer: mayor Z por pixel y, entre los empatados, el último punto
+            z = z_vals[puntos]
+            z_previa = z_buffer[pixel_ids]
+            np.maximum.at(z_buffer, pixel_ids, z)
+            ganadores[pixel_ids[z_buffer[pixel_ids] > z_previa]] = -1
+            visibles = z == z_buffer[pixel_ids]
+            np.maximum.at(ganadores, pixel_ids[visibles], puntos[visibles])
+        else:
+            # El mayor índice es el último punto en el orden de la nube
+            np.maximum.at(ganadores, pixel_ids, puntos)
+
+    return ganadores, media
+
+
+def _rasterize(points, colors, custom_scale_factor=1, collision="last", splat_radius=0, spacing=None, grid=None):
+    """
+    Núcleo vectorizado de la proyección. Devuelve la imagen RGB y el mapa de
+    índices (índice del punto visible en cada pixel, -1 si está vacío). Con la
+    política "mean" no existe un único punto por pixel y el mapa es None.
+    Con `splat_radius` > 0 o `spacing` cada punto cubre un disco de píxeles.
+    Si se indica `grid`, se proyecta sobre esa rejilla (lienzo fijo) en lugar
+    de calcularla a partir de los límites de la nube.
+    """
+    if collision not in COLLISION_POLICIES:
+        raise ValueError(f"Política de colisión no soportada: {collision}. "
+                         f"Opciones: {COLLISION_POLICIES}")
+
+    if points.size == 0:
+        raise ValueError("La nube de puntos está vacía.")
+
+    # Si la nube no tiene colores, asignar blanco por defecto
+    if colors.size == 0:
+        colors = np.ones((len(points), 3), dtype=np.float32)
+
+    if grid is None:
+        x_pixels, y_pixels, grid = _projection_grid(points, custom_scale_factor)
+    else:
+        x_pixels, y_pixels = points_to_pixels(points, grid)
+    img_width, img_height, scale_factor = grid.width, grid.height, grid.scale_factor
+    n_pixels = img_width * img_height
 
     # Crear imagen negra (RGB)
     img = np.zeros((img_height, img_width, 3), dtype=np.uint8)
+    img_flat = img.reshape(-1, 3)
+    index_map = np.full(n_pixels, -1, dtype=np.int32)
+
+    if splat_radius or spacing is not None:
+        radios = _splat_radii(len(points), scale_factor, splat_radius, spacing)
+        colors_255 = (colors * 255).astype(np.uint8) if collision == "mean" else None
+        ganadores, media = _splat(x_pixels, y_pixels, img_width, img_height, radios, collision,
+                                  points[:, 2], colors_255)
+        if collision == "mean":
+            suma, conteo = media
+            ocupados = conteo > 0
+            img_flat[ocupados] = np.round(suma[ocupados] / conteo[ocupados, np.newaxis]).astype(np.uint8)
+            return img, None
+        pixeles = np.flatnonzero(ganadores >= 0)
+        index_map[pixeles] = ganadores[pixeles]
+        img_flat[pixeles] = (colors[index_map[pixeles]] * 255).astype(np.uint8)
+        return img, index_map.reshape(img_height, img_width)
+
+    # Descartar los puntos fuera de la imagen
+    dentro = np.flatnonzero((x_pixels >= 0) & (x_pixels < img_width) &
+                            (y_pixels >= 0) & (y_pixels < img_height))
+    pixel_ids = y_pixels[dentro] * img_width + x_pixels[dentro]
 
-    # Dibujar la nube en la imagen
-    for (xp, yp, c) in zip(x_pixels, y_pixels, colors_255):
-        if 0 <= xp < img_width and 0 <= yp < img_height:
-            img[yp, xp] = c
+    if dentro.size == 0:
+        return img, None if collision == "mean" else index_map.reshape(img_height, img_width)
 
+    if collision == "mean":
+        # Acumular la suma de colores y el número de puntos por pixel
+        colors_255 = (colors[dentro] * 255).astype(np.uint8)
+        conteo = np.bincount(pixel_ids, minlength=n_pixels)
+        ocupados = conteo > 0
+        for c in range(3):
+            suma = np.bincount(pixel_ids, weights=colors_255[:, c], minlength=n_pixels)
+            img_flat[ocupados, c] = np.round(suma[ocupados] / conteo[ocupados]).astype(np.uint8)
+        return img, None
+
+    ganadores = _resolve_collisions(pixel_ids, points[dentro, 2], n_pixels, collision)
+    pixeles = np.flatnonzero(ganadores >= 0)
+    index_map[pixeles] = dentro[ganadores[pixeles]]
+    # Solo se convierten a uint8 los colores de los puntos visibles
+    img_flat[pixeles] = (colors[index_map[pixeles]] * 255).astype(np.uint8)
+
+    return img, index_map.reshape(img_height, img_width)
+
+
+def _splat_arguments(pcd, splat_radius):
+    """
+    Traduce el parámetro público `splat_radius` a los argumentos de _rasterize.
+    Con "auto" se estima la separación local de cada punto como la distancia a
+    su vecino más cercano (KD-tree de Open3D).
+    """
+    if splat_radius == "auto":
+        return 0, np.asarray(pcd.compute_nearest_neighbor_distance())
+    if isinstance(splat_radius, str) or splat_radius < 0:
+        raise ValueError(f"splat_radius debe ser un entero >= 0 o 'auto', no {splat_radius!r}")
+    return int(splat_radius), None
+
+
+def point_cloud_to_image(pcd, custom_scale_factor=1, collision="last", splat_radius=0, grid=None):
+    """
+    Esta función toma una nube de puntos de tipo open3d.geometry.PointCloud
+    y la proyecta a una imagen en 2D. La proyección se realiza sobre el plano XY,
+    escalando y trasladando las coordenadas para acomodar todos los puntos en la imagen.
+
+    Parámetros:
+    -----------
+    pcd : open3d.geometry.PointCloud
+        La nube de puntos de entrada, con o sin colores.
+    custom_scale_factor : float
+        Factor de escala de la proyeccion.
+    collision : str
+        Política cuando varios puntos caen en el mismo pixel:
+        - "last": gana el último punto de la nube (resultado idéntico a la
+          versión original con bucle).
+        - "nearest": gana el punto con mayor Z (z-buffer).
+        - "mean": se promedia el color de todos los puntos del pixel.
+    splat_radius : int o "auto"
+        Radio en píxeles de la huella (disco) de cada punto. Con 0 (por defecto)
+        cada punto ocupa un único pixel. Con "auto" el radio de cada punto se
+        deriva de la distancia a su vecino más cercano, de modo que la imagen
+        sale densa sin necesidad de rellenar huecos. Los píxeles en los que cae
+        un punto directamente siempre tienen prioridad sobre las huellas.
+    grid : ProjectionGrid
+        Rejilla fija (lienzo común a varias nubes, ver `POP2.canvas`). Si se
+        indica, se ignora `custom_scale_factor`, la imagen tiene siempre el
+        tamaño de la rejilla y los puntos que caen fuera se descartan.
+
+    Retorna:
+    --------
+    img : numpy.ndarray
+        Imagen en formato RGB (uint8) con la nube proyectada.
+    """
+    points = np.asarray(pcd.points)  # (N,3)
+    colors = np.asarray(pcd.colors)  # (N,3) en [0,1] si existen
+
+    radio, spacing = _splat_arguments(pcd, splat_radius)
+    img, _ = _rasterize(points, colors, custom_scale_factor, collision, radio, spacing, grid)
     return img
 
 
+def point_cloud_to_image_with_maps(pcd, custom_scale_factor=1, collision="nearest", splat_radius=0):
+    """
+    Proyecta la nube igual que `point_cloud_to_image`, pero conservando la
+    información de profundidad. En una sola pasada vectorizada se obtienen la
+    imagen RGB, el mapa de profundidad y el mapa de índices de los puntos.
+
+    Parámetros:
+    -----------
+    pcd : open3d.geometry.PointCloud
+        La nube de puntos de entrada, con o sin colores.
+    custom_scale_factor : float
+        Factor de escala de la proyeccion.
+    collision : str
+        "nearest" (z-buffer, por defecto) o "last". La política "mean" no
+        define un único punto por pixel y no está permitida aquí.
+    splat_radius : int o "auto"
+        Radio de la huella de cada punto (ver `point_cloud_to_image`).
+
+    Retorna:
+    --------
+    img : numpy.ndarray
+        Imagen en formato RGB (uint8) con la nube proyectada.
+    depth : numpy.ndarray
+        Mapa (H, W) float32 con la Z del punto visible en cada pixel
+        (NaN en los píxeles vacíos).
+    index_map : numpy.ndarray
+        Mapa (H, W) int32 con el índice del punto visible en cada pixel
+        (-1 en los píxeles vacíos).
+    """
+    if collision == "mean":
+        raise ValueError("La política 'mean' no genera mapas de profundidad ni de índices.")
+
+    points = np.asarray(pcd.points)  # (N,3)
+    colors = np.asarray(pcd.colors)  # (N,3) en [0,1] si existen
 
+    radio, spacing = _splat_arguments(pcd, splat_radius)
+    img, index_map = _rasterize(points, colors, custom_scale_factor, collision, radio, spacing)
 
-# # Re-mapear los colores modificados a la nube
-# imagen_modificada = cv2.imread(modified_img_path)
-# if imagen_modificada is None:
-#     raise ValueError("No se pudo cargar 'imagen_modificada.png'")
+    depth = np.full(index_map.shape, np.nan, dtype=np.float32)
+    ocupados = index_map >= 0
+    depth[ocupados] = points[index_map[ocupados], 2]
 
-# imagen_modificada_rgb = cv2.cvtColor(imagen_modificada, cv2.COLOR_BGR2RGB)
+    return img, depth, index_map
 
-# new_colors = []
-# for (xp, yp) in zip(x_pixels, y_pixels):
-#     if 0 <= xp < imagen_modificada_rgb.shape[1] and 0 <= yp < imagen_modificada_rgb.shape[0]:
-#         r,g,b = imagen_modificada_rgb[yp, xp]
-#         new_colors.append((r/255.0, g/255.0, b/255.0))
-#     else:
-#         new_colors.append((0.0,0.0,0.0))
 
-# new_colors_arr = np.array(new_colors, dtype=np.float64)
+def remap_image_colors_to_pcd(pcd, imagen_rgb, index_map):
+    """
+    Re-mapea los colores de una imagen (por ejemplo, la imagen modificada) a
+    los puntos de la nube usando el mapa de índices de la proyección. El coste
+    es proporcional al número de píxeles; los puntos que no son visibles en
+    ningún pixel conservan su color original (negro si la nube no tenía colores).
 
-# if len(new_colors_arr) != len(pcd.points):
-#     raise ValueError("La cantidad de colores no coincide con la cantidad de puntos.")
+    Parámetros:
+    -----------
+    pcd : open3d.geometry.PointCloud
+        Nube de puntos que se proyectó para obtener `index_map`.
+    imagen_rgb : numpy.ndarray
+        Imagen (H, W, 3) en RGB uint8 con el mismo tamaño que `index_map`.
+    index_map : numpy.ndarray
+        Mapa de índices devuelto por `point_cloud_to_image_with_maps`.
+
+    Retorna:
+    --------
+    pcd : open3d.geometry.PointCloud
+        La misma nube, con los colores actualizados.
+    """
+    import open3d as o3d
+
+    if imagen_rgb.shape[:2] != index_map.shape:
+        raise ValueError("La imagen y el mapa de índices no tienen el mismo tamaño.")
+
+    n_points = len(pcd.points)
+    if len(pcd.colors) == n_points:
+        new_colors = np.asarray(pcd.colors).copy()
+    else:
+        new_colors = np.zeros((n_points, 3), dtype=np.float64)
 
-# pcd.colors = o3d.utility.Vector3dVector(new_colors_arr)
+    ocupados = index_map >= 0
+    new_colors[index_map[ocupados]] = imagen_rgb[ocupados] / 255.0
 
+    pcd.colors = o3d.utility.Vector3dVector(new_colors)
+    return pcd
@@ -0,0 +1,95 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+
+class ImageWriter:
+    """
+    Escritura de imágenes en segundo plano con un pool de hilos. La
+    codificación PNG de OpenCV libera el GIL, así que el hilo que genera las
+    imágenes no espera al disco. El número de imágenes pendientes está acotado
+    por `max_pending` para que la memoria no crezca si el disco es más lento
+    que el cálculo.
+
+    Se usa como gestor de contexto; al salir se espera a que terminen todas las
+    escrituras y se lanza IOError si alguna falló.
+
+    Parámetros:
+    -----------
+    max_workers : int
+        Número de hilos de escritura.
+    max_pending : int
+        Máximo de imágenes en cola o escribiéndose (por defecto, 4 por hilo).
+    params : list
+        Parámetros de cv2.imwrite (por ejemplo, `png_params(3)`).
+    """
+
+    def __init__(self, max_workers=4, max_pending=None, params=None):
+        self.pool = ThreadPoolExecutor(max_workers=max_workers)
+        self.params = params or []
+        self.pendientes = threading.BoundedSemaphore(max_pending or 4 * max_workers)
+        self.lock = threading.Lock()
+        self.errores = []
+
+    def write(self, path, img, meta=None):
+        """
+        Encola la escritura de `img` en `path`. Bloquea si ya hay `max_pending`
+        imágenes pendientes. La imagen no debe modificarse después. Los
+        metadatos (`meta`) se ignoran: el nombre del archivo ya los contiene.
+
+        Retorna:
+        --------
+        futuro : concurrent.futures.Future
+            Su resultado es True si la imagen se guardó y False si falló.
+        """
+        self.pendientes.acquire()
+        try:
+            return self.pool.submit(self._write, path, img)
+        except Exception:
+            self.pendientes.release()
+            raise
+
+    def _write(self, path, img):
+        try:
+            if not cv2.imwrite(path, img, self.params):
+                raise IOError(f"No se pudo guardar la imagen {path}")
+            return True
+        except Exception as e:
+            with self.lock:
+                self.errores.append(e)
+            return False
+        finally:
+            self.pendientes.release()
+
+    def close(self):
+        """
+        Espera a que terminen todas las escrituras pendientes.
+        """
+        self.pool.shutdown(wait=True)
+        if self.errores:
+            raise IOError(f"Fallaron {len(self.errores)} escrituras; la primera: {self.errores[0]}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            # No ocultar la excepción original con los errores de escritura
+            self.pool.shutdown(wait=True)
+        return False
+
+
+def png_params(compression=None):
+    """
+    Parámetros de cv2.imwrite para guardar PNG con el nivel de compresión
+    indicado (0 = sin comprimir y más rápido, 9 = archivos más pequeños y más
+    lento). Con None se usa el nivel por defecto de OpenCV.
+    """
+    if compression is None:
+        return []
+    if not 0 <= compression <= 9:
+        raise ValueError(f"El nivel de compresión PNG debe estar entre 0 y 9, no {compression}")
+    return [cv2.IMWRITE_PNG_COMPRESSION, int(compression)]
@@ -0,0 +1,150 @@
+import contextlib
+import contextvars
+import json
+import time
+import tracemalloc
+
+# Registro activo en el contexto actual (None = instrumentación desactivada)
+_recorder = contextvars.ContextVar("pop2_recorder", default=None)
+
+
+class StageRecorder:
+    """
+    Acumula los eventos de las etapas instrumentadas mientras está activo
+    (ver `recording`). Cada evento es un dict con 'stage', 'seconds', los
+    contadores de la etapa (puntos, píxeles, ...), las etiquetas del registro
+    y, si se mide la memoria, 'alloc_mb' (pico de memoria reservada durante
+    la etapa por encima de la que había al empezar).
+    """
+
+    def __init__(self, callback=None, track_memory=False, labels=None):
+        self.callback = callback
+        self.track_memory = track_memory
+        self.labels = labels or {}
+        self.events = []
+        # Pila de etapas abiertas, para medir la memoria de etapas anidadas
+        self.pila = []
+
+    def emit(self, event):
+        event = dict(self.labels, **event)
+        self.events.append(event)
+        if self.callback is not None:
+            self.callback(event)
+
+
+@contextlib.contextmanager
+def recording(callback=None, track_memory=False, **labels):
+    """
+    Activa la instrumentación dentro del bloque `with`. Fuera de él, las
+    etapas no registran nada y su coste es despreciable.
+
+    Parámetros:
+    -----------
+    callback : callable
+        Función que recibe cada evento en cuanto termina la etapa (por
+        ejemplo, para escribirlo como log estructurado con `json_lines`).
+    track_memory : bool
+        Si es True, se mide con tracemalloc la memoria reservada por cada
+        etapa (incluye los arreglos de numpy). Ralentiza algo la ejecución.
+    labels :
+        Etiquetas que se añaden a todos los eventos (por ejemplo, path=...).
+
+    Retorna:
+    --------
+    recorder : StageRecorder
+        Con los eventos registrados en `recorder.events`.
+    """
+    recorder = StageRecorder(callback, track_memory, labels)
+    iniciar_tracemalloc = track_memory and not tracemalloc.is_tracing()
+    if iniciar_tracemalloc:
+        tracemalloc.start()
+    token = _recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _recorder.reset(token)
+        if iniciar_tracemalloc:
+            tracemalloc.stop()
+
+
+@contextlib.contextmanager
+def stage(name, **counts):
+    """
+    Mide la duración de una etapa si hay un registro activo. Devuelve un dict
+    en el que se pueden añadir contadores conocidos al final de la etapa:
+
+        with stage("project", points=n) as info:
+            img = ...
+            info["pixels"] = img.shape[0] * img.shape[1]
+    """
+    recorder = _recorder.get()
+    if recorder is None:
+        yield counts
+        return
+
+    medir_memoria = recorder.track_memory and tracemalloc.is_tracing()
+    if medir_memoria:
+        # Guardar el pico de la etapa exterior antes de reiniciarlo
+        actual, pico = tracemalloc.get_traced_memory()
+        if recorder.pila:
+            recorder.pila[-1]["pico"] = max(recorder.pila[-1]["pico"], pico)
+        tracemalloc.reset_peak()
+        recorder.pila.append({"base": actual, "pico": 0})
+
+    inicio = time.perf_counter()
+    try:
+        yield counts
+    finally:
+        event = {"stage": name, "seconds": time.perf_counter() - inicio, **counts}
+        if medir_memoria:
+            marco = recorder.pila.pop()
+            pico = max(tracemalloc.get_traced_memory()[1], marco["pico"])
+            event["alloc_mb"] = (pico - marco["base"]) / (1 << 20)
+            if recorder.pila:
+                recorder.pila[-1]["pico"] = max(recorder.pila[-1]["pico"], pico)
+        recorder.emit(event)
+
+
+def json_lines(archivo):
+    """
+    Callback que escribe cada evento como una línea JSON en un archivo abierto.
+    """
+    def callback(event):
+        archivo.write(json.dumps(event) + "\n")
+    return callback
+
+
+def summarize(events):
+    """
+    Agrega los eventos por etapa (por ejemplo, los de todo un lote).
+
+    Retorna:
+    --------
+    resumen : dict
+        Etapa -> {'calls', 'total_s', 'mean_s', 'max_s'} y, si hay medidas de
+        memoria, 'alloc_mb_max'. Las etapas aparecen en el orden en que se
+        registraron por primera vez.
+    """
+    resumen = {}
+    for event in events:
+        r = resumen.setdefault(event["stage"], {"calls": 0, "total_s": 0.0, "max_s": 0.0})
+        r["calls"] += 1
+        r["total_s"] += event["seconds"]
+        r["max_s"] = max(r["max_s"], event["seconds"])
+        if "alloc_mb" in event:
+            r["alloc_mb_max"] = max(r.get("alloc_mb_max", 0.0), event["alloc_mb"])
+    for r in resumen.values():
+        r["mean_s"] = r["total_s"] / r["calls"]
+    return resumen
+
+
+def format_summary(resumen):
+    """
+    Tabla de texto con el resumen de `summarize`.
+    """
+    lineas = [f"{'etapa':<14}{'llamadas':>9}{'total (s)':>11}{'media (s)':>11}{'máx (s)':>10}{'memoria (MB)':>14}"]
+    for nombre, r in resumen.items():
+        memoria = f"{r['alloc_mb_max']:.1f}" if "alloc_mb_max" in r else "-"
+        lineas.append(f"{nombre:<14}{r['calls']:>9}{r['total_s']:>11.3f}{r['mean_s']:>11.4f}"
+                      f"{r['max_s']:>10.4f}{memoria:>14}")
+    return "\n".join(lineas)
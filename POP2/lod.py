@@ -0,0 +1,219 @@
+import argparse
+import sys
+import time
+
+import numpy as np
+from POP2.extract_image_pcd import grid_from_bounds, point_cloud_to_image
+
+
+def lod_voxel_size(lod, scale_factor):
+    """
+    Lado del vóxel (en unidades de la nube) para un nivel de detalle.
+
+    Parámetros:
+    -----------
+    lod : "auto" o float
+        Con "auto" el vóxel mide exactamente un pixel de la imagen de salida
+        (1 / scale_factor). Un número se interpreta como el lado del vóxel.
+    scale_factor : float
+        Escala efectiva de la proyección (píxeles por unidad).
+    """
+    if lod == "auto":
+        return 1.0 / scale_factor
+    if isinstance(lod, str) or float(lod) <= 0:
+        raise ValueError(f"lod debe ser 'auto' o un tamaño de vóxel > 0, no {lod!r}")
+    return float(lod)
+
+
+def voxel_downsample(points, colors, voxel_size, origin=None):
+    """
+    Reduce la nube a un punto por vóxel ocupado, con la posición y el color
+    promedio de los puntos del vóxel. Es vectorizado (un `np.unique` y un
+    `np.bincount` por coordenada) y determinista: los puntos resultantes
+    quedan ordenados por vóxel, con Z como eje más rápido.
+
+    Parámetros:
+    -----------
+    points : numpy.ndarray
+        Puntos (N,3).
+    colors : numpy.ndarray
+        Colores (N,3) en [0,1], o un arreglo vacío si la nube no tiene color.
+    voxel_size : float
+        Lado del vóxel, en unidades de la nube.
+    origin : secuencia
+        Esquina de la rejilla de vóxeles (por defecto, el mínimo de los
+        puntos). Alinearla con la rejilla de proyección hace que cada vóxel
+        caiga dentro de un único pixel.
+
+    Retorna:
+    --------
+    points, colors : numpy.ndarray
+        Puntos y colores reducidos (colors vacío si la entrada no tenía).
+    """
+    if len(points) == 0:
+        return points, colors
+
+    origin = points.min(axis=0) if origin is None else np.asarray(origin, dtype=np.float64)
+    celdas = np.floor((points - origin) / voxel_size).astype(np.int64)
+    celdas -= celdas.min(axis=0)
+    claves = np.ravel_multi_index(celdas.T, celdas.max(axis=0) + 1)
+
+    _, inversa, conteo = np.unique(claves, return_inverse=True, return_counts=True)
+    n_voxels = len(conteo)
+
+    def promedio(valores):
+        return np.stack([np.bincount(inversa, weights=valores[:, c], minlength=n_voxels)
+                         for c in range(valores.shape[1])], axis=1) / conteo[:, np.newaxis]
+
+    colores = promedio(colors) if len(colors) == len(points) else colors
+    return promedio(points), colores
+
+
+def lod_downsample(pcd, lod="auto", scale_factor=1, grid=None):
+    """
+    Etapa de nivel de detalle previa a la proyección. Las nubes del escáner
+    son mucho más densas que la rejilla de píxeles, así que muchos puntos
+    acaban en el mismo pixel; aquí se sustituyen por su promedio por vóxel.
+
+    La rejilla de proyección se calcula (si no se indica) a partir de la nube
+    completa, de modo que la imagen tiene el mismo tamaño con y sin reducción,
+    y los vóxeles se alinean con ella: con lod="auto" cada vóxel es un pixel y
+    la ocupación de la imagen no cambia.
+
+    Parámetros:
+    -----------
+    pcd : open3d.geometry.PointCloud
+        Nube de puntos (ya recortada).
+    lod : "auto" o float
+        Tamaño del vóxel (ver `lod_voxel_size`).
+    scale_factor : float
+        Factor de escala de la proyección (se ignora si se indica `grid`).
+    grid : ProjectionGrid
+        Rejilla de proyección fija (ver `POP2.canvas`).
+
+    Retorna:
+    --------
+    pcd : open3d.geometry.PointCloud
+        Nube reducida.
+    grid : ProjectionGrid
+        Rejilla con la que debe proyectarse la nube reducida.
+    """
+    import open3d as o3d
+
+    points = np.asarray(pcd.points)
+    if len(points) == 0:
+        raise ValueError("La nube de puntos está vacía.")
+    if grid is None:
+        x_min, y_min = points[:, :2].min(axis=0)
+        x_max, y_max = points[:, :2].max(axis=0)
+        grid = grid_from_bounds(x_min, x_max, y_min, y_max, scale_factor)
+
+    origin = (grid.x_min, grid.y_min, points[:, 2].min())
+    puntos, colores = voxel_downsample(points, np.asarray(pcd.colors),
+                                       lod_voxel_size(lod, grid.scale_factor), origin)
+
+    reducida = o3d.geometry.PointCloud()
+    reducida.points = o3d.utility.Vector3dVector(puntos)
+    if len(colores):
+        reducida.colors = o3d.utility.Vector3dVector(colores)
+    return reducida, grid
+
+
+def lod_quality(pcd, scale_factor=5, cut_percentage=60, lod="auto", collision="last", splat_radius=0):
+    """
+    Compara la proyección de la nube completa con la de la nube reducida
+    sobre la misma rejilla.
+
+    Parámetros:
+    -----------
+    pcd : open3d.geometry.PointCloud o str
+        Nube de puntos o ruta al archivo .ply.
+    scale_factor, cut_percentage, collision, splat_radius :
+        Parámetros de la proyección (ver `process_cloud`).
+    lod : "auto" o float
+        Nivel de detalle que se evalúa.
+
+    Retorna:
+    --------
+    informe : dict
+        'points' y 'lod_points' (puntos proyectados), 'reduction' (factor de
+        reducción), 'voxel_size', 'project_s' y 'lod_project_s' (tiempo de
+        proyección sin y con la reducción, incluida esta), 'coverage_iou'
+        (intersección sobre unión de los píxeles ocupados), 'missing_pixels' y
+        'extra_pixels', y 'mean_abs_diff', 'max_abs_diff' y 'psnr_db' del color
+        en los píxeles ocupados en ambas imágenes.
+    imagenes : dict
+        'full', 'lod' (RGB) y 'diff' (diferencia absoluta por canal).
+    """
+    from POP2.pipeline import load_point_cloud
+    from POP2.util import filter_pcd_percentage
+
+    if isinstance(pcd, str):
+        pcd = load_point_cloud(pcd)
+    pcd = filter_pcd_percentage(pcd, cut_percentage)
+
+    inicio = time.perf_counter()
+    completa = point_cloud_to_image(pcd, scale_factor, collision, splat_radius)
+    project_s = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    reducida, grid = lod_downsample(pcd, lod, scale_factor)
+    img_lod = point_cloud_to_image(reducida, collision=collision, splat_radius=splat_radius, grid=grid)
+    lod_project_s = time.perf_counter() - inicio
+
+    ocupados = np.any(completa != 0, axis=2)
+    ocupados_lod = np.any(img_lod != 0, axis=2)
+    ambos = ocupados & ocupados_lod
+    union = np.count_nonzero(ocupados | ocupados_lod)
+
+    diff = np.abs(completa.astype(np.int16) - img_lod.astype(np.int16)).astype(np.uint8)
+    errores = diff[ambos].astype(np.float64)
+    mse = float(np.mean(errores ** 2)) if errores.size else 0.0
+
+    informe = {
+        "points": len(pcd.points),
+        "lod_points": len(reducida.points),
+        "reduction": len(pcd.points) / max(len(reducida.points), 1),
+        "voxel_size": lod_voxel_size(lod, grid.scale_factor),
+        "project_s": project_s,
+        "lod_project_s": lod_project_s,
+        "coverage_iou": np.count_nonzero(ambos) / union if union else 1.0,
+        "missing_pixels": int(np.count_nonzero(ocupados & ~ocupados_lod)),
+        "extra_pixels": int(np.count_nonzero(ocupados_lod & ~ocupados)),
+        "mean_abs_diff": float(errores.mean()) if errores.size else 0.0,
+        "max_abs_diff": int(errores.max()) if errores.size else 0,
+        "psnr_db": 10 * np.log10(255 ** 2 / mse) if mse > 0 else float("inf"),
+    }
+    return informe, {"full": completa, "lod": img_lod, "diff": diff}
+
+
+def _lod_arg(value):
+    return value if value == "auto" else float(value)
+
+
+def main(argv=None):
+    import cv2
+
+    parser = argparse.ArgumentParser(description="Compara la proyección de una nube con y sin reducción por vóxeles.")
+    parser.add_argument("pcd", help="Archivo .ply.")
+    parser.add_argument("--lod", type=_lod_arg, default="auto", help="'auto' (un vóxel por pixel) o lado del vóxel.")
+    parser.add_argument("--cut-percentage", type=float, default=60)
+    parser.add_argument("--scale-factor", type=float, default=5)
+    parser.add_argument("--collision", choices=("last", "nearest", "mean"), default="last")
+    parser.add_argument("--diff", default=None,
+                        help="Guardar en este archivo la diferencia absoluta entre ambas imágenes (amplificada x4).")
+    args = parser.parse_args(argv)
+
+    informe, imagenes = lod_quality(args.pcd, args.scale_factor, args.cut_percentage, args.lod, args.collision)
+    for clave, valor in informe.items():
+        print(f"{clave:>15}: {valor:.4g}" if isinstance(valor, float) else f"{clave:>15}: {valor}")
+
+    if args.diff:
+        diff = np.clip(imagenes["diff"].astype(np.int32) * 4, 0, 255).astype(np.uint8)
+        cv2.imwrite(args.diff, cv2.cvtColor(diff, cv2.COLOR_RGB2BGR))
+        print("Diferencia guardada en", args.diff)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+import hashlib
+import json
+import os
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """
+    Calcula el hash SHA-256 del contenido de un archivo leyéndolo por bloques.
+    """
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for bloque in iter(lambda: f.read(chunk_size), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def file_stat(path):
+    """
+    Tamaño y fecha de modificación del archivo, usados para evitar recalcular
+    el hash de las entradas que no han cambiado.
+    """
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def load_manifest(output_path):
+    """
+    Carga el manifiesto de la carpeta de salida. Devuelve un manifiesto vacío si
+    no existe o si fue escrito por una versión distinta.
+    """
+    path = os.path.join(output_path, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {"version": MANIFEST_VERSION, "entries": {}}
+
+    with open(path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {"version": MANIFEST_VERSION, "entries": {}}
+    return manifest
+
+
+def save_manifest(output_path, manifest):
+    """
+    Guarda el manifiesto de forma atómica (archivo temporal + os.replace), para
+    que una interrupción nunca deje un manifiesto a medio escribir.
+    """
+    path = os.path.join(output_path, MANIFEST_NAME)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def _stored_params(entry):
+    # Los manifiestos anteriores guardaban chunk_size (no cambia las salidas) y
+    # splat_radius aunque fuera 0; ya no se guardan, así que se ignoran al comparar
+    params = dict(entry.get("params") or {})
+    params.pop("chunk_size", None)
+    if params.get("splat_radius") == 0:
+        del params["splat_radius"]
+    return params
+
+
+def make_entry(pcd_path, digest, stat, params, outputs):
+    """
+    Crea la entrada del manifiesto para una nube procesada correctamente.
+    """
+    return {"path": pcd_path, "sha256": digest, "size": stat["size"], "mtime_ns": stat["mtime_ns"],
+            "params": params, "outputs": list(outputs)}
+
+
+def entry_matches(entry, params, outputs, stat=None, digest=None):
+    """
+    Indica si una entrada del manifiesto sigue vigente: mismos parámetros,
+    salidas presentes en disco y mismo contenido de entrada. El contenido se
+    compara por hash si se indica `digest`; si solo se indica `stat`, se
+    compara por tamaño y fecha de modificación.
+    """
+    if entry is None or entry.get("outputs") != list(outputs):
+        return False
+    if _stored_params(entry) != params:
+        return False
+    if not all(os.path.exists(path) for path in outputs):
+        return False
+    if digest is not None:
+        return entry.get("sha256") == digest
+    if stat is not None:
+        return entry.get("size") == stat["size"] and entry.get("mtime_ns") == stat["mtime_ns"]
+    return False
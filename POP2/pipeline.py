@@ -0,0 +1,143 @@
+import cv2
+from POP2.extract_image_pcd import ProjectionGrid, point_cloud_to_image
+from POP2.instrument import stage
+from POP2.lod import lod_downsample
+from POP2.ply_stream import project_ply
+from POP2.util import (create_mask, filter_pcd_percentage, fill_missing_pixels, fill_missing_pixels_nearest,
+                       fill_missing_pixels_preserve_borders)
+
+
+def _fill_nearest(imagen, iteraciones=1):
+    # Cada iteración del relleno por promedio avanza un píxel: se usa el mismo
+    # número como distancia máxima al píxel válido más cercano
+    return fill_missing_pixels_nearest(imagen, max_distancia=iteraciones)
+
+
+# Métodos de relleno disponibles para process_cloud
+FILL_METHODS = {
+    "basic": fill_missing_pixels,
+    "preserve_borders": fill_missing_pixels_preserve_borders,
+    "nearest": _fill_nearest,
+}
+
+
+def load_point_cloud(pcd_path):
+    """
+    Carga una nube de puntos .ply con Open3D y verifica que no esté vacía.
+    """
+    # Open3D tarda en importarse: solo se carga cuando se lee una nube completa
+    import open3d as o3d
+
+    with stage("load") as info:
+        pcd = o3d.io.read_point_cloud(pcd_path)
+        info["points"] = len(pcd.points)
+    if pcd.is_empty():
+        raise ValueError(f"No se pudo cargar la nube de puntos desde {pcd_path}")
+    return pcd
+
+
+def process_cloud(pcd, cut_percentage=60, scale_factor=5, fillrgb_iterations=1, fillmask_iterations=1,
+                  fill_method="basic", splat_radius=0, chunk_size=None, grid=None, lod=None):
+    """
+    Ejecuta todo el flujo (carga -> recorte -> proyección -> máscara -> relleno)
+    en memoria, sin escribir ni leer archivos intermedios.
+
+    Parámetros:
+    -----------
+    pcd : open3d.geometry.PointCloud o str
+        Nube de puntos ya cargada o ruta al archivo .ply.
+    cut_percentage : float
+        Porcentaje de recorte en Z (ver `filter_pcd_percentage`).
+    scale_factor : float
+        Factor de escala de la proyección.
+    fillrgb_iterations, fillmask_iterations : int
+        Iteraciones de relleno para la imagen de color y para la máscara.
+    fill_method : str
+        "basic" (`fill_missing_pixels`), "preserve_borders"
+        (`fill_missing_pixels_preserve_borders`, experimental) o "nearest"
+        (`fill_missing_pixels_nearest`, con las iteraciones como distancia máxima).
+    splat_radius : int o "auto"
+        Huella de cada punto en la proyección (ver `point_cloud_to_image`).
+        Con "auto" la imagen sale prácticamente densa y se pueden usar 0
+        iteraciones de relleno.
+    chunk_size : int
+        Si se indica y `pcd` es una ruta, el recorte y la proyección se hacen
+        recorriendo el archivo por bloques de `chunk_size` vértices (ver
+        `project_ply`), con memoria acotada sea cual sea el tamaño de la nube.
+    grid : ProjectionGrid o secuencia
+        Rejilla fija común a varias nubes (ver `POP2.canvas`). Si se indica, la
+        imagen tiene siempre el tamaño de la rejilla y `scale_factor` se ignora.
+    lod : None, "auto" o float
+        Reducción de la nube por vóxeles antes de proyectar (ver
+        `POP2.lod.lod_downsample`). Con "auto" cada vóxel mide un pixel de la
+        imagen y está alineado con ella; un número es el lado del vóxel en
+        unidades de la nube. Con None (por defecto) no se reduce.
+
+    Cada paso es una etapa instrumentada ('load', 'filter', 'lod', 'project' o
+    'project_ply', 'mask', 'fill_color', 'fill_mask'; ver
+    `POP2.instrument.recording`).
+
+    Retorna:
+    --------
+    color : numpy.ndarray
+        Imagen de color rellenada, en BGR (lista para cv2.imwrite).
+    mask : numpy.ndarray
+        Máscara rellenada, en BGR.
+    """
+    if fill_method not in FILL_METHODS:
+        raise ValueError(f"Método de relleno no soportado: {fill_method}. "
+                         f"Opciones: {tuple(FILL_METHODS)}")
+    fill = FILL_METHODS[fill_method]
+    if grid is not None:
+        # Admite también la rejilla como lista (por ejemplo, leída de un JSON)
+        grid = ProjectionGrid(*grid)
+
+    if chunk_size is not None:
+        if not isinstance(pcd, str):
+            raise ValueError("La lectura por bloques requiere la ruta al archivo .ply.")
+        if splat_radius:
+            raise ValueError("La lectura por bloques no admite splat_radius.")
+        if lod is not None:
+            raise ValueError("La lectura por bloques no admite lod.")
+
+        # 1-2. Recorte y proyección recorriendo el archivo por bloques
+        with stage("project_ply") as info:
+            img = project_ply(pcd, scale_factor, cut_percentage, chunk_size=chunk_size, grid=grid)
+            info["pixels"] = img.shape[0] * img.shape[1]
+    else:
+        # 1. Cargar nube de puntos
+        propia = isinstance(pcd, str)
+        if propia:
+            pcd = load_point_cloud(pcd)
+
+        # Filtrado por porcentaje (sin copiar si no se descarta nada y la nube se cargó aquí)
+        with stage("filter", points=len(pcd.points)) as info:
+            pcd = filter_pcd_percentage(pcd, cut_percentage, copy=not propia)
+            info["kept_points"] = len(pcd.points)
+
+        # Nivel de detalle: un punto por vóxel, con la rejilla de la nube completa
+        if lod is not None:
+            with stage("lod", points=len(pcd.points)) as info:
+                pcd, grid = lod_downsample(pcd, lod, scale_factor, grid)
+                info["kept_points"] = len(pcd.points)
+
+        # 2. Imagen proyectada
+        with stage("project", points=len(pcd.points)) as info:
+            img = point_cloud_to_image(pcd, scale_factor, splat_radius=splat_radius, grid=grid)
+            info["pixels"] = img.shape[0] * img.shape[1]
+
+    # RGB -> BGR, igual que al guardarla con OpenCV
+    img = cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
+    pixels = img.shape[0] * img.shape[1]
+
+    # 3. Mascara: píxeles no negros en blanco
+    with stage("mask", pixels=pixels):
+        mask = create_mask(img, (255,255,255))
+
+    # 4. Relleno de pixeles
+    with stage("fill_color", pixels=pixels):
+        color = fill(img, iteraciones=fillrgb_iterations)
+    with stage("fill_mask", pixels=pixels):
+        mask = fill(mask, iteraciones=fillmask_iterations)
+
+    return color, mask
@@ -0,0 +1,305 @@
+import itertools
+
+import numpy as np
+from POP2.extract_image_pcd import ChunkedProjection, grid_from_bounds
+
+# Número de vértices por bloque al recorrer un archivo .ply
+DEFAULT_CHUNK_SIZE = 1_000_000
+
+# Tipos de las propiedades PLY y su equivalente en numpy
+PLY_DTYPES = {
+    "char": "i1", "int8": "i1", "uchar": "u1", "uint8": "u1",
+    "short": "i2", "int16": "i2", "ushort": "u2", "uint16": "u2",
+    "int": "i4", "int32": "i4", "uint": "u4", "uint32": "u4",
+    "float": "f4", "float32": "f4", "double": "f8", "float64": "f8",
+}
+
+PLY_FORMATS = {"ascii": None, "binary_little_endian": "<", "binary_big_endian": ">"}
+
+
+def read_ply_header(path):
+    """
+    Lee la cabecera de un archivo .ply.
+
+    Retorna:
+    --------
+    header : dict
+        'format' (ascii, binary_little_endian o binary_big_endian),
+        'elements' (lista de (nombre, número, [(propiedad, tipo)]), donde el tipo
+        es None para las propiedades de tipo lista) y 'size' (bytes de la cabecera).
+    """
+    with open(path, "rb") as f:
+        if f.readline().strip() != b"ply":
+            raise ValueError(f"El archivo no es un PLY válido: {path}")
+
+        formato = None
+        elementos = []
+        for linea in f:
+            partes = linea.decode("ascii", errors="replace").split()
+            if not partes or partes[0] in ("comment", "obj_info"):
+                continue
+            if partes[0] == "format":
+                formato = partes[1]
+            elif partes[0] == "element":
+                elementos.append((partes[1], int(partes[2]), []))
+            elif partes[0] == "property":
+                if partes[1] == "list":
+                    elementos[-1][2].append((partes[-1], None))
+                else:
+                    elementos[-1][2].append((partes[2], PLY_DTYPES[partes[1]]))
+            elif partes[0] == "end_header":
+                break
+        else:
+            raise ValueError(f"Cabecera PLY incompleta: {path}")
+        size = f.tell()
+
+    if formato not in PLY_FORMATS:
+        raise ValueError(f"Formato PLY no soportado: {formato}")
+    return {"format": formato, "elements": elementos, "size": size}
+
+
+def _vertex_element(header):
+    """
+    Devuelve (posición, número de vértices, propiedades) del elemento 'vertex'.
+    """
+    for i, (nombre, count, propiedades) in enumerate(header["elements"]):
+        if nombre == "vertex":
+            return i, count, propiedades
+    raise ValueError("El archivo PLY no contiene vértices.")
+
+
+def vertex_memmap(path, header=None):
+    """
+    Mapea en memoria (sin copiarlos) los vértices de un PLY binario como un
+    arreglo estructurado de numpy con un campo por propiedad.
+    """
+    header = header or read_ply_header(path)
+    endian = PLY_FORMATS[header["format"]]
+    if endian is None:
+        raise ValueError("Solo los PLY binarios se pueden mapear en memoria.")
+
+    posicion, count, propiedades = _vertex_element(header)
+    offset = header["size"]
+    for nombre, n, props in header["elements"][:posicion]:
+        if any(tipo is None for _, tipo in props):
+            raise ValueError(f"El elemento '{nombre}' de tamaño variable precede a los vértices.")
+        offset += n * np.dtype([(p, endian + t) for p, t in props]).itemsize
+
+    if any(tipo is None for _, tipo in propiedades):
+        raise ValueError("Los vértices con propiedades de tipo lista no están soportados.")
+    dtype = np.dtype([(p, endian + t) for p, t in propiedades])
+    return np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(count,))
+
+
+def _color_fields(nombres):
+    for campos in (("red", "green", "blue"), ("r", "g", "b"), ("diffuse_red", "diffuse_green", "diffuse_blue")):
+        if all(c in nombres for c in campos):
+            return campos
+    return None
+
+
+def _normalize_colors(colores, dtype):
+    # Igual que Open3D: los colores enteros se escalan a [0,1] según su tipo
+    if np.issubdtype(dtype, np.integer):
+        return colores / float(np.iinfo(dtype).max)
+    return colores.astype(np.float64)
+
+
+def _iter_ascii_rows(path, header, chunk_size):
+    """
+    Recorre por bloques las filas de vértices de un PLY ASCII.
+    """
+    posicion, count, propiedades = _vertex_element(header)
+    # Líneas de los elementos anteriores a los vértices (una por elemento)
+    saltar = sum(n for _, n, _ in header["elements"][:posicion])
+    with open(path, "rb") as f:
+        f.seek(header["size"])
+        lineas = itertools.islice(f, saltar, saltar + count)
+        while True:
+            bloque = list(itertools.islice(lineas, chunk_size))
+            if not bloque:
+                break
+            yield np.loadtxt(bloque, dtype=np.float64, ndmin=2, usecols=range(len(propiedades)))
+
+
+def iter_ply_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE, colors=True):
+    """
+    Recorre los vértices de un archivo .ply por bloques de `chunk_size`, de
+    modo que la memoria usada no depende del tamaño de la nube. Los PLY
+    binarios se mapean en memoria; los ASCII se leen línea a línea.
+
+    Parámetros:
+    -----------
+    path : str
+        Ruta al archivo .ply.
+    chunk_size : int
+        Número de vértices por bloque.
+    colors : bool
+        Si es False no se leen los colores.
+
+    Retorna (generador):
+    --------------------
+    points : numpy.ndarray
+        Bloque (k,3) float64 con las coordenadas XYZ.
+    colors : numpy.ndarray o None
+        Bloque (k,3) float64 con los colores en [0,1], o None si la nube no
+        tiene colores.
+    """
+    header = read_ply_header(path)
+    _, _, propiedades = _vertex_element(header)
+    nombres = [p for p, _ in propiedades]
+    campos_color = _color_fields(nombres) if colors else None
+
+    if PLY_FORMATS[header["format"]] is None:
+        columnas_xyz = [nombres.index(c) for c in ("x", "y", "z")]
+        columnas_color = [nombres.index(c) for c in campos_color] if campos_color else None
+        tipo_color = np.dtype(dict(propiedades)[campos_color[0]]) if campos_color else None
+        for filas in _iter_ascii_rows(path, header, chunk_size):
+            bloque_colores = None
+            if columnas_color:
+                bloque_colores = _normalize_colors(filas[:, columnas_color].astype(tipo_color), tipo_color)
+            yield filas[:, columnas_xyz], bloque_colores
+        return
+
+    vertices = vertex_memmap(path, header)
+    for inicio in range(0, len(vertices), chunk_size):
+        bloque = vertices[inicio:inicio + chunk_size]
+        points = np.stack([bloque["x"], bloque["y"], bloque["z"]], axis=1).astype(np.float64)
+        bloque_colores = None
+        if campos_color:
+            tipo_color = bloque.dtype[campos_color[0]]
+            bloque_colores = _normalize_colors(np.stack([bloque[c] for c in campos_color], axis=1), tipo_color)
+        yield points, bloque_colores
+
+
+def percentile_rank(n, percentage):
+    """
+    Posición (fraccionaria) del percentil en la lista ordenada de `n` valores
+    y los dos índices vecinos, calculados exactamente como en np.percentile.
+    """
+    q = np.true_divide(percentage, 100)
+    rank = (n - 1) * q
+    rank_bajo = min(int(np.floor(rank)), n - 1)
+    rank_alto = min(rank_bajo + 1, n - 1)
+    return rank, rank_bajo, rank_alto
+
+
+def percentile_lerp(a, b, rank):
+    """
+    Interpolación lineal entre los valores vecinos del percentil, con la misma
+    fórmula que np.percentile (numpy._lerp).
+    """
+    gamma = rank - np.floor(rank)
+    diff = b - a
+    return b - diff * (1 - gamma) if gamma >= 0.5 else a + diff * gamma
+
+
+def ply_z_percentile(path, percentage, chunk_size=DEFAULT_CHUNK_SIZE, bins=1 << 16):
+    """
+    Percentil de la coordenada Z de un archivo .ply sin cargar la nube en
+    memoria, con el mismo resultado que np.percentile (interpolación lineal).
+
+    Se hacen tres pasadas por bloques: mínimo/máximo, histograma de Z y, por
+    último, solo se guardan los valores de los intervalos del histograma que
+    contienen los puntos buscados, que se ordenan para obtener el valor exacto.
+    """
+    n, z_min, z_max = 0, np.inf, -np.inf
+    for points, _ in iter_ply_chunks(path, chunk_size, colors=False):
+        if len(points):
+            n += len(points)
+            z_min = min(z_min, points[:, 2].min())
+            z_max = max(z_max, points[:, 2].max())
+    if n == 0:
+        raise ValueError("La nube de puntos está vacía.")
+    if z_min == z_max:
+        return z_min
+
+    # Rango (posición en la lista ordenada) como lo calcula np.percentile
+    rank, rank_bajo, rank_alto = percentile_rank(n, percentage)
+
+    def intervalo(z):
+        return np.clip(((z - z_min) * (bins / (z_max - z_min))).astype(np.int64), 0, bins - 1)
+
+    histograma = np.zeros(bins, dtype=np.int64)
+    for points, _ in iter_ply_chunks(path, chunk_size, colors=False):
+        histograma += np.bincount(intervalo(points[:, 2]), minlength=bins)
+    acumulado = np.cumsum(histograma)
+    b_bajo, b_alto = np.searchsorted(acumulado, [rank_bajo + 1, rank_alto + 1])
+
+    valores = []
+    for points, _ in iter_ply_chunks(path, chunk_size, colors=False):
+        z = points[:, 2]
+        i = intervalo(z)
+        valores.append(z[(i >= b_bajo) & (i <= b_alto)])
+    valores = np.sort(np.concatenate(valores))
+    antes = acumulado[b_bajo - 1] if b_bajo > 0 else 0
+
+    return percentile_lerp(valores[rank_bajo - antes], valores[rank_alto - antes], rank)
+
+
+def _filter_mask(z, z_threshold, percentage):
+    # Igual que filter_pcd_percentage: parte frontal (>=) o posterior (<=)
+    return z >= z_threshold if percentage >= 0 else z <= z_threshold
+
+
+def ply_bounds(path, cut_percentage=60, chunk_size=DEFAULT_CHUNK_SIZE, z_threshold=None):
+    """
+    Límites (x_min, x_max, y_min, y_max) de los puntos de un archivo .ply que
+    sobreviven al recorte en Z, recorriendo la nube por bloques.
+    """
+    if z_threshold is None:
+        z_threshold = ply_z_percentile(path, abs(cut_percentage), chunk_size)
+
+    x_min, x_max, y_min, y_max = np.inf, -np.inf, np.inf, -np.inf
+    for points, _ in iter_ply_chunks(path, chunk_size, colors=False):
+        points = points[_filter_mask(points[:, 2], z_threshold, cut_percentage)]
+        if len(points):
+            x_min, x_max = min(x_min, points[:, 0].min()), max(x_max, points[:, 0].max())
+            y_min, y_max = min(y_min, points[:, 1].min()), max(y_max, points[:, 1].max())
+    if x_min > x_max:
+        raise ValueError("La nube de puntos está vacía.")
+    return x_min, x_max, y_min, y_max
+
+
+def project_ply(path, custom_scale_factor=1, cut_percentage=60, collision="last", chunk_size=DEFAULT_CHUNK_SIZE,
+                grid=None):
+    """
+    Equivalente a `filter_pcd_percentage` + `point_cloud_to_image` para un
+    archivo .ply, pero recorriendo la nube por bloques: la memoria usada es la
+    de un bloque más la imagen, sin importar el tamaño de la nube.
+
+    Parámetros:
+    -----------
+    path : str
+        Ruta al archivo .ply.
+    custom_scale_factor : float
+        Factor de escala de la proyeccion.
+    cut_percentage : float
+        Porcentaje de recorte en Z (ver `filter_pcd_percentage`).
+    collision : str
+        Política de colisión (ver `point_cloud_to_image`).
+    chunk_size : int
+        Número de vértices por bloque.
+    grid : ProjectionGrid
+        Rejilla fija (ver `POP2.canvas`). Si se indica, se omite la pasada que
+        calcula los límites de la nube.
+
+    Retorna:
+    --------
+    img : numpy.ndarray
+        Imagen en formato RGB (uint8) con la nube proyectada.
+    """
+    z_threshold = ply_z_percentile(path, abs(cut_percentage), chunk_size)
+
+    if grid is None:
+        # Límites en X/Y de los puntos que sobreviven al recorte
+        bounds = ply_bounds(path, cut_percentage, chunk_size, z_threshold)
+        grid = grid_from_bounds(*bounds, custom_scale_factor)
+
+    proyeccion = ChunkedProjection(grid, collision)
+    for points, colors in iter_ply_chunks(path, chunk_size):
+        mascara = _filter_mask(points[:, 2], z_threshold, cut_percentage)
+        proyeccion.add(points[mascara], None if colors is None else colors[mascara])
+
+    img, _ = proyeccion.result()
+    return img
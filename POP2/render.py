@@ -0,0 +1,194 @@
+import os
+
+import cv2
+import numpy as np
+from POP2.extract_image_pcd import ProjectionGrid, _rasterize
+from POP2.instrument import stage
+from POP2.lod import lod_voxel_size, voxel_downsample
+
+# Tamaño del lienzo, igual que la ventana oculta de capture3d
+RENDER_WIDTH = 800
+RENDER_HEIGHT = 600
+
+# Color de los objetos sin colores, igual que el color por defecto de las mallas en Open3D
+DEFAULT_COLOR = (0.7, 0.7, 0.7)
+
+
+def view_angles(num_yaw=10, num_pitch=5, num_roll=5, pitch_range=30, roll_range=30):
+    """
+    Ángulos (pitch, yaw, roll) en radianes de todas las vistas, en el mismo
+    orden en que las recorre `capture_views_for_pcd` (pitch, yaw y roll
+    anidados en ese orden).
+
+    Retorna:
+    --------
+    angles : numpy.ndarray
+        Arreglo (num_pitch * num_yaw * num_roll, 3).
+    """
+    yaw_angles = np.radians(np.linspace(0, 360, num=num_yaw, endpoint=False))
+    pitch_angles = np.linspace(-np.radians(pitch_range), np.radians(pitch_range), num=num_pitch)
+    roll_angles = np.linspace(-np.radians(roll_range), np.radians(roll_range), num=num_roll)
+
+    pitch, yaw, roll = np.meshgrid(pitch_angles, yaw_angles, roll_angles, indexing="ij")
+    return np.stack([pitch.ravel(), yaw.ravel(), roll.ravel()], axis=1)
+
+
+def rotation_matrices_xyz(angles):
+    """
+    Matrices de rotación de un lote de ángulos (pitch, yaw, roll), con la misma
+    convención que o3d.geometry.get_rotation_matrix_from_xyz (R = Rx·Ry·Rz).
+
+    Parámetros:
+    -----------
+    angles : numpy.ndarray
+        Arreglo (K,3) de ángulos en radianes.
+
+    Retorna:
+    --------
+    R : numpy.ndarray
+        Arreglo (K,3,3) con una matriz por vista.
+    """
+    angles = np.atleast_2d(np.asarray(angles, dtype=np.float64))
+    c, s = np.cos(angles), np.sin(angles)
+    uno, cero = np.ones(len(angles)), np.zeros(len(angles))
+
+    rx = np.stack([uno, cero, cero, cero, c[:, 0], -s[:, 0], cero, s[:, 0], c[:, 0]], axis=1).reshape(-1, 3, 3)
+    ry = np.stack([c[:, 1], cero, s[:, 1], cero, uno, cero, -s[:, 1], cero, c[:, 1]], axis=1).reshape(-1, 3, 3)
+    rz = np.stack([c[:, 2], -s[:, 2], cero, s[:, 2], c[:, 2], cero, cero, cero, uno], axis=1).reshape(-1, 3, 3)
+    return rx @ ry @ rz
+
+
+def frame_filename(count, pitch, yaw, roll):
+    """
+    Nombre del archivo de una vista (ángulos en radianes), común a los dos
+    renderizadores.
+    """
+    return (f"frame_{count:04d}_pitch{np.degrees(pitch):.1f}"
+            f"_yaw{np.degrees(yaw):.1f}_roll{np.degrees(roll):.1f}.png")
+
+
+def frame_meta(base_name, count, pitch, yaw, roll):
+    """
+    Metadatos de una vista (ángulos en grados) para los destinos que no los
+    codifican en el nombre del archivo (ver `POP2.dataset.ShardWriter`).
+    """
+    return {"source": base_name, "frame": count, "pitch": float(np.degrees(pitch)),
+            "yaw": float(np.degrees(yaw)), "roll": float(np.degrees(roll))}
+
+
+def geometry_arrays(geometry):
+    """
+    Puntos (N,3) y colores (N,3) en [0,1] de una malla o nube de Open3D, como
+    vistas sin copia. Los objetos sin colores se pintan con DEFAULT_COLOR.
+    """
+    if hasattr(geometry, "vertices"):
+        points, colors = np.asarray(geometry.vertices), np.asarray(geometry.vertex_colors)
+    else:
+        points, colors = np.asarray(geometry.points), np.asarray(geometry.colors)
+    if len(colors) != len(points):
+        colors = np.broadcast_to(np.asarray(DEFAULT_COLOR), points.shape)
+    return points, colors
+
+
+def view_grid(points, width=RENDER_WIDTH, height=RENDER_HEIGHT):
+    """
+    Rejilla de un lienzo fijo centrada en la caja delimitadora de los puntos.
+    La escala imita el encuadre de `reset_view_point` de Open3D: la mayor
+    dimensión de la caja ocupa la mitad de la altura del lienzo.
+    """
+    p_min, p_max = points.min(axis=0), points.max(axis=0)
+    centro = (p_min + p_max) / 2
+    extension = max(float((p_max - p_min).max()), 1e-6)
+
+    scale_factor = height / (2 * extension)
+    return ProjectionGrid(centro[0] - width / (2 * scale_factor), centro[1] - height / (2 * scale_factor),
+                          width, height, scale_factor)
+
+
+def render_views(points, colors, rotations, width=RENDER_WIDTH, height=RENDER_HEIGHT, splat_radius=2,
+                 background=(255, 255, 255), batch_size=16):
+    """
+    Renderiza en CPU, solo con NumPy, una vista de los puntos por cada matriz
+    de rotación. Las rotaciones (respecto al centro de los puntos) se aplican
+    por lotes de `batch_size` vistas con un único producto matricial, y cada
+    vista se proyecta sobre un lienzo fijo con el z-buffer y los splats de
+    `point_cloud_to_image` (cámara ortográfica mirando hacia -Z). No necesita
+    pantalla ni GPU.
+
+    Parámetros:
+    -----------
+    points : numpy.ndarray
+        Puntos (N,3).
+    colors : numpy.ndarray
+        Colores (N,3) en [0,1].
+    rotations : numpy.ndarray
+        Matrices (K,3,3) (ver `rotation_matrices_xyz`).
+    width, height : int
+        Tamaño del lienzo en píxeles.
+    splat_radius : int
+        Radio en píxeles de la huella de cada punto.
+    background : tuple
+        Color de fondo en RGB.
+    batch_size : int
+        Número de vistas rotadas a la vez (memoria: batch_size * N * 3 floats).
+
+    Retorna (generador):
+    --------------------
+    img : numpy.ndarray
+        Imagen (height, width, 3) en BGR uint8, lista para cv2.imwrite.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    if len(points) == 0:
+        raise ValueError("La nube de puntos está vacía.")
+    centrados = points - points.mean(axis=0)
+
+    for inicio in range(0, len(rotations), batch_size):
+        rotados = np.matmul(centrados, np.transpose(rotations[inicio:inicio + batch_size], (0, 2, 1)))
+        for vista in rotados:
+            with stage("render", points=len(vista)):
+                img, index_map = _rasterize(vista, colors, collision="nearest", splat_radius=splat_radius,
+                                            grid=view_grid(vista, width, height))
+                img[index_map < 0] = background
+                img = cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
+            yield img
+
+
+def render_views_for_pcd(geometry, base_name, output_dir,
+                         num_yaw=10, num_pitch=5, num_roll=5,
+                         pitch_range=30, roll_range=30, splat_radius=2, writer=None, lod=None):
+    """
+    Alternativa a `capture_views_for_pcd` con el renderizador por software:
+    genera las mismas vistas con los mismos nombres de archivo, sin ventana ni
+    contexto OpenGL, por lo que puede ejecutarse en servidores sin pantalla y
+    en varios procesos a la vez.
+
+    Con `lod` ("auto" o lado del vóxel) los puntos se reducen a uno por vóxel
+    antes de renderizar (ver `POP2.lod`); con "auto" el vóxel mide un pixel
+    del lienzo, de modo que el coste de cada vista deja de depender de la
+    densidad del escaneo.
+    """
+    print(f"Renderizando vistas para: {base_name}")
+    pcd_output_dir = os.path.join(output_dir, base_name)
+    os.makedirs(pcd_output_dir, exist_ok=True)
+
+    points, colors = geometry_arrays(geometry)
+    if lod is not None:
+        with stage("lod", points=len(points)) as info:
+            voxel_size = lod_voxel_size(lod, view_grid(points).scale_factor)
+            points, colors = voxel_downsample(points, colors, voxel_size)
+            info["kept_points"] = len(points)
+    angles = view_angles(num_yaw, num_pitch, num_roll, pitch_range, roll_range)
+
+    count = 0
+    for (pitch, yaw, roll), img in zip(angles, render_views(points, colors, rotation_matrices_xyz(angles),
+                                                             splat_radius=splat_radius)):
+        filename = os.path.join(pcd_output_dir, frame_filename(count, pitch, yaw, roll))
+        with stage("write"):
+            if writer is not None:
+                writer.write(filename, img, frame_meta(base_name, count, pitch, yaw, roll))
+            else:
+                cv2.imwrite(filename, img)
+        print(f"Guardado: {filename}")
+        count += 1
+
+    print(f"Se guardaron {count} imágenes en: {pcd_output_dir}")
@@ -0,0 +1,568 @@
+"""
+Servicio de proyección bajo demanda. Mantiene un pool de procesos ya
+inicializados (Open3D importado al arrancar) y atiende peticiones por un socket
+TCP local o un socket Unix, de modo que cada nube nueva no paga el arranque del
+intérprete ni la importación de Open3D.
+
+Protocolo: cada mensaje es una línea JSON. Si el mensaje incluye
+"payload": [n1, n2, ...], a continuación de la línea se envían n1, n2, ...
+bytes sin codificar (la nube subida, o las imágenes PNG de un resultado).
+
+    python -m POP2.service serve --unix /tmp/pop2.sock -w 2
+    python -m POP2.service submit --unix /tmp/pop2.sock data/POP2/mango/pcd/1209_02_pc.ply -o data/POP2/mango/
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+from POP2.batch import _init_worker, output_paths
+from POP2.pipeline import process_cloud
+
+# Parámetros de process_cloud que se pueden indicar en una petición
+JOB_PARAMS = ("cut_percentage", "scale_factor", "fillrgb_iterations", "fillmask_iterations", "fill_method",
+              "splat_radius", "chunk_size", "grid", "lod")
+
+# Trabajos terminados que se conservan para consultar su estado
+MAX_FINISHED_JOBS = 1000
+
+# Imágenes de resultados sin recoger: se descartan pasado este tiempo (segundos)
+# o, empezando por las más antiguas, si en total superan este tamaño (bytes).
+# El estado del trabajo se conserva.
+RESULT_TTL = 3600.0
+MAX_RESULT_BYTES = 1 << 30
+
+# Tamaño de los bloques al recibir o enviar datos sin codificar
+_BLOCK_BYTES = 1 << 20
+
+
+def _init_service_worker():
+    """
+    Inicializa un proceso del pool del servicio: además de la configuración de
+    los lotes, importa Open3D por adelantado para que el primer trabajo de cada
+    proceso no pague su importación. Si Open3D no está disponible, el proceso
+    sigue atendiendo trabajos por bloques (`chunk_size`), que no lo necesitan.
+    """
+    _init_worker()
+    try:
+        importlib.import_module("open3d")
+    except ImportError:
+        pass
+
+
+def _run_job(pcd_path, params, outputs=None):
+    """
+    Trabajo que se ejecuta en un proceso del pool. Si se indican las rutas de
+    salida, guarda las imágenes; si no, las devuelve codificadas en PNG.
+    """
+    color, mask = process_cloud(pcd_path, **params)
+    if outputs is not None:
+        for path, img in zip(outputs, (color, mask)):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if not cv2.imwrite(path, img):
+                raise IOError(f"No se pudo guardar la imagen {path}")
+        return {"shape": list(color.shape)}
+
+    imagenes = []
+    for img in (color, mask):
+        ok, png = cv2.imencode(".png", img)
+        if not ok:
+            raise IOError("No se pudo codificar la imagen")
+        imagenes.append(png.tobytes())
+    return {"shape": list(color.shape), "png": imagenes}
+
+
+class ProjectionService:
+    """
+    Cola de trabajos de proyección con un pool acotado de procesos.
+
+    Como mucho `max_queued` trabajos esperan en la cola: cuando está llena,
+    las peticiones de envío esperan (y con ellas la lectura del socket, de
+    modo que un cliente que sube nubes más rápido de lo que se procesan queda
+    frenado) o, si piden "nowait", se rechazan con `asyncio.QueueFull`.
+
+    Parámetros:
+    -----------
+    workers : int
+        Número de procesos (y de trabajos en ejecución a la vez).
+    max_queued : int
+        Número máximo de trabajos en espera.
+    spool_dir : str
+        Carpeta para las nubes subidas mientras esperan (por defecto, una
+        carpeta temporal propia del servicio que se borra al terminar).
+    max_upload_bytes : int
+        Tamaño máximo de una nube subida.
+    output_root : str
+        Carpeta bajo la que se permite guardar imágenes (por defecto, la
+        carpeta actual). Las carpetas de salida relativas de las peticiones se
+        resuelven respecto a ella y se rechazan las que quedan fuera.
+    input_root : str
+        Carpeta bajo la que se permite leer nubes por su ruta (por defecto, la
+        carpeta actual), con la misma resolución que `output_root`.
+    result_ttl : float
+        Segundos que se conservan las imágenes de un resultado sin recoger.
+    max_result_bytes : int
+        Tamaño total máximo de las imágenes sin recoger.
+    """
+
+    def __init__(self, workers=None, max_queued=16, spool_dir=None, max_upload_bytes=2 << 30, output_root=".",
+                 input_root=".", result_ttl=RESULT_TTL, max_result_bytes=MAX_RESULT_BYTES):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queued = max_queued
+        self.max_upload_bytes = max_upload_bytes
+        self.output_root = os.path.realpath(output_root)
+        self.input_root = os.path.realpath(input_root)
+        self.result_ttl = result_ttl
+        self.max_result_bytes = max_result_bytes
+        self.spool_dir = spool_dir
+        self.jobs = OrderedDict()
+        self.pool = None
+        self.queue = None
+        self.plazas = None
+        self.consumidores = []
+
+    async def start(self):
+        self.spool_dir = self.spool_dir or tempfile.mkdtemp(prefix="pop2_spool_")
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_service_worker)
+        # Los procesos se crean con el primer envío: lanzarlos ya, sin esperar,
+        # para que se inicialicen mientras el servicio aún no recibe trabajos
+        self.pool.submit(int)
+        self.queue = asyncio.Queue()
+        self.plazas = asyncio.Semaphore(self.max_queued)
+        self.consumidores = [asyncio.create_task(self._consume()) for _ in range(self.workers)]
+
+    async def stop(self, remove_spool=True):
+        for tarea in self.consumidores:
+            tarea.cancel()
+        await asyncio.gather(*self.consumidores, return_exceptions=True)
+        self.pool.shutdown(wait=True, cancel_futures=True)
+        if remove_spool:
+            shutil.rmtree(self.spool_dir, ignore_errors=True)
+
+    def _input_path(self, path):
+        # Tampoco leer fuera de input_root; el mismo error para las rutas que
+        # quedan fuera y las que no existen, para no revelar qué archivos hay
+        ruta = os.path.realpath(os.path.join(self.input_root, path))
+        if os.path.commonpath([self.input_root, ruta]) != self.input_root or not os.path.isfile(ruta):
+            raise ValueError(f"No existe el archivo {path!r} bajo {self.input_root}.")
+        return ruta
+
+    def _output_paths(self, output, file_id):
+        # El servicio escucha sin autenticación: no escribir fuera de output_root
+        if file_id in ("", ".", "..") or os.path.basename(file_id) != file_id or \
+                (os.altsep is not None and os.altsep in file_id):
+            raise ValueError(f"Identificador no válido: {file_id!r} (debe ser un nombre de archivo sin carpetas).")
+        carpeta = os.path.realpath(os.path.join(self.output_root, output))
+        if os.path.commonpath([self.output_root, carpeta]) != self.output_root:
+            raise ValueError(f"La carpeta de salida {output!r} está fuera de {self.output_root}.")
+        return output_paths(carpeta, file_id)
+
+    def _public(self, job):
+        return {k: v for k, v in job.items() if k not in ("done", "result", "spool")}
+
+    async def submit(self, path=None, upload=None, params=None, output=None, file_id=None, nowait=False):
+        """
+        Encola una nube (ruta en el servidor, o `upload`: corrutina que recibe
+        la ruta del archivo temporal y guarda en él los bytes subidos).
+
+        Retorna:
+        --------
+        job : dict
+            Estado público del trabajo ('id', 'status', ...).
+        """
+        params = dict(params or {})
+        desconocidos = set(params) - set(JOB_PARAMS)
+        if desconocidos:
+            raise ValueError(f"Parámetros no soportados: {sorted(desconocidos)}. Opciones: {JOB_PARAMS}")
+        if (path is None) == (upload is None):
+            raise ValueError("Indica la ruta de la nube ('path') o súbela ('payload').")
+        ruta = self._input_path(path) if path is not None else None
+
+        job_id = uuid.uuid4().hex[:12]
+        outputs = None
+        if output is not None:
+            # Validar antes de ocupar una plaza de la cola o leer la nube subida
+            if file_id is None:
+                file_id = os.path.splitext(os.path.basename(path))[0] if path is not None else job_id
+            outputs = self._output_paths(output, file_id)
+
+        if nowait and self.plazas.locked():
+            raise asyncio.QueueFull(f"La cola de trabajos está llena ({self.max_queued} en espera).")
+        await self.plazas.acquire()
+
+        job = {"id": job_id, "status": "queued", "source": path or "upload", "params": params,
+               "submitted": time.time(), "started": None, "finished": None, "seconds": None,
+               "error": None, "outputs": outputs, "shape": None, "result_expired": False,
+               "done": asyncio.Event(), "result": None}
+        try:
+            if upload is not None:
+                job["spool"] = os.path.join(self.spool_dir, f"{job_id}.ply")
+                await upload(job["spool"])
+                ruta = job["spool"]
+        except BaseException:
+            self.plazas.release()
+            if job.get("spool") and os.path.exists(job["spool"]):
+                os.remove(job["spool"])
+            raise
+
+        job["path"] = ruta
+        self.jobs[job_id] = job
+        self._trim()
+        await self.queue.put(job)
+        return self._public(job)
+
+    def _trim(self):
+        # Olvidar los trabajos terminados más antiguos
+        terminados = [k for k, j in self.jobs.items() if j["status"] in ("done", "error")]
+        for k in terminados[:max(0, len(terminados) - MAX_FINISHED_JOBS)]:
+            del self.jobs[k]
+
+    def _expire(self, job):
+        if job["result"] is not None:
+            job["result"], job["result_expired"] = None, True
+
+    def _limit_results(self):
+        # Descartar las imágenes sin recoger más antiguas hasta quedar bajo el límite
+        pendientes = [j for j in self.jobs.values() if j["result"] is not None]
+        total = sum(len(png) for j in pendientes for png in j["result"])
+        for job in pendientes:
+            if total <= self.max_result_bytes:
+                break
+            total -= sum(len(png) for png in job["result"])
+            self._expire(job)
+
+    async def _consume(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self.queue.get()
+            self.plazas.release()
+            job["status"], job["started"] = "running", time.time()
+            try:
+                resultado = await loop.run_in_executor(self.pool, _run_job, job["path"], job["params"],
+                                                       job["outputs"])
+                job["shape"], job["result"] = resultado["shape"], resultado.get("png")
+                job["status"] = "done"
+            except Exception as e:
+                job["status"], job["error"] = "error", f"{type(e).__name__}: {e}"
+            finally:
+                job["finished"] = time.time()
+                job["seconds"] = job["finished"] - job["started"]
+                if job.get("spool"):
+                    try:
+                        os.remove(job["spool"])
+                    except OSError:
+                        pass
+                if job["result"] is not None:
+                    loop.call_later(self.result_ttl, self._expire, job)
+                    self._limit_results()
+                job["done"].set()
+
+    def status(self, job_id):
+        if job_id not in self.jobs:
+            raise KeyError(f"Trabajo desconocido: {job_id}")
+        return self._public(self.jobs[job_id])
+
+    async def result(self, job_id, wait=True):
+        """
+        Estado del trabajo y, si terminó sin guardar en disco, sus imágenes
+        PNG (color, máscara). Las imágenes se entregan una sola vez; si no se
+        recogieron a tiempo (ver `result_ttl`), 'result_expired' es True.
+        """
+        if job_id not in self.jobs:
+            raise KeyError(f"Trabajo desconocido: {job_id}")
+        job = self.jobs[job_id]
+        if wait:
+            await job["done"].wait()
+        imagenes, job["result"] = job["result"], None
+        return self._public(job), imagenes or []
+
+    def stats(self):
+        estados = {}
+        for job in self.jobs.values():
+            estados[job["status"]] = estados.get(job["status"], 0) + 1
+        return {"workers": self.workers, "max_queued": self.max_queued, "queued": self.queue.qsize(),
+                "jobs": estados}
+
+    async def handle(self, reader, writer):
+        """
+        Atiende una conexión: una petición por línea, respondidas en orden.
+        """
+        try:
+            while True:
+                linea = await reader.readline()
+                if not linea:
+                    break
+                try:
+                    mensaje = json.loads(linea)
+                    respuesta, datos = await self._dispatch(mensaje, reader)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    raise
+                except Exception as e:
+                    respuesta, datos = {"ok": False, "error": f"{type(e).__name__}: {e}"}, []
+                await _send(writer, respuesta, datos)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, mensaje, reader):
+        op = mensaje.get("op")
+        tamanos = mensaje.get("payload") or []
+
+        if op == "submit":
+            upload, leidos = None, []
+            if tamanos:
+                if tamanos[0] > self.max_upload_bytes:
+                    await _discard(reader, tamanos)
+                    raise ValueError(f"La nube supera el tamaño máximo ({self.max_upload_bytes} bytes).")
+
+                async def recibir(destino):
+                    leidos.append(destino)
+                    await _receive_to_file(reader, tamanos[0], destino)
+                upload = recibir
+            try:
+                job = await self.submit(mensaje.get("path"), upload, mensaje.get("params"), mensaje.get("output"),
+                                        mensaje.get("id"), mensaje.get("nowait", False))
+            except Exception:
+                # Si el trabajo se rechazó antes de leer la nube, descartarla para
+                # que la siguiente línea del flujo sea la siguiente petición
+                if tamanos and not leidos:
+                    await _discard(reader, tamanos)
+                raise
+            await _discard(reader, tamanos[1:])
+            return {"ok": True, "job": job}, []
+
+        await _discard(reader, tamanos)
+        if op == "status":
+            return {"ok": True, "job": self.status(mensaje["job"])}, []
+        if op == "result":
+            job, imagenes = await self.result(mensaje["job"], mensaje.get("wait", True))
+            respuesta = {"ok": True, "job": job}
+            if imagenes:
+                respuesta["payload"] = [len(b) for b in imagenes]
+            return respuesta, imagenes
+        if op == "stats":
+            return {"ok": True, "stats": self.stats()}, []
+        raise ValueError(f"Operación no soportada: {op}. Opciones: submit, status, result, stats")
+
+
+async def _send(writer, mensaje, datos=()):
+    writer.write((json.dumps(mensaje) + "\n").encode())
+    for bloque in datos:
+        writer.write(bloque)
+    await writer.drain()
+
+
+async def _receive_to_file(reader, n, destino):
+    with open(destino, "wb") as f:
+        while n > 0:
+            bloque = await reader.readexactly(min(n, _BLOCK_BYTES))
+            f.write(bloque)
+            n -= len(bloque)
+
+
+async def _discard(reader, tamanos):
+    for n in tamanos:
+        while n > 0:
+            n -= len(await reader.readexactly(min(n, _BLOCK_BYTES)))
+
+
+async def serve(host="127.0.0.1", port=8765, unix_path=None, **kwargs):
+    """
+    Arranca el servicio (argumentos de `ProjectionService`) en un puerto TCP
+    local o, si se indica `unix_path`, en un socket Unix, y lo mantiene hasta
+    que se cancela (Ctrl+C o SIGTERM); al terminar se cierra el pool y se
+    borran las nubes subidas pendientes.
+    """
+    loop = asyncio.get_running_loop()
+    for senal in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(senal, asyncio.current_task().cancel)
+
+    service = ProjectionService(**kwargs)
+    await service.start()
+    if unix_path is not None:
+        server = await asyncio.start_unix_server(service.handle, path=unix_path)
+        direccion = unix_path
+    else:
+        server = await asyncio.start_server(service.handle, host, port)
+        direccion = f"{host}:{server.sockets[0].getsockname()[1]}"
+    print(f"Servicio escuchando en {direccion} con {service.workers} procesos "
+          f"(máximo {service.max_queued} trabajos en espera).", flush=True)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.stop()
+        if unix_path is not None and os.path.exists(unix_path):
+            os.remove(unix_path)
+
+
+class ServiceClient:
+    """
+    Cliente síncrono del servicio, con una conexión por cliente.
+
+    Parámetros:
+    -----------
+    address : str o tuple
+        Ruta del socket Unix, o (host, puerto) del servicio TCP.
+    timeout : float
+        Tiempo máximo de espera de cada respuesta (None: sin límite).
+    """
+
+    def __init__(self, address, timeout=None):
+        if isinstance(address, str):
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(address)
+        self.archivo = self.sock.makefile("rb")
+
+    def _request(self, mensaje, datos=None):
+        if datos is not None:
+            mensaje = dict(mensaje, payload=[os.path.getsize(datos)])
+        self.sock.sendall((json.dumps(mensaje) + "\n").encode())
+        if datos is not None:
+            with open(datos, "rb") as f:
+                self.sock.sendfile(f)
+
+        linea = self.archivo.readline()
+        if not linea:
+            raise ConnectionError("El servicio cerró la conexión.")
+        respuesta = json.loads(linea)
+        adjuntos = [self.archivo.read(n) for n in respuesta.get("payload", [])]
+        if not respuesta["ok"]:
+            raise RuntimeError(respuesta["error"])
+        return respuesta, adjuntos
+
+    def submit(self, path=None, upload=None, params=None, output=None, file_id=None, nowait=False):
+        """
+        Encola una nube que el servicio puede leer (`path`) o sube un archivo
+        local (`upload`). Con `output`, el servicio guarda las imágenes en
+        `output/color/` y `output/mask/` (como `process_batch`); si no, se
+        obtienen con `result`. Con `nowait`, si la cola está llena se lanza
+        RuntimeError ('QueueFull: ...') en lugar de esperar.
+
+        Retorna:
+        --------
+        job : dict
+            Estado del trabajo ('id', 'status', ...).
+        """
+        mensaje = {"op": "submit", "path": path, "params": params or {}, "output": output, "id": file_id,
+                   "nowait": nowait}
+        return self._request(mensaje, upload)[0]["job"]
+
+    def status(self, job_id):
+        return self._request({"op": "status", "job": job_id})[0]["job"]
+
+    def result(self, job_id, wait=True):
+        """
+        Estado del trabajo y, si el servicio no guardó las imágenes en disco,
+        sus PNG codificados (color, máscara); lista vacía si no hay imágenes.
+        """
+        respuesta, imagenes = self._request({"op": "result", "job": job_id, "wait": wait})
+        return respuesta["job"], imagenes
+
+    def stats(self):
+        return self._request({"op": "stats"})[0]["stats"]
+
+    def close(self):
+        self.archivo.close()
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def _address(args):
+    return args.unix if args.unix else (args.host, args.port)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servicio de proyección de nubes .ply bajo demanda.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    for nombre in ("serve", "submit"):
+        p = sub.add_parser(nombre)
+        p.add_argument("--host", default="127.0.0.1")
+        p.add_argument("--port", type=int, default=8765)
+        p.add_argument("--unix", default=None, help="Ruta del socket Unix (en lugar de TCP).")
+
+    serve_parser = sub.choices["serve"]
+    serve_parser.add_argument("-w", "--workers", type=int, default=None, help="Número de procesos.")
+    serve_parser.add_argument("--max-queued", type=int, default=16, help="Máximo de trabajos en espera.")
+    serve_parser.add_argument("--spool-dir", default=None, help="Carpeta para las nubes subidas.")
+    serve_parser.add_argument("--output-root", default=".",
+                              help="Carpeta bajo la que se permite guardar imágenes (por defecto, la actual).")
+    serve_parser.add_argument("--input-root", default=".",
+                              help="Carpeta bajo la que se permite leer nubes por su ruta (por defecto, la actual).")
+    serve_parser.add_argument("--result-ttl", type=float, default=RESULT_TTL,
+                              help="Segundos que se conservan las imágenes de un resultado sin recoger.")
+    serve_parser.add_argument("--max-result-bytes", type=int, default=MAX_RESULT_BYTES,
+                              help="Tamaño total máximo de las imágenes sin recoger.")
+
+    submit_parser = sub.choices["submit"]
+    submit_parser.add_argument("pcd", nargs="+", help="Archivos .ply.")
+    submit_parser.add_argument("-o", "--output", default=None,
+                               help="Carpeta de salida en el servidor; sin ella las imágenes se descargan a --download.")
+    submit_parser.add_argument("--download", default=".", help="Carpeta local para las imágenes descargadas.")
+    submit_parser.add_argument("--upload", action="store_true",
+                               help="Subir los archivos en lugar de enviar su ruta (servicio en otra máquina o contenedor).")
+    submit_parser.add_argument("--params", default="{}", help="Parámetros de process_cloud en JSON.")
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        try:
+            asyncio.run(serve(args.host, args.port, args.unix, workers=args.workers, max_queued=args.max_queued,
+                              spool_dir=args.spool_dir, output_root=args.output_root, input_root=args.input_root,
+                              result_ttl=args.result_ttl, max_result_bytes=args.max_result_bytes))
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            pass
+        return 0
+
+    params = json.loads(args.params)
+    errores = 0
+    with ServiceClient(_address(args)) as client:
+        trabajos = []
+        for path in args.pcd:
+            if args.upload:
+                job = client.submit(upload=path, params=params, output=args.output,
+                                    file_id=os.path.splitext(os.path.basename(path))[0])
+            else:
+                job = client.submit(os.path.abspath(path), params=params, output=args.output)
+            trabajos.append((path, job["id"]))
+
+        for path, job_id in trabajos:
+            job, imagenes = client.result(job_id)
+            if job["status"] != "done" or job["result_expired"]:
+                errores += 1
+                print(f"ERROR en {path}: {job['error'] or 'las imágenes caducaron sin recogerse'}")
+                continue
+            if imagenes:
+                file_id = os.path.splitext(os.path.basename(path))[0]
+                for destino, png in zip(output_paths(args.download, file_id), imagenes):
+                    os.makedirs(os.path.dirname(destino), exist_ok=True)
+                    with open(destino, "wb") as f:
+                        f.write(png)
+            print(f"{path}: OK en {job['seconds']:.2f} s")
+    return 1 if errores else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,93 +1,204 @@
 import cv2
 import numpy as np
-from PIL import Image
-import open3d as o3d
+from POP2.ply_stream import percentile_lerp, percentile_rank
 
-def change_image_color(path_imagen, color=(255,0,0)):
-    # Cargar la imagen como un numpy array (en BGR por defecto)
-    image = cv2.imread(path_imagen)
+def load_image(imagen):
+    """
+    Devuelve la imagen como numpy.ndarray (BGR). Acepta tanto una ruta, que se
+    carga con OpenCV, como un arreglo ya cargado en memoria (se devuelve tal cual).
+    """
+    if isinstance(imagen, np.ndarray):
+        return imagen
 
+    image = cv2.imread(imagen, cv2.IMREAD_COLOR)
     if image is None:
-        raise ValueError(f"No se pudo cargar la imagen desde {path_imagen}")
+        raise ValueError(f"No se pudo cargar la imagen desde la ruta: {imagen}")
+    return image
 
-    # Obtener dimensiones
-    alto, ancho, canales = image.shape
 
-    # Suponiendo que consideramos un píxel "distinto de 0" si no es completamente negro
-    # Un píxel negro en BGR es (0,0,0)
-    for y in range(alto):
-        for x in range(ancho):
-            b,g,r = image[y,x]
-            if not (b==0 and g==0 and r==0):
-                # Cambiamos el píxel por el color dado (el color está en RGB, lo convertimos a BGR)
-                image[y,x] = (color[2], color[1], color[0])
+def create_mask(imagen, color=(255,255,255), occupancy=None):
+    """
+    Genera la máscara de una imagen proyectada directamente en memoria:
+    los píxeles ocupados se pintan con `color` y el resto queda en negro.
 
-    # Devolvemos la imagen modificada
-    return image
+    Parámetros:
+    - imagen: numpy.ndarray (H, W, 3) con la imagen proyectada (RGB o BGR,
+      solo se usa para saber qué píxeles no son negros).
+    - color: Color de la máscara en RGB.
+    - occupancy: Opcional. Matriz (H, W) booleana o mapa de índices de la
+      proyección (valores >= 0 ocupados). Si se indica, se usa en lugar de
+      buscar píxeles no negros, de modo que los puntos de color negro también
+      forman parte de la máscara.
 
+    Retorna:
+    - mascara: numpy.ndarray (H, W, 3) uint8 en BGR.
+    """
+    if occupancy is not None:
+        ocupados = occupancy >= 0 if occupancy.dtype != bool else occupancy
+    else:
+        # Un píxel se considera "distinto de 0" si no es completamente negro
+        ocupados = np.any(imagen != 0, axis=2)
 
+    mascara = np.zeros((ocupados.shape[0], ocupados.shape[1], 3), dtype=np.uint8)
+    # El color está en RGB, lo convertimos a BGR
+    mascara[ocupados] = (color[2], color[1], color[0])
+    return mascara
 
-def fill_missing_pixels(imagen_path, iteraciones=5):
+
+def change_image_color(path_imagen, color=(255,0,0)):
+    # Cargar la imagen como un numpy array (en BGR por defecto), o usar el arreglo recibido
+    image = load_image(path_imagen)
+
+    # Cambiamos los píxeles no negros por el color dado
+    return create_mask(image, color)
+
+
+
+# Desplazamientos (fila, columna) de los 8 vecinos de un píxel
+_VECINOS = [(-1, -1), (-1, 0), (-1, 1),
+            (0, -1),           (0, 1),
+            (1, -1),  (1, 0),  (1, 1)]
+
+
+# Si la frontera supera 1/_DENSE_FRONTIER_RATIO de la imagen se filtra la imagen completa
+_DENSE_FRONTIER_RATIO = 16
+
+
+def _reflect_101(indices, n):
     """
-    Rellena los píxeles negros en una imagen utilizando el promedio de los píxeles vecinos.
+    Refleja índices fuera de rango igual que el borde por defecto de
+    cv2.filter2D (BORDER_REFLECT_101: -1 -> 1, n -> n-2).
+    """
+    indices = np.abs(indices)
+    indices = np.where(indices >= n, 2 * (n - 1) - indices, indices)
+    return np.clip(indices, 0, n - 1)
+
+
+def _fill_frontier(imagen, iteraciones=1, umbral_vecinos=1, verbose=False):
+    """
+    Motor de relleno por promedio de vecinos que solo trabaja sobre la frontera:
+    los píxeles negros con algún vecino no negro. Produce exactamente el mismo
+    resultado que aplicar `iteraciones` veces el relleno con cv2.filter2D sobre
+    toda la imagen, pero con un coste proporcional al tamaño de los huecos.
+
+    Un píxel negro cuyo vecindario no cambió en la iteración anterior daría el
+    mismo resultado que antes, así que en cada iteración solo se revisan los
+    vecinos negros de los píxeles que se acaban de rellenar. Mientras la
+    frontera es grande se usa un único cv2.filter2D sobre todos los canales.
 
     Parámetros:
-    - imagen_path: Ruta de la imagen a procesar.
-    - iteraciones: Número de iteraciones para propagar el relleno.
+    - imagen: numpy.ndarray (H, W, C) uint8.
+    - iteraciones: Número máximo de iteraciones, o None para iterar hasta que
+      no quede ningún píxel que se pueda rellenar.
+    - umbral_vecinos: Número mínimo de vecinos no negros para rellenar un píxel.
+    - verbose: Imprimir el número de píxeles rellenados en cada iteración.
 
     Retorna:
-    - imagen_resultante: Imagen con los píxeles faltantes rellenados.
+    - imagen_filled: Copia de la imagen con los píxeles rellenados.
     """
-    # Cargar la imagen
-    imagen = cv2.imread(imagen_path, cv2.IMREAD_COLOR)
-    if imagen is None:
-        raise ValueError(f"No se pudo cargar la imagen desde la ruta: {imagen_path}")
-    
-    # Crear una máscara de píxeles negros
-    # Se considera un píxel negro si todas las componentes B, G, R son 0
-    mascara_negra = np.all(imagen == [0, 0, 0], axis=2)
+    imagen_filled = imagen.copy()
+    alto, ancho = imagen_filled.shape[:2]
+    pixeles = imagen_filled.reshape(alto * ancho, -1)
+
+    # Se considera un píxel negro si todas sus componentes son 0
+    negro = ~np.any(pixeles != 0, axis=1)
 
     # Kernel para los vecinos (8 vecinos)
-    kernel = np.array([[1,1,1],
-                       [1,0,1],
-                       [1,1,1]], dtype=np.uint8)
+    kernel_vecinos = np.array([[1,1,1],
+                               [1,0,1],
+                               [1,1,1]], dtype=np.uint8)
+
+    # Frontera inicial: píxeles negros con al menos un vecino no negro
+    con_vecinos = cv2.dilate((~negro).reshape(alto, ancho).astype(np.uint8), np.ones((3, 3), np.uint8)).reshape(-1)
+    frontera = np.flatnonzero(negro & (con_vecinos > 0))
+
+    n_negros = np.count_nonzero(negro)
+    ultima_aparicion = np.empty(alto * ancho, dtype=np.int32)
+
+    it = 0
+    while iteraciones is None or it < iteraciones:
+        if n_negros == 0:
+            if verbose:
+                print(f"No hay más píxeles negros que rellenar en la iteración {it+1}.")
+            break
 
-    imagen_filled = imagen.copy()
+        # Suma de los vecinos (todos los canales a la vez) y conteo de vecinos no negros
+        if len(frontera) * _DENSE_FRONTIER_RATIO > len(negro):
+            # Frontera grande: un único filtrado de la imagen completa es más rápido
+            suma_vecinos = cv2.filter2D(imagen_filled.astype(np.float32), -1, kernel_vecinos)
+            suma_vecinos = suma_vecinos.reshape(alto * ancho, -1)[frontera]
+            conteo_vecinos = cv2.filter2D((~negro).reshape(alto, ancho).astype(np.float32), -1, kernel_vecinos)
+            conteo_vecinos = conteo_vecinos.reshape(-1)[frontera]
+        else:
+            filas, columnas = np.divmod(frontera, ancho)
+            suma_vecinos = np.zeros((len(frontera), pixeles.shape[1]), dtype=np.float32)
+            conteo_vecinos = np.zeros(len(frontera), dtype=np.float32)
+            for dy, dx in _VECINOS:
+                vecinos = _reflect_101(filas + dy, alto) * ancho + _reflect_101(columnas + dx, ancho)
+                suma_vecinos += pixeles[vecinos]
+                conteo_vecinos += ~negro[vecinos]
+
+        # Píxeles de la frontera a rellenar según el umbral
+        mascara_filling = conteo_vecinos >= max(umbral_vecinos, 1)
+        if not np.any(mascara_filling):
+            if verbose:
+                print(f"No hay píxeles internos negros que rellenar en la iteración {it+1}.")
+            break
 
-    for _ in range(iteraciones):
-        # Identificar los píxeles que aún son negros
-        mascara_negra = np.all(imagen_filled == [0, 0, 0], axis=2)
+        # Calcular el promedio, redondear y convertir a entero
+        promedio = suma_vecinos[mascara_filling] / conteo_vecinos[mascara_filling, np.newaxis]
+        promedio = np.round(promedio).astype(np.uint8)
+        rellenados = frontera[mascara_filling]
+        pixeles[rellenados] = promedio
 
-        if not np.any(mascara_negra):
-            break  # No hay más píxeles negros que rellenar
+        if verbose:
+            print(f"Iteración {it+1}: Rellenados {len(rellenados)} píxeles internos.")
 
-        # Para cada canal, calcular la suma de los vecinos y el conteo de vecinos no negros
-        suma_vecinos = np.zeros_like(imagen_filled, dtype=np.float32)
-        conteo_vecinos = np.zeros((imagen_filled.shape[0], imagen_filled.shape[1]), dtype=np.float32)
+        # Los píxeles cuyo promedio redondea a negro siguen siendo negros
+        nuevos = rellenados[np.any(promedio != 0, axis=1)]
+        negro[nuevos] = False
+        n_negros -= len(nuevos)
 
-        for c in range(3):  # B, G, R
-            # Usar filtrado para sumar los valores de los vecinos
-            suma = cv2.filter2D(imagen_filled[:,:,c].astype(np.float32), -1, kernel)
-            suma_vecinos[:,:,c] += suma
+        it += 1
+        if iteraciones is not None and it >= iteraciones:
+            break
 
-        # Contar los vecinos que no son negros
-        vecinos_no_negros = np.any(imagen_filled != [0,0,0], axis=2).astype(np.float32)
-        conteo = cv2.filter2D(vecinos_no_negros, -1, kernel)
-        conteo_vecinos = conteo
+        # Nueva frontera: vecinos negros de los píxeles recién rellenados
+        filas, columnas = np.divmod(nuevos, ancho)
+        candidatos = []
+        for dy, dx in _VECINOS:
+            y, x = filas + dy, columnas + dx
+            dentro = (y >= 0) & (y < alto) & (x >= 0) & (x < ancho)
+            candidato = y[dentro] * ancho + x[dentro]
+            candidatos.append(candidato[negro[candidato]])
+        candidatos = np.concatenate(candidatos)
+
+        # Quitar repetidos en O(k): cada píxel conserva solo una de sus apariciones
+        posiciones = np.arange(len(candidatos), dtype=np.int32)
+        ultima_aparicion[candidatos] = posiciones
+        frontera = candidatos[ultima_aparicion[candidatos] == posiciones]
 
-        # Evitar división por cero
-        conteo_vecinos[conteo_vecinos == 0] = 1
+    return imagen_filled
 
-        # Calcular el promedio
-        promedio = suma_vecinos / conteo_vecinos[:,:,np.newaxis]
 
-        # Redondear y convertir a entero
-        promedio = np.round(promedio).astype(np.uint8)
+def fill_missing_pixels(imagen_path, iteraciones=5):
+    """
+    Rellena los píxeles negros en una imagen utilizando el promedio de los píxeles vecinos.
 
-        # Reemplazar solo los píxeles negros
-        imagen_filled[mascara_negra] = promedio[mascara_negra]
+    Parámetros:
+    - imagen_path: Ruta de la imagen a procesar o numpy.ndarray (BGR) ya cargado.
+    - iteraciones: Número de iteraciones para propagar el relleno, o None para
+      rellenar hasta converger (cuidado: sin umbral de vecinos esto rellena
+      también todo el fondo conectado al objeto).
+
+    Retorna:
+    - imagen_resultante: Imagen con los píxeles faltantes rellenados.
+    """
+    # Cargar la imagen (o usar el arreglo recibido)
+    imagen = load_image(imagen_path)
+
+    return _fill_frontier(imagen, iteraciones)
 
-    return imagen_filled
 
 def fill_missing_pixels_preserve_borders(imagen_path, iteraciones=1, umbral_vecinos=4):
     """
@@ -95,77 +206,139 @@ def fill_missing_pixels_preserve_borders(imagen_path, iteraciones=1, umbral_veci
     manteniendo intactos los bordes del objeto.
 
     Parámetros:
-    - imagen_path: Ruta de la imagen a procesar.
-    - iteraciones: Número de iteraciones para propagar el relleno.
+    - imagen_path: Ruta de la imagen a procesar o numpy.ndarray (BGR) ya cargado.
+    - iteraciones: Número de iteraciones para propagar el relleno, o None para
+      rellenar hasta converger (hasta cerrar todos los huecos internos).
     - umbral_vecinos: Número mínimo de vecinos no negros requeridos para rellenar un píxel.
 
     Retorna:
     - imagen_resultante: Imagen con los píxeles faltantes rellenados.
     """
-    # Cargar la imagen
-    imagen = cv2.imread(imagen_path, cv2.IMREAD_COLOR)
-    if imagen is None:
-        raise ValueError(f"No se pudo cargar la imagen desde la ruta: {imagen_path}")
-    
-    # Crear una máscara de píxeles negros
-    # Consideramos un píxel negro si todas las componentes B, G, R son 0
-    mascara_negra = np.all(imagen == [0, 0, 0], axis=2)
-    
-    # Kernel para los vecinos (8 vecinos)
-    kernel = np.array([[1,1,1],
-                       [1,0,1],
-                       [1,1,1]], dtype=np.uint8)
-    
-    # Crear una copia de la imagen para rellenar
+    # Cargar la imagen (o usar el arreglo recibido)
+    imagen = load_image(imagen_path)
+
+    return _fill_frontier(imagen, iteraciones, umbral_vecinos=umbral_vecinos, verbose=True)
+
+
+def fill_missing_pixels_nearest(imagen_path, max_distancia=None):
+    """
+    Rellena en una sola pasada cada píxel negro con el color del píxel no negro
+    más cercano (transformada de distancia con etiquetas de OpenCV).
+
+    Parámetros:
+    - imagen_path: Ruta de la imagen a procesar o numpy.ndarray (BGR) ya cargado.
+    - max_distancia: Distancia máxima (en píxeles) hasta el píxel válido más
+      cercano. Los píxeles más lejanos se dejan en negro. Si es None se rellena
+      toda la imagen.
+
+    Retorna:
+    - imagen_resultante: Imagen con los píxeles faltantes rellenados.
+    """
+    # Cargar la imagen (o usar el arreglo recibido)
+    imagen = load_image(imagen_path)
+
     imagen_filled = imagen.copy()
-    
-    for it in range(iteraciones):
-        # Identificar los píxeles que aún son negros
-        mascara_negra = np.all(imagen_filled == [0, 0, 0], axis=2)
-        
-        if not np.any(mascara_negra):
-            print(f"No hay más píxeles negros que rellenar en la iteración {it+1}.")
-            break  # No hay más píxeles negros que rellenar
-        
-        # Contar el número de vecinos no negros para cada píxel
-        vecinos_no_negros = cv2.filter2D((~mascara_negra).astype(np.uint8), -1, kernel)
-        
-        # Crear una máscara de píxeles a rellenar basándose en el umbral
-        mascara_filling = mascara_negra & (vecinos_no_negros >= umbral_vecinos)
-        
-        # Si no hay píxeles que cumplir con la condición, finalizar
-        if not np.any(mascara_filling):
-            print(f"No hay píxeles internos negros que rellenar en la iteración {it+1}.")
-            break
-        
-        # Para cada canal, calcular la suma de los vecinos
-        suma_vecinos = np.zeros_like(imagen_filled, dtype=np.float32)
-        conteo_vecinos = vecinos_no_negros.astype(np.float32)
-        
-        for c in range(3):  # B, G, R
-            # Usar filtrado para sumar los valores de los vecinos
-            suma = cv2.filter2D(imagen_filled[:,:,c].astype(np.float32), -1, kernel)
-            suma_vecinos[:,:,c] += suma
-        
-        # Evitar división por cero
-        conteo_vecinos[conteo_vecinos == 0] = 1
-        
-        # Calcular el promedio
-        promedio = suma_vecinos / conteo_vecinos[:,:,np.newaxis]
-        
-        # Redondear y convertir a entero
-        promedio = np.round(promedio).astype(np.uint8)
-        
-        # Reemplazar solo los píxeles negros internos
-        imagen_filled[mascara_filling] = promedio[mascara_filling]
-        
-        num_rellenados = np.sum(mascara_filling)
-        print(f"Iteración {it+1}: Rellenados {num_rellenados} píxeles internos.")
-    
+    negro = ~np.any(imagen_filled != 0, axis=2)
+    if not np.any(negro) or np.all(negro):
+        return imagen_filled
+
+    # Cada píxel no negro recibe una etiqueta propia (1, 2, ... en orden de filas)
+    distancia, etiquetas = cv2.distanceTransformWithLabels(
+        negro.astype(np.uint8), cv2.DIST_L2, 5, labelType=cv2.DIST_LABEL_PIXEL)
+    origen = np.flatnonzero(~negro)
+
+    mascara_filling = negro if max_distancia is None else negro & (distancia <= max_distancia)
+    pixeles = imagen_filled.reshape(-1, imagen_filled.shape[2])
+    pixeles[np.flatnonzero(mascara_filling)] = pixeles[origen[etiquetas[mascara_filling] - 1]]
+
     return imagen_filled
 
 
 
+def z_percentile(z_vals, percentage):
+    """
+    Percentil de los valores z, idéntico a np.percentile (interpolación lineal),
+    pero seleccionando solo los dos valores necesarios con np.partition.
+    """
+    if len(z_vals) == 0:
+        raise ValueError("La nube de puntos está vacía.")
+
+    rank, rank_bajo, rank_alto = percentile_rank(len(z_vals), percentage)
+    seleccion = np.partition(z_vals, (rank_bajo, rank_alto))
+    return percentile_lerp(seleccion[rank_bajo], seleccion[rank_alto], rank)
+
+
+def pcd_filter_mask(pcd, percentage=None, z_max=None, bbox=None):
+    """
+    Calcula en una sola pasada la máscara booleana de los puntos que cumplen
+    todos los filtros indicados, trabajando sobre vistas de los arreglos de
+    Open3D (sin copiar puntos ni colores).
+
+    Parámetros:
+    - pcd: open3d.geometry.PointCloud
+    - percentage: Recorte por percentil en z (ver `filter_pcd_percentage`). El
+      percentil se calcula sobre la nube completa.
+    - z_max: Conservar solo los puntos con z <= z_max (ver `filter_pcd`).
+    - bbox: Caja ((x_min, y_min, z_min), (x_max, y_max, z_max)); se conservan
+      los puntos dentro de la caja (límites incluidos).
+
+    Retorna:
+    - mask: numpy.ndarray booleano (N,), o None si no se indicó ningún filtro.
+    """
+    points = np.asarray(pcd.points)
+    z_vals = points[:, 2]
+    mask = None
+
+    def combinar(condicion):
+        return condicion if mask is None else np.logical_and(mask, condicion, out=mask)
+
+    if percentage is not None:
+        z_threshold = z_percentile(z_vals, abs(percentage))
+        # Parte frontal (z >= umbral) para porcentajes positivos, posterior si es negativo
+        mask = combinar(z_vals >= z_threshold if percentage >= 0 else z_vals <= z_threshold)
+    if z_max is not None:
+        mask = combinar(z_vals <= z_max)
+    if bbox is not None:
+        bbox_min, bbox_max = np.asarray(bbox[0]), np.asarray(bbox[1])
+        for eje in range(3):
+            mask = combinar(points[:, eje] >= bbox_min[eje])
+            mask = combinar(points[:, eje] <= bbox_max[eje])
+
+    return mask
+
+
+def filter_pcd_by_mask(pcd, mask, copy=True):
+    """
+    Crea la nube filtrada con una única copia (select_by_index de Open3D),
+    también si la máscara conserva todos los puntos. Con copy=False, en ese
+    caso se devuelve la misma nube sin copiarla; solo es seguro si quien llama
+    es dueño de la nube, porque modificar la filtrada (por ejemplo, con
+    `remap_image_colors_to_pcd`) modificaría también la original.
+    """
+    if mask is None or mask.all():
+        if not copy:
+            return pcd
+        import open3d as o3d
+
+        # El constructor de copia no pasa por una lista de índices
+        return o3d.geometry.PointCloud(pcd)
+    # pybind convierte una lista de enteros a std::vector<size_t> más rápido que un ndarray
+    return pcd.select_by_index(np.flatnonzero(mask).tolist())
+
+
+def filter_pcd_combined(pcd, percentage=None, z_max=None, bbox=None, copy=True):
+    """
+    Aplica varios filtros (percentil en z, corte en z y caja) en una sola pasada.
+    Ver `pcd_filter_mask` para el significado de cada parámetro y
+    `filter_pcd_by_mask` para `copy`.
+
+    Retorna:
+    - filtered_pcd: open3d.geometry.PointCloud (nueva, salvo con copy=False
+      si ningún punto queda fuera).
+    """
+    return filter_pcd_by_mask(pcd, pcd_filter_mask(pcd, percentage=percentage, z_max=z_max, bbox=bbox), copy)
+
+
 def filter_pcd(pcd, z_value):
     """
     Filtra una nube de puntos de Open3D, conservando los puntos z menores o iguales a z_value.
@@ -179,23 +352,10 @@ def filter_pcd(pcd, z_value):
     - filtered_pcd: open3d.geometry.PointCloud
         Nube de puntos filtrada en formato Open3D
     """
-    points = np.asarray(pcd.points) 
-    colors = None
-    if len(pcd.colors):
-        colors = np.asarray(pcd.colors)
-    mask = points[:, 2] <= z_value
+    return filter_pcd_combined(pcd, z_max=z_value)
 
-    filtered_points = points[mask]
-    filtered_pcd = o3d.geometry.PointCloud()
-    filtered_pcd.points = o3d.utility.Vector3dVector(filtered_points)
 
-    if colors is not None:
-        filtered_colors = colors[mask]
-        filtered_pcd.colors = o3d.utility.Vector3dVector(filtered_colors)
-    return filtered_pcd
-
-
-def filter_pcd_percentage(pcd, percentage=50):
+def filter_pcd_percentage(pcd, percentage=50, copy=True):
     """
     Filtra una nube de puntos por porcentaje en el eje Z.
     Ejemplo: porcentaje=50 => se toma el percentil 50 (mediana) 
@@ -207,6 +367,9 @@ def filter_pcd_percentage(pcd, percentage=50):
         Nube de puntos de entrada.
     percentage : float
         Porcentaje para el umbral en z (ej. 50 significa el percentil 50, la mediana).
+    copy : bool
+        Con False, si ningún punto queda fuera (por ejemplo, con percentage=0)
+        se devuelve la misma nube sin copiarla (ver `filter_pcd_by_mask`).
 
     Retorna:
     --------
@@ -214,32 +377,4 @@ def filter_pcd_percentage(pcd, percentage=50):
         Nube de puntos filtrada que conserva los puntos a partir 
         del percentil dado hacia arriba.
     """
-    points = np.asarray(pcd.points)
-    colors = np.asarray(pcd.colors) if len(pcd.colors) > 0 else None
-    
-    # Extraemos solo las coordenadas Z
-    z_vals = points[:, 2]
-
-    # Calculamos el umbral de z correspondiente al porcentaje solicitado
-    # Por ejemplo: porcentaje=50 => np.percentile(z_vals, 50) => mediana de z
-    z_threshold = np.percentile(z_vals, abs(percentage))
-
-    
-    
-    # Creamos máscara conservando solo los points con z >= z_threshold 
-    # en caso de ser un porcentaje positivo o z <= z_threshold en caso de
-    # ser negativo
-    if percentage >= 0:
-        mask = (z_vals >= z_threshold)
-    else:
-        mask = (z_vals <= z_threshold)
-
-    filtered_points = points[mask]
-    filtered_pcd = o3d.geometry.PointCloud()
-    filtered_pcd.points = o3d.utility.Vector3dVector(filtered_points)
-
-    if colors is not None:
-        colors_filtrados = colors[mask]
-        filtered_pcd.colors = o3d.utility.Vector3dVector(colors_filtrados)
-
-    return filtered_pcd
\ No newline at end of file
+    return filter_pcd_combined(pcd, percentage=percentage, copy=copy)
@@ -0,0 +1,92 @@
+"""
+Rendimiento del procesamiento en lote (nubes por hora) con nubes sintéticas,
+comparando el modo normal con el modo `pipeline` (lectura, cálculo y
+escritura solapados, solo con un proceso) y distintos niveles de compresión
+PNG:
+
+    python -m benchmarks.bench_batch
+    python -m benchmarks.bench_batch --clouds 40 --points 2000000 -w 1 --png-compression 1 9
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_pipeline import synthetic_cloud
+
+
+def write_clouds(folder, n_clouds, n_points):
+    """
+    Escribe `n_clouds` nubes sintéticas de `n_points` puntos en `folder`.
+    """
+    import open3d as o3d
+
+    for i in range(n_clouds):
+        o3d.io.write_point_cloud(os.path.join(folder, f"scan_{i:04d}.ply"), synthetic_cloud(n_points, seed=i))
+
+
+def run_batch(input_folder, output_path, repeat=1, **kw):
+    """
+    Mínimo de `repeat` ejecuciones completas (sin manifiesto previo) de
+    `process_batch` con los parámetros dados, en segundos.
+    """
+    from POP2.batch import process_batch
+
+    tiempos = []
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory(dir=output_path) as salida:
+            inicio = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                resultados = process_batch([input_folder], salida, **kw)
+            tiempos.append(time.perf_counter() - inicio)
+            if not all(r["ok"] for r in resultados):
+                raise RuntimeError(f"Fallaron nubes del lote: {[r['error'] for r in resultados if not r['ok']]}")
+    return min(tiempos)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Nubes por hora del lote, con y sin pipeline.")
+    parser.add_argument("--clouds", type=int, default=16, help="Número de nubes sintéticas.")
+    parser.add_argument("--points", type=int, default=500_000, help="Puntos por nube.")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Número de procesos (por defecto, núcleos).")
+    parser.add_argument("--png-compression", type=int, nargs="+", default=[None],
+                        help="Niveles de compresión PNG a comparar (por defecto, el de OpenCV).")
+    parser.add_argument("--repeat", type=int, default=1, help="Ejecuciones por caso (se informa el mínimo).")
+    parser.add_argument("--input", default=None,
+                        help="Carpeta con nubes .ply reales en lugar de las sintéticas.")
+    parser.add_argument("-o", "--output", default=None, help="Guardar los resultados en un JSON.")
+    args = parser.parse_args(argv)
+
+    resultados = []
+    with tempfile.TemporaryDirectory() as tmp:
+        entrada = args.input
+        if entrada is None:
+            entrada = os.path.join(tmp, "pcd")
+            os.makedirs(entrada)
+            write_clouds(entrada, args.clouds, args.points)
+        n_nubes = len([f for f in os.listdir(entrada) if f.endswith(".ply")])
+
+        print(f"{'modo':<12}{'png':>6}{'total (s)':>12}{'nubes/hora':>14}")
+        for compresion in args.png_compression:
+            for pipeline in (False, True):
+                segundos = run_batch(entrada, tmp, args.repeat, workers=args.workers, pipeline=pipeline,
+                                     png_compression=compresion)
+                modo = "pipeline" if pipeline else "normal"
+                resultados.append({"mode": modo, "png_compression": compresion, "seconds": segundos,
+                                   "clouds_per_hour": n_nubes * 3600 / segundos})
+                print(f"{modo:<12}{compresion if compresion is not None else '-':>6}{segundos:>12.2f}"
+                      f"{n_nubes * 3600 / segundos:>14.0f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"clouds": n_nubes, "points": args.points, "workers": args.workers,
+                       "cpu_count": os.cpu_count(), "results": resultados}, f, indent=1)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,318 @@
+"""
+Benchmarks del flujo de extracción de imágenes con nubes sintéticas.
+
+Cada caso (etapa x número de puntos x factor de escala) se ejecuta en un
+proceso nuevo para que el pico de memoria sea el de ese caso, y los resultados
+se guardan en un informe JSON que se puede comparar entre versiones:
+
+    python -m benchmarks.bench_pipeline -o bench_report.json
+    python -m benchmarks.bench_pipeline --sizes 10000 100000 --compare bench_report.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+STAGES = ("filter", "project", "project_lod", "mask", "fill", "fill_preserve_borders", "capture", "capture_mesh",
+          "process", "end_to_end")
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+DEFAULT_SCALE_FACTORS = (1, 5, 10)
+
+# Etapas cuyo coste no depende del factor de escala
+_SIN_ESCALA = ("filter", "capture", "capture_mesh")
+
+# Semiejes (unidades de la nube) del elipsoide sintético, del tamaño de una fruta
+_SEMIEJES = np.array([40.0, 35.0, 45.0])
+
+
+def synthetic_points(n_points, seed=0):
+    """
+    Puntos (N,3) sobre la superficie de un elipsoide con algo de ruido y
+    colores (N,3) en [0,1] que varían del verde al rojo a lo largo de Z.
+    """
+    rng = np.random.default_rng(seed)
+    direcciones = rng.standard_normal((n_points, 3))
+    direcciones /= np.linalg.norm(direcciones, axis=1, keepdims=True)
+    points = direcciones * _SEMIEJES * (1 + 0.01 * rng.standard_normal((n_points, 1)))
+
+    t = (direcciones[:, 2:3] + 1) / 2
+    colors = np.hstack([t, 1 - t, np.full_like(t, 0.2)]) + 0.05 * rng.standard_normal((n_points, 3))
+    return points, np.clip(colors, 0, 1)
+
+
+def synthetic_cloud(n_points, seed=0):
+    """
+    Nube de Open3D con los puntos y colores de `synthetic_points`.
+    """
+    import open3d as o3d
+
+    points, colors = synthetic_points(n_points, seed)
+    pcd = o3d.geometry.PointCloud()
+    pcd.points = o3d.utility.Vector3dVector(points)
+    pcd.colors = o3d.utility.Vector3dVector(colors)
+    return pcd
+
+
+def synthetic_mesh(n_vertices):
+    """
+    Malla de Open3D del mismo elipsoide (una esfera escalada por los semiejes)
+    con unos `n_vertices` vértices, colores del verde al rojo a lo largo de Z
+    y normales de vértices y triángulos.
+    """
+    import open3d as o3d
+
+    # La esfera de Open3D tiene 2 * resolución * (resolución - 1) + 2 vértices
+    resolucion = max(int(np.sqrt(n_vertices / 2)), 2)
+    mesh = o3d.geometry.TriangleMesh.create_sphere(radius=1.0, resolution=resolucion)
+    vertices = np.asarray(mesh.vertices) * _SEMIEJES
+    mesh.vertices = o3d.utility.Vector3dVector(vertices)
+
+    t = (vertices[:, 2:3] / _SEMIEJES[2] + 1) / 2
+    mesh.vertex_colors = o3d.utility.Vector3dVector(np.hstack([t, 1 - t, np.full_like(t, 0.2)]))
+    mesh.compute_vertex_normals()
+    return mesh
+
+
+def _peak_rss_mb():
+    # ru_maxrss está en KB en Linux y en bytes en macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / (1 << 20) if sys.platform == "darwin" else maxrss / 1024
+
+
+def _prepare(stage, n_points, scale_factor, views, renderer):
+    """
+    Prepara las entradas de una etapa (sin medirlas) y devuelve la función que
+    la ejecuta, el número de unidades que procesa y el nombre de la unidad.
+    """
+    import cv2
+    from POP2.extract_image_pcd import point_cloud_to_image
+    from POP2.pipeline import process_cloud
+    from POP2.util import (change_image_color, fill_missing_pixels, fill_missing_pixels_preserve_borders,
+                           filter_pcd_percentage)
+
+    if stage == "capture_mesh":
+        import open3d as o3d
+        from POP2.capture3d import _capture_file
+
+        # Se conserva mientras viva la función que la usa
+        carpeta = tempfile.TemporaryDirectory(prefix="bench_mesh_")
+        path = os.path.join(carpeta.name, "bench_mesh.ply")
+        o3d.io.write_triangle_mesh(path, synthetic_mesh(n_points))
+        capture_params = dict(num_yaw=views, num_pitch=1, num_roll=1)
+
+        def capture_mesh():
+            # Camino de process_input_folder: lectura de la malla, normales, vistas y escritura de los PNG
+            with contextlib.redirect_stdout(io.StringIO()):
+                _capture_file(path, carpeta.name, capture_params, renderer, writer_threads=4)
+        return capture_mesh, views, "images"
+
+    pcd = synthetic_cloud(n_points)
+    if stage == "filter":
+        return lambda: filter_pcd_percentage(pcd, 60), n_points, "points"
+    if stage == "process":
+        # Flujo en memoria sobre la nube ya cargada
+        return lambda: process_cloud(pcd, cut_percentage=60, scale_factor=scale_factor), n_points, "points"
+    if stage == "end_to_end":
+        import open3d as o3d
+        from POP2.batch import _process_one
+
+        # Camino de process_batch para una nube: hash y lectura del .ply, proceso y escritura de los PNG
+        carpeta = tempfile.TemporaryDirectory(prefix="bench_e2e_")
+        path = os.path.join(carpeta.name, "bench.ply")
+        o3d.io.write_point_cloud(path, pcd)
+        os.makedirs(os.path.join(carpeta.name, "color"))
+        os.makedirs(os.path.join(carpeta.name, "mask"))
+        params = dict(cut_percentage=60, scale_factor=scale_factor)
+
+        def end_to_end():
+            resultado = _process_one(path, carpeta.name, "bench", params)
+            if not resultado["ok"]:
+                raise RuntimeError(resultado["error"])
+        return end_to_end, n_points, "points"
+
+    if stage == "capture":
+        from POP2.render import rotation_matrices_xyz, view_angles
+        angles = view_angles(num_yaw=views, num_pitch=1, num_roll=1)
+
+        if renderer == "open3d":
+            from POP2.capture3d import capture_views_for_pcd
+
+            def capture():
+                with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+                    capture_views_for_pcd(pcd, "bench", tmp, num_yaw=views, num_pitch=1, num_roll=1)
+            return capture, views, "images"
+
+        from POP2.render import render_views
+        points, colors = np.asarray(pcd.points), np.asarray(pcd.colors)
+
+        def capture():
+            # Renderizado y codificación PNG de cada vista, sin escribir en disco
+            for img in render_views(points, colors, rotation_matrices_xyz(angles)):
+                cv2.imencode(".png", img)
+        return capture, views, "images"
+
+    filtrada = filter_pcd_percentage(pcd, 60)
+    if stage == "project":
+        return lambda: point_cloud_to_image(filtrada, scale_factor), len(filtrada.points), "points"
+    if stage == "project_lod":
+        from POP2.lod import lod_downsample
+
+        def project_lod():
+            # Reducción por vóxeles (un vóxel por pixel) y proyección de la nube reducida
+            reducida, grid = lod_downsample(filtrada, "auto", scale_factor)
+            return point_cloud_to_image(reducida, grid=grid)
+        return project_lod, len(filtrada.points), "points"
+
+    img = cv2.cvtColor(point_cloud_to_image(filtrada, scale_factor), cv2.COLOR_RGB2BGR)
+    if stage == "mask":
+        return lambda: change_image_color(img, (255, 255, 255)), 1, "images"
+    if stage == "fill":
+        return lambda: fill_missing_pixels(img, iteraciones=1), 1, "images"
+    if stage == "fill_preserve_borders":
+        def fill():
+            with contextlib.redirect_stdout(io.StringIO()):
+                fill_missing_pixels_preserve_borders(img)
+        return fill, 1, "images"
+    raise ValueError(f"Etapa no soportada: {stage}. Opciones: {STAGES}")
+
+
+def run_case(stage, n_points, scale_factor=None, repeat=3, views=25, renderer="software"):
+    """
+    Mide una etapa: tiempo de `repeat` ejecuciones, pico de memoria residente
+    del proceso, memoria adicional respecto a la de las entradas y pico de
+    memoria reservada durante la etapa (tracemalloc, en una ejecución aparte
+    para no alterar los tiempos).
+    """
+    funcion, unidades, unidad = _prepare(stage, n_points, scale_factor, views, renderer)
+    rss_entradas = _peak_rss_mb()
+
+    tiempos = []
+    for _ in range(repeat):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    rss_pico = _peak_rss_mb()
+
+    tracemalloc.start()
+    funcion()
+    _, pico_reservas = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    wall_s = min(tiempos)
+    return {"stage": stage, "n_points": n_points, "scale_factor": scale_factor, "repeat": repeat,
+            "wall_s": wall_s, "wall_s_mean": float(np.mean(tiempos)),
+            "peak_rss_mb": rss_pico, "rss_delta_mb": rss_pico - rss_entradas,
+            "tracemalloc_peak_mb": pico_reservas / (1 << 20),
+            f"{unidad}_per_s": unidades / wall_s if wall_s > 0 else None}
+
+
+def _cases(stages, sizes, scale_factors):
+    for stage in stages:
+        for n_points in sizes:
+            for scale_factor in ([None] if stage in _SIN_ESCALA else scale_factors):
+                yield stage, n_points, scale_factor
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(stages=STAGES, sizes=DEFAULT_SIZES, scale_factors=DEFAULT_SCALE_FACTORS, repeat=3,
+                   views=25, renderer="software", isolate=True):
+    """
+    Ejecuta todos los casos y devuelve el informe (dict serializable en JSON).
+    Con `isolate` cada caso se ejecuta en un proceso nuevo.
+    """
+    resultados = []
+    for stage, n_points, scale_factor in _cases(stages, sizes, scale_factors):
+        argumentos = (stage, n_points, scale_factor, repeat, views, renderer)
+        if isolate:
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                resultado = pool.submit(run_case, *argumentos).result()
+        else:
+            resultado = run_case(*argumentos)
+        resultados.append(resultado)
+        print(f"{stage:>22} n={n_points:>9} escala={scale_factor!s:>4}: {resultado['wall_s']:.4f} s, "
+              f"pico RSS {resultado['peak_rss_mb']:.0f} MB")
+
+    return {"meta": {"commit": _git_commit(), "python": platform.python_version(), "numpy": np.__version__,
+                     "platform": platform.platform(), "cpu_count": os.cpu_count(),
+                     "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "repeat": repeat, "views": views,
+                     "renderer": renderer},
+            "results": resultados}
+
+
+def compare_reports(anterior, actual, threshold=0.10, min_delta_s=1e-3):
+    """
+    Compara el tiempo de cada caso entre dos informes y devuelve la lista de
+    casos cuyo tiempo empeoró más que `threshold` (fracción) y, para ignorar
+    el ruido de los casos muy rápidos, más de `min_delta_s` segundos.
+    """
+    def clave(r):
+        return r["stage"], r["n_points"], r["scale_factor"]
+
+    previos = {clave(r): r for r in anterior["results"]}
+    regresiones = []
+    for r in actual["results"]:
+        previo = previos.get(clave(r))
+        if previo is None:
+            continue
+        cambio = r["wall_s"] / previo["wall_s"] - 1
+        regresion = cambio > threshold and r["wall_s"] - previo["wall_s"] > min_delta_s
+        marca = "  REGRESIÓN" if regresion else ""
+        print(f"{r['stage']:>22} n={r['n_points']:>9} escala={r['scale_factor']!s:>4}: "
+              f"{previo['wall_s']:.4f} s -> {r['wall_s']:.4f} s ({cambio:+.1%}){marca}")
+        if regresion:
+            regresiones.append(clave(r))
+    return regresiones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks del flujo de extracción con nubes sintéticas.")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--sizes", nargs="+", type=int, default=list(DEFAULT_SIZES),
+                        help="Número de puntos de las nubes sintéticas (por ejemplo 10000 ... 10000000).")
+    parser.add_argument("--scale-factors", nargs="+", type=float, default=list(DEFAULT_SCALE_FACTORS))
+    parser.add_argument("--repeat", type=int, default=3, help="Repeticiones por caso (se informa el mínimo).")
+    parser.add_argument("--views", type=int, default=25, help="Vistas por caso de la etapa 'capture'.")
+    parser.add_argument("--renderer", choices=("software", "open3d"), default="software",
+                        help="Renderizador de la etapa 'capture' ('open3d' requiere pantalla/OpenGL).")
+    parser.add_argument("--no-isolate", action="store_true", help="Ejecutar todos los casos en el proceso actual.")
+    parser.add_argument("-o", "--output", default="bench_report.json", help="Informe JSON de salida.")
+    parser.add_argument("--compare", default=None, help="Informe anterior con el que comparar los tiempos.")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Empeoramiento relativo a partir del cual se marca una regresión.")
+    args = parser.parse_args(argv)
+
+    informe = run_benchmarks(args.stages, args.sizes, args.scale_factors, repeat=args.repeat, views=args.views,
+                             renderer=args.renderer, isolate=not args.no_isolate)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(informe, f, indent=1)
+    print("Informe guardado en", args.output)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            anterior = json.load(f)
+        if compare_reports(anterior, informe, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
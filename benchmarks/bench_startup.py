@@ -0,0 +1,90 @@
+"""
+Tiempo de arranque: cuánto tarda un intérprete nuevo en importar cada módulo
+de POP2 (y en ejecutar `python -m POP2.cli --help`), y si esa importación
+carga Open3D. Es el coste que paga cada ejecución corta y cada proceso de un
+pool que no hereda los módulos ya importados (spawn).
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --repeat 10 -o startup.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+MODULES = ("numpy", "cv2", "open3d", "POP2.cli", "POP2.util", "POP2.extract_image_pcd", "POP2.pipeline",
+           "POP2.batch", "POP2.capture3d", "POP2.service", "main", "main2")
+
+_RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _run(argumentos):
+    inicio = time.perf_counter()
+    proceso = subprocess.run([sys.executable, *argumentos], cwd=_RAIZ, capture_output=True, text=True)
+    return time.perf_counter() - inicio, proceso
+
+
+def measure(argumentos, repeat=5):
+    """
+    Mínimo de `repeat` ejecuciones de un intérprete nuevo con los argumentos
+    dados, y la salida de la última (None si falló).
+    """
+    tiempos, salida = [], None
+    for _ in range(repeat):
+        segundos, proceso = _run(argumentos)
+        if proceso.returncode != 0:
+            return None, None
+        tiempos.append(segundos)
+        salida = proceso.stdout
+    return min(tiempos), salida
+
+
+def run_startup(modules=MODULES, repeat=5):
+    """
+    Retorna:
+    --------
+    resultados : list of dict
+        Uno por caso, con 'case', 'seconds' (None si falló la importación),
+        'import_s' (descontado el arranque del intérprete) y 'open3d' (si la
+        importación carga Open3D).
+    """
+    base, _ = measure(["-c", "pass"], repeat)
+    resultados = [{"case": "python", "seconds": base, "import_s": 0.0, "open3d": False}]
+
+    segundos, _ = measure(["-m", "POP2.cli", "--help"], repeat)
+    resultados.append({"case": "POP2.cli --help", "seconds": segundos,
+                       "import_s": segundos - base if segundos is not None else None, "open3d": False})
+
+    for modulo in modules:
+        codigo = f"import sys, {modulo}; sys.stdout.write(str('open3d' in sys.modules))"
+        segundos, salida = measure(["-c", codigo], repeat)
+        resultados.append({"case": f"import {modulo}", "seconds": segundos,
+                           "import_s": segundos - base if segundos is not None else None,
+                           "open3d": salida == "True" if salida is not None else None})
+    return resultados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tiempo de arranque de los módulos y la línea de comandos.")
+    parser.add_argument("--repeat", type=int, default=5, help="Ejecuciones por caso (se informa el mínimo).")
+    parser.add_argument("-o", "--output", default=None, help="Guardar los resultados en un JSON.")
+    args = parser.parse_args(argv)
+
+    resultados = run_startup(repeat=args.repeat)
+    print(f"{'caso':<32}{'total (s)':>10}{'import (s)':>12}{'open3d':>8}")
+    for r in resultados:
+        if r["seconds"] is None:
+            print(f"{r['case']:<32}{'error':>10}")
+            continue
+        print(f"{r['case']:<32}{r['seconds']:>10.3f}{r['import_s']:>12.3f}{'sí' if r['open3d'] else 'no':>8}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "repeat": args.repeat, "results": resultados}, f, indent=1)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
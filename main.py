@@ -1,71 +1,54 @@
-import glob
-import open3d as o3d
-from POP2.extract_image_pcd import point_cloud_to_image
-from POP2.util import *
-import os
+import cv2
+from POP2.util import filter_pcd_percentage
+from POP2.pipeline import load_point_cloud, process_cloud
+from POP2.instrument import format_summary, recording, stage, summarize
 
 
 
-def main(pcd_path, output_path, n=0, cut_percentage=60, scale_factor=5, fillrgb_iterations=1, fillmask_iterations=1):
+def main(pcd_path, output_path, n=0, cut_percentage=60, scale_factor=5, fillrgb_iterations=1, fillmask_iterations=1,
+         fill_method="basic", visualize=False, profile=False):
     
-    if not os.path.exists("./tmp/"):
-        os.makedirs("./tmp/")
-    
-    # 1. Cargar nube de puntos
-    pcd = o3d.io.read_point_cloud(pcd_path)
-
-    # Filtrado por porcentaje
-    pcd = filter_pcd_percentage(pcd, cut_percentage)
-
-    o3d.visualization.draw_geometries([pcd])
-
-    # 2. Imagen proyectada
-    img = point_cloud_to_image(pcd, scale_factor)
- 
-    projected_img_path = f"./tmp/projected_image.png"
-    cv2.imwrite(projected_img_path, cv2.cvtColor(img, cv2.COLOR_RGB2BGR))
-    print(f"Imagen proyectada guardada como '{projected_img_path}' con resolucion {img.shape}.")
-
-    if not os.path.exists(projected_img_path):
-        raise ValueError("No se pudo guardar la imagen proyectada.")
-
-    # 3. Modificar la imagen: cambiar píxeles no negros e.g rojo=(BGR=(0,0,255))
-    
-    imagen = change_image_color(projected_img_path, (255,255,255))
-
-    modified_img_path = f"./tmp/imagen_modificada.png"
-    cv2.imwrite(modified_img_path, imagen)
-    print(f"Imagen modificada guardada como '{modified_img_path}'.")
-
-    if not os.path.exists(modified_img_path):
-        raise ValueError("No se pudo guardar la imagen modificada.")
-
+    if profile:
+        # Medir cada etapa (carga, recorte, proyección, máscara, relleno, escritura)
+        with recording(path=pcd_path) as recorder:
+            main(pcd_path, output_path, n, cut_percentage, scale_factor, fillrgb_iterations, fillmask_iterations,
+                 fill_method, visualize)
+        print(format_summary(summarize(recorder.events)))
+        return
 
-    # Relleno de pixeles metodo 1
-    imagen_rellenada  = fill_missing_pixels(projected_img_path, iteraciones=fillrgb_iterations)
-    cv2.imwrite(f"{output_path}color/imagen_rellenada_{n}.png", imagen_rellenada)
-
-    imagen_rellenada_mascara  = fill_missing_pixels(modified_img_path, iteraciones=fillmask_iterations)
-    cv2.imwrite(f"{output_path}mask/mask_{n}.png", imagen_rellenada_mascara)
+    # 1. Cargar nube de puntos
+    pcd = load_point_cloud(pcd_path)
 
+    if visualize:
+        import open3d as o3d
+        o3d.visualization.draw_geometries([filter_pcd_percentage(pcd, cut_percentage)])
 
-    # Relleno de pixeles metodo 2. (Experimental, da buenos resultados cuando no se utiliza un factor de escala muy grande > 10)
-    # imagen_rellenada  = fill_missing_pixels_preserve_borders(projected_img_path, iteraciones=fillrgb_iterations)
-    # cv2.imwrite(f"{output_path}color/imagen_rellenada_{n}.png", imagen_rellenada)
+    # 2-4. Recorte, proyección, máscara y relleno en memoria (sin archivos en ./tmp/)
+    # fill_method="preserve_borders": relleno metodo 2. (Experimental, da buenos resultados cuando no se utiliza un factor de escala muy grande > 10)
+    imagen_rellenada, imagen_rellenada_mascara = process_cloud(
+        pcd, cut_percentage=cut_percentage, scale_factor=scale_factor,
+        fillrgb_iterations=fillrgb_iterations, fillmask_iterations=fillmask_iterations,
+        fill_method=fill_method)
+    print(f"Imagen proyectada de '{pcd_path}' con resolucion {imagen_rellenada.shape}.")
 
-    # imagen_rellenada_mascara  = fill_missing_pixels_preserve_borders(modified_img_path, iteraciones=fillmask_iterations)
-    # cv2.imwrite(f"{output_path}mask/mask_{n}.png", imagen_rellenada_mascara)
+    with stage("write_png"):
+        cv2.imwrite(f"{output_path}color/imagen_rellenada_{n}.png", imagen_rellenada)
+        cv2.imwrite(f"{output_path}mask/mask_{n}.png", imagen_rellenada_mascara)
 
 
 if __name__ == "__main__":
     # PROCESO PARA UNA SOLA NUBE
     pcd_path = "data/POP2/mango/pcd/1209_02_pc.ply"
     output_path = "data/POP2/mango/"
-    main(pcd_path, output_path,cut_percentage=50, scale_factor=10)
+    main(pcd_path, output_path,cut_percentage=50, scale_factor=10, visualize=True)
 
-    # # PROCESO PARA VARIAS NUBES
+    # # PROCESO PARA VARIAS NUBES (en paralelo, sin interfaz gráfica)
+    # También disponible por línea de comandos: python -m POP2.batch "data/POP2/*.ply" -o data/POP2/mango/
+    # from POP2.batch import process_batch
     # output_path = "data/POP2/mango/"
-    # pcds = glob.glob('data/POP2/*.ply')
-    # for id_, pcd_path in enumerate(pcds, start=1):
-    #     main(pcd_path, output_path, n=id_)
+    # process_batch('data/POP2/*.ply', output_path)
+
+    # # PROCESO BAJO DEMANDA (servicio con procesos ya inicializados, ver POP2/service.py)
+    # python -m POP2.service serve --unix /tmp/pop2.sock
+    # python -m POP2.service submit --unix /tmp/pop2.sock data/POP2/mango/pcd/1209_02_pc.ply -o data/POP2/mango/
 
@@ -1,9 +1,4 @@
-import glob
-import open3d as o3d
-from POP2.extract_image_pcd import point_cloud_to_image
-from POP2.util import *
-from POP2.capture3d import *
-import os
+from POP2.capture3d import process_input_folder
 
 if __name__ == "__main__":
 
@@ -0,0 +1,71 @@
+import os
+
+import numpy as np
+import pytest
+from POP2.batch import output_paths, process_batch
+from POP2.manifest import load_manifest, save_manifest
+
+
+def _write_ply(path, n_points=500, seed=0):
+    # PLY ASCII mínimo con color; se lee con chunk_size, sin Open3D
+    rng = np.random.default_rng(seed)
+    points = rng.normal(size=(n_points, 3)) * 10
+    colors = rng.integers(0, 256, (n_points, 3))
+    with open(path, "w", encoding="ascii") as f:
+        f.write(f"ply\nformat ascii 1.0\nelement vertex {n_points}\n"
+                "property float x\nproperty float y\nproperty float z\n"
+                "property uchar red\nproperty uchar green\nproperty uchar blue\nend_header\n")
+        for (x, y, z), (r, g, b) in zip(points, colors):
+            f.write(f"{x} {y} {z} {r} {g} {b}\n")
+
+
+def test_duplicate_ids_from_different_folders_fail(tmp_path):
+    for carpeta in ("a", "b"):
+        os.makedirs(tmp_path / carpeta)
+        _write_ply(tmp_path / carpeta / "scan.ply")
+    _write_ply(tmp_path / "a" / "otra.ply")
+    salida = tmp_path / "salida"
+
+    with pytest.raises(ValueError, match="scan"):
+        process_batch([str(tmp_path / "a"), str(tmp_path / "b")], str(salida), workers=1, chunk_size=100)
+    assert not salida.exists()
+
+
+def test_distinct_ids_from_different_folders(tmp_path):
+    for i, carpeta in enumerate(("a", "b")):
+        os.makedirs(tmp_path / carpeta)
+        _write_ply(tmp_path / carpeta / f"scan_{carpeta}.ply", seed=i)
+    salida = str(tmp_path / "salida")
+
+    resultados = process_batch([str(tmp_path / "a"), str(tmp_path / "b")], salida, workers=1, chunk_size=100)
+
+    assert [r["ok"] for r in resultados] == [True, True]
+    for r in resultados:
+        assert all(os.path.exists(p) for p in output_paths(salida, r["id"]))
+
+
+def test_chunk_size_does_not_invalidate_manifest(tmp_path):
+    _write_ply(tmp_path / "scan.ply")
+    salida = str(tmp_path / "salida")
+
+    primero = process_batch([str(tmp_path / "scan.ply")], salida, workers=1, chunk_size=100)
+    segundo = process_batch([str(tmp_path / "scan.ply")], salida, workers=1, chunk_size=37)
+
+    assert primero[0]["ok"] and not primero[0]["skipped"]
+    assert segundo[0]["skipped"]
+
+
+def test_manifest_from_older_versions_still_matches(tmp_path):
+    _write_ply(tmp_path / "scan.ply")
+    salida = str(tmp_path / "salida")
+    process_batch([str(tmp_path / "scan.ply")], salida, workers=1, chunk_size=100)
+
+    # Versiones anteriores guardaban chunk_size y splat_radius = 0 en los parámetros
+    manifest = load_manifest(salida)
+    for entry in manifest["entries"].values():
+        entry["params"].update(chunk_size=100, splat_radius=0)
+    save_manifest(salida, manifest)
+
+    resultados = process_batch([str(tmp_path / "scan.ply")], salida, workers=1, chunk_size=100)
+    assert resultados[0]["skipped"]
+    assert "splat_radius" not in load_manifest(salida)["entries"]["scan"]["params"]
@@ -0,0 +1,81 @@
+import json
+
+import pytest
+from POP2 import canvas
+from POP2.canvas import load_canvas, shared_canvas
+from test_batch import _write_ply
+
+
+@pytest.fixture
+def clouds(tmp_path):
+    paths = []
+    for i in range(3):
+        _write_ply(tmp_path / f"scan_{i}.ply", seed=i)
+        paths.append(str(tmp_path / f"scan_{i}.ply"))
+    return paths
+
+
+def _count_bounds(monkeypatch):
+    # Cuenta las nubes que se leen para calcular el lienzo
+    leidas = []
+    original = canvas._safe_bounds
+
+    def contar(pcd_path, *args):
+        leidas.append(pcd_path)
+        return original(pcd_path, *args)
+
+    monkeypatch.setattr(canvas, "_safe_bounds", contar)
+    return leidas
+
+
+def test_cache_is_reused(tmp_path, clouds, monkeypatch):
+    cache = str(tmp_path / "canvas.json")
+    grid = shared_canvas(clouds, scale_factor=2, chunk_size=100, cache_path=cache)
+    assert load_canvas(cache) == grid
+
+    leidas = _count_bounds(monkeypatch)
+    # chunk_size no cambia los límites, así que tampoco invalida la caché
+    assert shared_canvas(clouds, scale_factor=2, chunk_size=37, cache_path=cache) == grid
+    assert leidas == []
+
+
+def test_cache_is_invalidated_when_an_input_changes(tmp_path, clouds, monkeypatch):
+    cache = str(tmp_path / "canvas.json")
+    grid = shared_canvas(clouds, scale_factor=2, chunk_size=100, cache_path=cache)
+
+    # Nube distinta y más grande: cambian su tamaño y los límites conjuntos
+    _write_ply(clouds[1], n_points=2000, seed=10)
+    leidas = _count_bounds(monkeypatch)
+    nuevo = shared_canvas(clouds, scale_factor=2, chunk_size=100, cache_path=cache)
+
+    assert sorted(leidas) == sorted(clouds)
+    assert nuevo != grid
+    assert nuevo == shared_canvas(clouds, scale_factor=2, chunk_size=100)
+    assert load_canvas(cache) == nuevo
+
+
+@pytest.mark.parametrize("cambio", [{"scale_factor": 3}, {"cut_percentage": 30}, {"size": (64, 48)}])
+def test_cache_is_invalidated_when_params_change(tmp_path, clouds, monkeypatch, cambio):
+    cache = str(tmp_path / "canvas.json")
+    params = dict(scale_factor=2, cut_percentage=60, size=None, chunk_size=100)
+    shared_canvas(clouds, cache_path=cache, **params)
+
+    params.update(cambio)
+    leidas = _count_bounds(monkeypatch)
+    nuevo = shared_canvas(clouds, cache_path=cache, **params)
+
+    assert sorted(leidas) == sorted(clouds)
+    assert nuevo == shared_canvas(clouds, **params)
+    with open(cache, "r", encoding="utf-8") as f:
+        assert json.load(f)["params"]["scale_factor"] == params["scale_factor"]
+
+
+def test_cache_is_invalidated_when_inputs_are_added(tmp_path, clouds, monkeypatch):
+    cache = str(tmp_path / "canvas.json")
+    shared_canvas(clouds[:2], scale_factor=2, chunk_size=100, cache_path=cache)
+
+    leidas = _count_bounds(monkeypatch)
+    nuevo = shared_canvas(clouds, scale_factor=2, chunk_size=100, cache_path=cache)
+
+    assert sorted(leidas) == sorted(clouds)
+    assert nuevo == shared_canvas(clouds, scale_factor=2, chunk_size=100)
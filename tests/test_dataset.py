@@ -0,0 +1,102 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+from POP2.batch import output_paths, process_batch
+from POP2.dataset import ShardDataset, ShardWriter, TensorWriter, load_tensors
+from test_batch import _write_ply
+
+
+def _records(n, seed=0):
+    # Registros con formas y tipos distintos, para que los arreglos queden desalineados
+    rng = np.random.default_rng(seed)
+    for i in range(n):
+        alto, ancho = rng.integers(1, 40, 2)
+        yield ({"image": rng.integers(0, 256, (alto, ancho, 3), dtype=np.uint8),
+                "mask": rng.integers(0, 2, (alto, ancho), dtype=np.uint8) * 255,
+                "depth": rng.normal(size=(alto, ancho)).astype(np.float32)},
+               {"source": f"scan_{i}.ply", "id": f"scan_{i}"})
+
+
+@pytest.mark.parametrize("shard_bytes", [1 << 30, 2000])
+def test_shard_round_trip(tmp_path, shard_bytes):
+    registros = list(_records(25))
+    with ShardWriter(str(tmp_path), shard_bytes=shard_bytes) as writer:
+        for arrays, meta in registros:
+            writer.add(arrays, meta)
+
+    dataset = ShardDataset(str(tmp_path))
+    assert len(dataset) == len(registros)
+    for i in reversed(range(len(registros))):
+        arrays, meta = dataset[i]
+        assert meta == registros[i][1] == dataset.meta(i)
+        assert arrays.keys() == registros[i][0].keys()
+        for nombre, arr in arrays.items():
+            assert arr.dtype == registros[i][0][nombre].dtype
+            np.testing.assert_array_equal(arr, registros[i][0][nombre])
+            assert not arr.flags.writeable
+    if shard_bytes == 2000:
+        assert len([f for f in os.listdir(tmp_path) if f.startswith("shard_")]) > 1
+
+
+def test_shard_writer_replaces_existing_dataset(tmp_path):
+    with ShardWriter(str(tmp_path), shard_bytes=2000) as writer:
+        for arrays, meta in _records(25):
+            writer.add(arrays, meta)
+    nuevos = list(_records(3, seed=1))
+    with ShardWriter(str(tmp_path)) as writer:
+        for arrays, meta in nuevos:
+            writer.write(os.path.join("color", f"{meta['id']}.png"), arrays["image"], meta)
+
+    dataset = ShardDataset(str(tmp_path))
+    assert len(dataset) == 3
+    assert sorted(f for f in os.listdir(tmp_path) if f.startswith("shard_")) == ["shard_00000.bin"]
+    arrays, meta = dataset[2]
+    np.testing.assert_array_equal(arrays["image"], nuevos[2][0]["image"])
+    assert meta["name"] == "scan_2.png"
+
+
+def test_shard_dataset_reads_subfolders(tmp_path):
+    # Como la salida de process_input_folder: un conjunto de datos por objeto
+    for objeto, seed in (("obj_b", 1), ("obj_a", 0)):
+        with ShardWriter(str(tmp_path / objeto)) as writer:
+            for arrays, meta in _records(2, seed):
+                writer.add(arrays, dict(meta, objeto=objeto))
+
+    dataset = ShardDataset(str(tmp_path))
+    assert [dataset.meta(i)["objeto"] for i in range(len(dataset))] == ["obj_a", "obj_a", "obj_b", "obj_b"]
+
+
+def test_tensor_round_trip(tmp_path):
+    rng = np.random.default_rng(0)
+    images = rng.integers(0, 256, (3, 8, 10, 3), dtype=np.uint8)
+    masks = rng.integers(0, 2, (3, 8, 10), dtype=np.uint8) * 255
+    with TensorWriter(str(tmp_path), 4, 8, 10) as writer:
+        for i in (2, 0, 1):
+            # Las máscaras pueden llegar con tres canales, como las escribe process_cloud
+            mask = np.repeat(masks[i][..., None], 3, axis=2) if i == 1 else masks[i]
+            writer.add(i, {"image": images[i], "mask": mask}, {"id": f"scan_{i}"})
+
+    leidas, mascaras, records = load_tensors(str(tmp_path))
+    np.testing.assert_array_equal(leidas[:3], images)
+    np.testing.assert_array_equal(mascaras[:3], masks)
+    # La fila sin nube (por ejemplo, una que falló) queda a cero y sin metadatos
+    assert not leidas[3].any() and not mascaras[3].any()
+    assert records == [{"id": "scan_0"}, {"id": "scan_1"}, {"id": "scan_2"}, None]
+
+
+def test_batch_shards_match_png_output(tmp_path):
+    for i in range(3):
+        _write_ply(tmp_path / f"scan_{i}.ply", seed=i)
+    entradas = [str(tmp_path / f"scan_{i}.ply") for i in range(3)]
+    process_batch(entradas, str(tmp_path / "png"), workers=1, chunk_size=100)
+    process_batch(entradas, str(tmp_path / "shards"), workers=1, chunk_size=100, output_format="shards")
+
+    dataset = ShardDataset(str(tmp_path / "shards"))
+    assert len(dataset) == 3
+    for i in range(3):
+        arrays, meta = dataset[i]
+        color, mask = output_paths(str(tmp_path / "png"), meta["id"])
+        np.testing.assert_array_equal(arrays["image"], cv2.imread(color))
+        np.testing.assert_array_equal(arrays["mask"], cv2.imread(mask))
@@ -0,0 +1,74 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from POP2.extract_image_pcd import point_cloud_to_image
+
+
+def _loop_point_cloud_to_image(pcd, custom_scale_factor=1):
+    # Versión original con bucle por punto (antes de vectorizar la proyección)
+    points = np.asarray(pcd.points)
+    colors = np.asarray(pcd.colors)
+    if colors.size == 0:
+        colors = np.ones((len(points), 3), dtype=np.float32)
+    colors_255 = (colors * 255).astype(np.uint8)
+
+    x_vals = points[:, 0]
+    y_vals = points[:, 1]
+    x_min, x_max = x_vals.min() - 5, x_vals.max() + 5
+    y_min, y_max = y_vals.min() - 5, y_vals.max() + 5
+    x_range = (x_max - x_min)
+    y_range = (y_max - y_min)
+    if x_range == 0:
+        x_range = 1e-6
+    if y_range == 0:
+        y_range = 1e-6
+
+    min_dimension = 200
+    mayor_rango = max(x_range, y_range)
+    if mayor_rango < 1:
+        scale_factor = min_dimension / mayor_rango
+    else:
+        scale_factor = custom_scale_factor
+
+    img_width = max(int(np.ceil(x_range * scale_factor)), 1)
+    img_height = max(int(np.ceil(y_range * scale_factor)), 1)
+    x_pixels = ((x_vals - x_min) * scale_factor).astype(int)
+    y_pixels = img_height - 1 - ((y_vals - y_min) * scale_factor).astype(int)
+
+    img = np.zeros((img_height, img_width, 3), dtype=np.uint8)
+    for (xp, yp, c) in zip(x_pixels, y_pixels, colors_255):
+        if 0 <= xp < img_width and 0 <= yp < img_height:
+            img[yp, xp] = c
+    return img
+
+
+def _cloud(n_points, spread, seed=0, with_colors=True):
+    # Sustituto de open3d.geometry.PointCloud: la proyección solo usa points y colors
+    rng = np.random.default_rng(seed)
+    points = rng.normal(size=(n_points, 3)) * spread
+    colors = rng.random((n_points, 3)) if with_colors else np.empty((0, 3))
+    return SimpleNamespace(points=points, colors=colors)
+
+
+@pytest.mark.parametrize("scale_factor", [1, 2.5, 5])
+@pytest.mark.parametrize("spread", [3.0, 40.0])
+def test_last_collision_matches_original_loop(scale_factor, spread):
+    # Con dispersión pequeña muchos puntos caen en el mismo pixel: gana el último
+    pcd = _cloud(20000, spread)
+    np.testing.assert_array_equal(point_cloud_to_image(pcd, scale_factor, collision="last"),
+                                  _loop_point_cloud_to_image(pcd, scale_factor))
+
+
+def test_last_collision_matches_original_loop_with_repeated_points():
+    # Los mismos puntos repetidos con colores distintos: cada pixel lo pinta la última copia
+    pcd = _cloud(2000, 10.0, seed=1)
+    rng = np.random.default_rng(1)
+    pcd.points = np.tile(pcd.points, (3, 1))
+    pcd.colors = rng.random((len(pcd.points), 3))
+    np.testing.assert_array_equal(point_cloud_to_image(pcd, 5, collision="last"), _loop_point_cloud_to_image(pcd, 5))
+
+
+def test_last_collision_matches_original_loop_without_colors():
+    pcd = _cloud(5000, 10.0, seed=2, with_colors=False)
+    np.testing.assert_array_equal(point_cloud_to_image(pcd, 5, collision="last"), _loop_point_cloud_to_image(pcd, 5))
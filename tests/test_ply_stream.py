@@ -0,0 +1,80 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from POP2.extract_image_pcd import point_cloud_to_image
+from POP2.ply_stream import ply_z_percentile, project_ply
+from POP2.util import pcd_filter_mask
+
+FORMATS = {"binary_little_endian": "<", "binary_big_endian": ">", "ascii": None}
+
+
+def _write_ply(path, points, colors, formato="binary_little_endian"):
+    # Vértices con una propiedad extra entre las coordenadas y el color
+    n = len(points)
+    orden = FORMATS[formato]
+    header = (f"ply\nformat {formato} 1.0\nelement vertex {n}\n"
+              "property float x\nproperty float y\nproperty float z\nproperty float nx\n"
+              "property uchar red\nproperty uchar green\nproperty uchar blue\nend_header\n")
+    with open(path, "wb") as f:
+        f.write(header.encode("ascii"))
+        if orden is None:
+            for (x, y, z), (r, g, b) in zip(points.astype(np.float32), colors):
+                f.write(f"{float(x)!r} {float(y)!r} {float(z)!r} 0 {r} {g} {b}\n".encode("ascii"))
+            return
+        vertices = np.empty(n, dtype=[("x", orden + "f4"), ("y", orden + "f4"), ("z", orden + "f4"),
+                                      ("nx", orden + "f4"), ("red", "u1"), ("green", "u1"), ("blue", "u1")])
+        vertices["x"], vertices["y"], vertices["z"] = points.T
+        vertices["nx"] = 0
+        vertices["red"], vertices["green"], vertices["blue"] = colors.T
+        f.write(vertices.tobytes())
+
+
+def _cloud(n_points, seed=0):
+    rng = np.random.default_rng(seed)
+    points = (rng.normal(size=(n_points, 3)) * [20, 15, 10]).astype(np.float32)
+    # Valores de Z repetidos, para que el percentil caiga entre empates
+    points[: n_points // 4, 2] = np.round(points[: n_points // 4, 2])
+    colors = rng.integers(0, 256, (n_points, 3), dtype=np.uint8)
+    return points, colors
+
+
+def _project_in_memory(points, colors, custom_scale_factor, cut_percentage):
+    # Mismo recorte y proyección que process_cloud con la nube cargada en memoria
+    pcd = SimpleNamespace(points=points.astype(np.float64), colors=colors / 255.0)
+    mask = pcd_filter_mask(pcd, percentage=cut_percentage)
+    return point_cloud_to_image(SimpleNamespace(points=pcd.points[mask], colors=pcd.colors[mask]),
+                                custom_scale_factor)
+
+
+@pytest.mark.parametrize("formato", sorted(FORMATS))
+@pytest.mark.parametrize("chunk_size", [1, 333, 4096, 10 ** 6])
+def test_project_ply_matches_in_memory_projection(tmp_path, formato, chunk_size):
+    points, colors = _cloud(300 if chunk_size == 1 else 20000)
+    _write_ply(tmp_path / "scan.ply", points, colors, formato)
+
+    for cut_percentage, scale_factor in ((60, 5), (-30, 2), (0, 1)):
+        np.testing.assert_array_equal(
+            project_ply(str(tmp_path / "scan.ply"), scale_factor, cut_percentage, chunk_size=chunk_size),
+            _project_in_memory(points, colors, scale_factor, cut_percentage))
+
+
+@pytest.mark.parametrize("formato", sorted(FORMATS))
+@pytest.mark.parametrize("chunk_size", [7, 500, 10 ** 6])
+def test_ply_z_percentile_equals_np_percentile(tmp_path, formato, chunk_size):
+    points, colors = _cloud(2000, seed=1)
+    _write_ply(tmp_path / "scan.ply", points, colors, formato)
+    z = points[:, 2].astype(np.float64)
+
+    for percentage in (0, 0.1, 25, 37.5, 50, 60, 99.99, 100):
+        assert ply_z_percentile(str(tmp_path / "scan.ply"), percentage, chunk_size) == np.percentile(z, percentage)
+
+
+def test_ply_z_percentile_with_few_bins(tmp_path):
+    # Con pocos intervalos del histograma, muchos puntos comparten intervalo con el percentil
+    points, colors = _cloud(5000, seed=2)
+    _write_ply(tmp_path / "scan.ply", points, colors)
+    z = points[:, 2].astype(np.float64)
+
+    for percentage in (10, 50, 90):
+        assert ply_z_percentile(str(tmp_path / "scan.ply"), percentage, 1000, bins=4) == np.percentile(z, percentage)
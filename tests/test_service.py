@@ -0,0 +1,124 @@
+import os
+import subprocess
+import sys
+import time
+
+import cv2
+import numpy as np
+import pytest
+from POP2.service import ServiceClient
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _write_binary_ply(path, n_points, seed=0):
+    # PLY binario con color; los trabajos usan chunk_size, sin Open3D
+    rng = np.random.default_rng(seed)
+    vertices = np.empty(n_points, dtype=[("x", "<f4"), ("y", "<f4"), ("z", "<f4"),
+                                         ("red", "u1"), ("green", "u1"), ("blue", "u1")])
+    for k in ("x", "y", "z"):
+        vertices[k] = rng.normal(size=n_points) * 10
+    for k in ("red", "green", "blue"):
+        vertices[k] = rng.integers(0, 256, n_points)
+    with open(path, "wb") as f:
+        f.write(f"ply\nformat binary_little_endian 1.0\nelement vertex {n_points}\n"
+                "property float x\nproperty float y\nproperty float z\n"
+                "property uchar red\nproperty uchar green\nproperty uchar blue\nend_header\n".encode("ascii"))
+        f.write(vertices.tobytes())
+
+
+@pytest.fixture
+def service(tmp_path):
+    # serve() instala manejadores de señales, que solo funcionan en el hilo
+    # principal: se arranca en un proceso aparte
+    sock = str(tmp_path / "pop2.sock")
+    os.makedirs(tmp_path / "pcd")
+    os.makedirs(tmp_path / "salida")
+    entorno = dict(os.environ, PYTHONPATH=REPO)
+    proceso = subprocess.Popen([sys.executable, "-m", "POP2.service", "serve", "--unix", sock, "-w", "1",
+                                "--max-queued", "1", "--output-root", str(tmp_path / "salida"),
+                                "--input-root", str(tmp_path / "pcd")],
+                               cwd=REPO, env=entorno, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    limite = time.monotonic() + 30
+    while not os.path.exists(sock):
+        if proceso.poll() is not None or time.monotonic() > limite:
+            proceso.kill()
+            pytest.fail("El servicio no arrancó")
+        time.sleep(0.05)
+    with ServiceClient(sock, timeout=60) as client:
+        yield client, tmp_path
+    proceso.terminate()
+    proceso.wait(timeout=30)
+
+
+def test_result_returns_png_images(service):
+    client, tmp_path = service
+    _write_binary_ply(tmp_path / "pcd" / "scan.ply", 2000)
+
+    job = client.submit("scan.ply", params={"chunk_size": 500})
+    job, imagenes = client.result(job["id"])
+
+    assert job["status"] == "done", job["error"]
+    color = cv2.imdecode(np.frombuffer(imagenes[0], np.uint8), cv2.IMREAD_COLOR)
+    mask = cv2.imdecode(np.frombuffer(imagenes[1], np.uint8), cv2.IMREAD_UNCHANGED)
+    assert list(color.shape) == job["shape"]
+    assert mask.shape[:2] == color.shape[:2]
+
+
+def test_output_is_written_under_output_root(service):
+    client, tmp_path = service
+    _write_binary_ply(tmp_path / "pcd" / "scan.ply", 2000)
+
+    job = client.submit("scan.ply", params={"chunk_size": 500}, output="lote")
+    job, imagenes = client.result(job["id"])
+
+    assert job["status"] == "done" and imagenes == []
+    assert all(os.path.exists(p) for p in job["outputs"])
+    assert all(p.startswith(str(tmp_path / "salida" / "lote")) for p in job["outputs"])
+
+
+def test_paths_outside_roots_are_rejected(service):
+    client, tmp_path = service
+    _write_binary_ply(tmp_path / "pcd" / "scan.ply", 2000)
+    _write_binary_ply(tmp_path / "fuera.ply", 2000)
+
+    with pytest.raises(RuntimeError, match="fuera de"):
+        client.submit("scan.ply", params={"chunk_size": 500}, output="../otra")
+    with pytest.raises(RuntimeError, match="Identificador no válido"):
+        client.submit("scan.ply", params={"chunk_size": 500}, output="lote", file_id="../scan")
+    # Misma respuesta para un archivo fuera de input_root que para uno inexistente
+    with pytest.raises(RuntimeError, match="No existe el archivo"):
+        client.submit("../fuera.ply", params={"chunk_size": 500})
+    with pytest.raises(RuntimeError, match="No existe el archivo"):
+        client.submit("nada.ply", params={"chunk_size": 500})
+    assert not os.path.exists(tmp_path / "otra")
+
+
+def test_nowait_rejects_when_queue_is_full(service):
+    client, tmp_path = service
+    _write_binary_ply(tmp_path / "pcd" / "grande.ply", 1_000_000)
+
+    # Un trabajo en ejecución y otro en espera llenan la cola (max_queued = 1)
+    aceptados, rechazados = [], 0
+    for _ in range(4):
+        try:
+            aceptados.append(client.submit("grande.ply", params={"chunk_size": 100_000}, nowait=True)["id"])
+        except RuntimeError as e:
+            assert "QueueFull" in str(e)
+            rechazados += 1
+
+    assert rechazados > 0
+    for job_id in aceptados:
+        assert client.result(job_id)[0]["status"] == "done"
+
+
+def test_stats_counts_jobs(service):
+    client, tmp_path = service
+    _write_binary_ply(tmp_path / "pcd" / "scan.ply", 2000)
+
+    for _ in range(2):
+        client.result(client.submit("scan.ply", params={"chunk_size": 500})["id"])
+
+    stats = client.stats()
+    assert stats["workers"] == 1 and stats["max_queued"] == 1 and stats["queued"] == 0
+    assert stats["jobs"] == {"done": 2}
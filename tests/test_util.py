@@ -0,0 +1,76 @@
+import cv2
+import numpy as np
+import pytest
+from POP2.util import fill_missing_pixels, fill_missing_pixels_preserve_borders
+
+# Kernel para los vecinos (8 vecinos)
+KERNEL = np.array([[1, 1, 1],
+                   [1, 0, 1],
+                   [1, 1, 1]], dtype=np.uint8)
+
+
+def _loop_fill(imagen, iteraciones, umbral_vecinos=None):
+    # Versión original: un cv2.filter2D por canal sobre la imagen completa en
+    # cada iteración (umbral_vecinos=None reproduce fill_missing_pixels)
+    imagen_filled = imagen.copy()
+    for _ in range(iteraciones):
+        mascara_negra = np.all(imagen_filled == [0, 0, 0], axis=2)
+        if not np.any(mascara_negra):
+            break
+        vecinos_no_negros = cv2.filter2D((~mascara_negra).astype(np.float32), -1, KERNEL)
+        if umbral_vecinos is None:
+            mascara_filling = mascara_negra
+        else:
+            mascara_filling = mascara_negra & (vecinos_no_negros >= umbral_vecinos)
+            if not np.any(mascara_filling):
+                break
+        suma_vecinos = np.zeros_like(imagen_filled, dtype=np.float32)
+        for c in range(3):
+            suma_vecinos[:, :, c] = cv2.filter2D(imagen_filled[:, :, c].astype(np.float32), -1, KERNEL)
+        vecinos_no_negros[vecinos_no_negros == 0] = 1
+        promedio = np.round(suma_vecinos / vecinos_no_negros[:, :, np.newaxis]).astype(np.uint8)
+        imagen_filled[mascara_filling] = promedio[mascara_filling]
+    return imagen_filled
+
+
+def _sparse_image(alto, ancho, densidad, seed=0):
+    # Proyección dispersa: algunos píxeles con color (incluidos los bordes), el resto negro
+    rng = np.random.default_rng(seed)
+    imagen = rng.integers(0, 256, (alto, ancho, 3), dtype=np.uint8)
+    imagen[rng.random((alto, ancho)) >= densidad] = 0
+    return imagen
+
+
+def _disc_with_holes(lado, seed=0):
+    # Objeto grande con pocos huecos pequeños: la frontera es pequeña desde el principio
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[:lado, :lado]
+    dentro = (y - lado / 2) ** 2 + (x - lado / 2) ** 2 < (lado / 2.5) ** 2
+    imagen = np.zeros((lado, lado, 3), dtype=np.uint8)
+    imagen[dentro] = rng.integers(1, 256, (np.count_nonzero(dentro), 3), dtype=np.uint8)
+    imagen[rng.random((lado, lado)) < 0.002] = 0
+    return imagen
+
+
+IMAGES = {
+    "dispersa": _sparse_image(97, 131, 0.05),
+    "densa": _sparse_image(64, 80, 0.6, seed=1),
+    "casi_vacia": _sparse_image(50, 50, 0.002, seed=2),
+    "disco": _disc_with_holes(200),
+}
+
+
+@pytest.mark.parametrize("iteraciones", [1, 3, 8])
+@pytest.mark.parametrize("nombre", sorted(IMAGES))
+def test_fill_matches_filter2d_loop(nombre, iteraciones):
+    imagen = IMAGES[nombre]
+    np.testing.assert_array_equal(fill_missing_pixels(imagen, iteraciones), _loop_fill(imagen, iteraciones))
+
+
+@pytest.mark.parametrize("umbral_vecinos", [1, 4, 6])
+@pytest.mark.parametrize("iteraciones", [1, 3, 8])
+@pytest.mark.parametrize("nombre", sorted(IMAGES))
+def test_fill_preserve_borders_matches_filter2d_loop(nombre, iteraciones, umbral_vecinos, capsys):
+    imagen = IMAGES[nombre]
+    np.testing.assert_array_equal(fill_missing_pixels_preserve_borders(imagen, iteraciones, umbral_vecinos),
+                                  _loop_fill(imagen, iteraciones, umbral_vecinos))